@@ -0,0 +1,151 @@
+"""Requests per second of the read-only api (pipeline.api_server).
+
+Writes a synthetic universe, screens it into a results jsonl, builds the
+metric index and serves them on a local port. Client threads then request a
+mix of results, metrics and screen urls over keep-alive connections, half of
+them conditional (If-None-Match). Finally the results file is rewritten and
+the time until the api serves the new data is recorded.
+
+    python -m benchmarks.api_bench --symbols 500 --clients 8 --seconds 5
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.common import utc_timestamp, write_results
+from benchmarks.micro_bench import working_directory
+from benchmarks.synthetic import write_synthetic_universe
+from pipeline.api_server import ApiServer
+from pipeline.metric_index import build_metric_index
+from pipeline.report_maker import generate_reports
+from pipeline.report_renderer import render_reports
+from utils.latency_stats import percentile
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def request_paths(symbols: list) -> list:
+    paths = [f"/results/{symbol}" for symbol in symbols]
+    paths += [f"/metrics/{symbol}?metric=Revenue&metric=PE+Ratio&last=5" for symbol in symbols]
+    paths += [
+        "/results",
+        "/screen?where=Operating+Margin+(%25)>20&select=PE+Ratio&last=5",
+        "/aggregate?metric=Operating+Margin+(%25)&func=median&last=5",
+    ]
+    return paths
+
+
+def run_client(base_url: str, paths: list, until: float, seed: int, stats: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    host, port = base_url.removeprefix("http://").split(":")
+    connection = http.client.HTTPConnection(host, int(port))
+    etags, latencies, statuses = {}, [], {}
+    while time.perf_counter() < until:
+        path = rng.choice(paths)
+        conditional = path in etags and rng.random() < 0.5
+        started = time.perf_counter()
+        connection.request("GET", path, headers={"If-None-Match": etags[path]} if conditional else {})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    connection.close()
+    with lock:
+        stats["latencies"] += latencies
+        for status, count in statuses.items():
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + count
+
+
+def get_json(base_url: str, path: str):
+    host, port = base_url.removeprefix("http://").split(":")
+    connection = http.client.HTTPConnection(host, int(port))
+    connection.request("GET", path)
+    body = connection.getresponse().read()
+    connection.close()
+    return json.loads(body)
+
+
+def run_api_benchmark(symbols: int = 500, clients: int = 8, seconds: float = 5.0, reload_seconds: float = 0.5) -> dict:
+    with tempfile.TemporaryDirectory() as root:
+        companies = write_synthetic_universe(symbols, root)
+        with working_directory(root):
+            render_reports(generate_reports(list(companies)), "results.jsonl", fmt="jsonl")
+        build_metric_index(os.path.join(root, "data"), os.path.join(root, "metric_index.npz"), companies=companies)
+        server = ApiServer(
+            port=0,
+            results_path=os.path.join(root, "results.jsonl"),
+            index_path=os.path.join(root, "metric_index.npz"),
+            universe_path=os.path.join(root, "filtered_companies.json"),
+            reload_seconds=reload_seconds,
+        )
+        with server:
+            paths = request_paths(list(companies))
+            stats, lock = {"latencies": [], "statuses": {}}, threading.Lock()
+            until = time.perf_counter() + seconds
+            threads = [
+                threading.Thread(target=run_client, args=(server.base_url, paths, until, seed, stats, lock))
+                for seed in range(clients)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            # hot reload: drop every result but one and wait for the api to serve it
+            changed_at = time.perf_counter()
+            with open(os.path.join(root, "results.jsonl")) as f:
+                first_line = f.readline()
+            with open(os.path.join(root, "results.jsonl"), "w") as f:
+                f.write(first_line)
+            while get_json(server.base_url, "/health")["results"] != 1:
+                time.sleep(0.01)
+            reload_seconds_observed = time.perf_counter() - changed_at
+
+    latencies = sorted(stats["latencies"])
+    return {
+        "benchmark": "api",
+        "timestamp": utc_timestamp(),
+        "symbols": symbols,
+        "clients": clients,
+        "seconds": seconds,
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / seconds,
+        "statuses": {str(status): count for status, count in sorted(stats["statuses"].items())},
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+        },
+        "reload_seconds": reload_seconds,
+        "reload_observed_seconds": reload_seconds_observed,
+        "reloads": server.reloads,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="requests per second of the read-only api")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--reload-seconds", type=float, default=0.5)
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/api-<time>.json")
+    args = parser.parse_args()
+
+    results = run_api_benchmark(args.symbols, args.clients, args.seconds, args.reload_seconds)
+    path = write_results(results, args.output)
+    logger.info(
+        f"{results['requests_per_second']:.0f} requests/s, p99 {results['latency_ms']['p99']:.1f} ms, "
+        f"statuses {results['statuses']}, reload seen after {results['reload_observed_seconds']:.2f}s -> {path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
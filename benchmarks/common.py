@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+from utils.process_memory import get_browser_rss, get_self_rss
+
+RESULTS_DIR = "benchmarks/results"
+
+
+def utc_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def write_results(results: dict, output: str = None) -> str:
+    "write a benchmark result as json, defaults to benchmarks/results/<benchmark>-<time>.json"
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{results['benchmark']}-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    return output
+
+
+class RssSampler:
+    "samples python and browser (playwright driver and browser processes) RSS in the background, keeps the peaks"
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_python = 0
+        self.peak_browser = 0
+        self.peak_total = 0
+        self._task = None
+
+    def sample(self):
+        python_rss, browser_rss = get_self_rss(), get_browser_rss()
+        self.peak_python = max(self.peak_python, python_rss)
+        self.peak_browser = max(self.peak_browser, browser_rss)
+        self.peak_total = max(self.peak_total, python_rss + browser_rss)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.sample()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def as_dict(self) -> dict:
+        return {
+            "python_bytes": self.peak_python,
+            "browser_bytes": self.peak_browser,
+            "total_bytes": self.peak_total,
+        }
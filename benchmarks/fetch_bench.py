@@ -0,0 +1,161 @@
+"""Offline crawl benchmark.
+
+Starts the fixture server, crawls its screener with
+get_filtered_companies_from_screener and fetches every report of every
+symbol with ReportsFetcher, then writes a JSON result with symbols/minute,
+per-report latency percentiles and peak RSS.
+
+    python -m benchmarks.fetch_bench --symbols 20 --latency-ms 100 --error-rate 0.05
+    python -m benchmarks.fetch_bench --symbols 50 --aimd   # concurrent tickers, AIMD page limit
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from dataclasses import asdict
+
+from benchmarks.common import RssSampler, utc_timestamp, write_results
+from benchmarks.fixture_server import FixtureConfig, FixtureServer
+from config import REPORT_FETCH_STRATEGY, REPORT_WAIT_UNTIL, REPORTS_ROUTES
+from playwright_utils import BrowserManager, PopupGuard
+from pipeline.get_filtered_companies import get_filtered_companies_from_screener
+from pipeline.reports_fetcher import ReportsFetcher
+from utils.aimd import AimdController
+from utils.latency_stats import latency_summary
+from utils.logger import get_logger
+from utils.timing import StageTimer
+
+logger = get_logger()
+
+
+async def fetch_symbol(fetcher: ReportsFetcher, failures: list):
+    "every report of one symbol with the fetcher's strategy, failures are collected"
+    results = await fetcher._fetch_reports()
+    for report_type, result in zip(REPORTS_ROUTES, results):
+        if isinstance(result, BaseException):
+            failures.append({"symbol": fetcher.ticker, "report": report_type, "error": repr(result)})
+
+
+async def run_fetch_benchmark(
+    config: FixtureConfig,
+    max_symbols: int = None,
+    headless: bool = True,
+    limiter: AimdController = None,
+    popup_guard: PopupGuard = None,
+    wait_until: str = REPORT_WAIT_UNTIL,
+    strategy: str = REPORT_FETCH_STRATEGY,
+) -> dict:
+    "symbols are crawled one after the other, or all at once bounded by the limiter when one is given"
+    failures = []
+    sampler = RssSampler()
+    timer = StageTimer()
+    with FixtureServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+        data_dir = os.path.join(work_dir, "data")
+        async with BrowserManager(headless=headless) as manager:
+            async with manager.new_context() as context:
+                if popup_guard:
+                    await popup_guard.install(context)
+                sampler.start()
+                page = await context.new_page()
+                screener_start = time.perf_counter()
+                companies = await get_filtered_companies_from_screener(
+                    page, base_url=server.base_url, output_path=os.path.join(work_dir, "companies.json"), timer=timer
+                )
+                screener_seconds = time.perf_counter() - screener_start
+                await page.close()
+
+                symbols = list(companies.values())[:max_symbols]
+                crawl_start = time.perf_counter()
+                fetchers = [
+                    ReportsFetcher(
+                        context, company["symbol"], company["href"], base_url=server.base_url,
+                        data_dir=data_dir, timer=timer, limiter=limiter,
+                        wait_until=wait_until, strategy=strategy,
+                    )
+                    for company in symbols
+                ]
+                batches = [fetchers] if limiter else [[fetcher] for fetcher in fetchers]
+                for batch in batches:
+                    await asyncio.gather(*[fetch_symbol(fetcher, failures) for fetcher in batch])
+                crawl_seconds = time.perf_counter() - crawl_start
+                await sampler.stop()
+        request_counts = dict(server.httpd.request_counts)
+    # per-report latency, from page (or in-page navigation) to stored csv; the timer is never exported here,
+    # so records still holds every span
+    latencies = [
+        record["seconds"] for record in timer.records if record["stage"] == "report" and record["status"] == "ok"
+    ]
+
+    return {
+        "benchmark": "fetch",
+        "timestamp": utc_timestamp(),
+        "fixture": asdict(config),
+        "wait_until": wait_until,
+        "strategy": strategy,
+        "screener": {"seconds": screener_seconds, "symbols_found": len(companies)},
+        "crawl": {
+            "symbols": len(symbols),
+            "seconds": crawl_seconds,
+            "symbols_per_minute": len(symbols) / crawl_seconds * 60 if crawl_seconds else 0.0,
+            "reports_ok": len(latencies),
+            "reports_failed": len(failures),
+        },
+        "report_latency_seconds": latency_summary(latencies),
+        "stage_seconds": {stage: latency_summary(values) for stage, values in timer.by_stage().items()},
+        "peak_rss": sampler.as_dict(),
+        "concurrency": limiter.summary() if limiter else None,
+        "popup_guard": popup_guard.stats() if popup_guard else None,
+        "requests_served": sum(request_counts.values()),
+        # full loads vs client-side (?__data) loads of report pages
+        "report_document_loads": sum(
+            count for path, count in request_counts.items() if path.startswith("/stocks/t") and "?__data" not in path
+        ),
+        "report_data_loads": sum(count for path, count in request_counts.items() if "?__data" in path),
+        "failures": failures[:20],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="offline crawl benchmark against the fixture server")
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=25.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-weight-kb", type=int, default=100)
+    parser.add_argument("--asset-latency-ms", type=float, default=300.0)
+    parser.add_argument("--popup-rate", type=float, default=0.3)
+    parser.add_argument("--popup-delay-ms", type=float, default=0.0, help="attach popups late, after load")
+    parser.add_argument("--popup-guard", action="store_true", help="context-level popup suppression instead of close_popup")
+    parser.add_argument("--aimd", action="store_true", help="crawl symbols concurrently under the AIMD page limit")
+    parser.add_argument("--strategy", choices=["single_page", "page_per_report"], default=REPORT_FETCH_STRATEGY)
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/fetch-<time>.json")
+    args = parser.parse_args()
+
+    config = FixtureConfig(
+        symbols=args.symbols,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        page_weight_kb=args.page_weight_kb,
+        asset_latency_ms=args.asset_latency_ms,
+        popup_rate=args.popup_rate,
+        popup_delay_ms=args.popup_delay_ms,
+    )
+    limiter = AimdController() if args.aimd else None
+    popup_guard = PopupGuard() if args.popup_guard else None
+    results = asyncio.run(run_fetch_benchmark(
+        config, headless=not args.headed, limiter=limiter, popup_guard=popup_guard, strategy=args.strategy
+    ))
+    path = write_results(results, args.output)
+    crawl, latency = results["crawl"], results["report_latency_seconds"]
+    logger.info(
+        f"{crawl['symbols_per_minute']:.1f} symbols/min, report p50 {latency['p50']:.2f}s "
+        f"p95 {latency['p95']:.2f}s p99 {latency['p99']:.2f}s, "
+        f"peak rss {results['peak_rss']['total_bytes'] / 2**20:.0f} MiB -> {path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
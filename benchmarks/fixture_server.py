@@ -0,0 +1,315 @@
+"""Local stand-in for the stockanalysis.com pages the crawler touches.
+
+Serves the screener (client-side paginated #main-table with a "Next" button)
+and the REPORTS_ROUTES statement pages (table.financials-table, optional
+aria-modal popup, locked "Upgrade" column, client-side links between the
+statements) with configurable latency, error rate and page weight, so crawl
+performance can be measured offline.
+"""
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from config import REPORTS_ROUTES
+from enums import BalanceSheetIndex, CashFlowIndex, IncomeIndex, RatiosIndex
+
+REPORT_ENUMS = {
+    "income": IncomeIndex,
+    "balance-sheet": BalanceSheetIndex,
+    "cash-flow": CashFlowIndex,
+    "ratios": RatiosIndex,
+}
+SECTORS = ["Technology", "Industrials", "Healthcare", "Financials", "Energy", "Materials"]
+FISCAL_YEARS = list(range(2025, 2019, -1))
+
+
+@dataclass
+class FixtureConfig:
+    symbols: int = 50
+    screener_page_size: int = 20
+    latency_ms: float = 50.0  # server think time for every html page
+    latency_jitter_ms: float = 25.0
+    error_rate: float = 0.0  # fraction of report pages answered with a 503
+    page_weight_kb: int = 100  # inert padding added to every html page
+    asset_latency_ms: float = 300.0  # delay of the page's image, only matters for wait_until="load"
+    popup_rate: float = 0.3  # fraction of pages showing the aria-modal popup
+    popup_delay_ms: float = 0.0  # > 0: the popup is attached by a script this long after load
+    seed: int = 0
+
+
+def fixture_symbols(count: int) -> dict:
+    "symbol -> {symbol, href, sector}, same shape as filtered_companies.json"
+    companies = {}
+    for i in range(count):
+        symbol = f"T{i:04d}"
+        companies[symbol] = {
+            "symbol": symbol,
+            "href": f"/stocks/{symbol.lower()}/",
+            "sector": SECTORS[i % len(SECTORS)],
+        }
+    return companies
+
+
+def _format_cell(rng: random.Random, is_percent: bool) -> str:
+    value = rng.uniform(-20, 60) if is_percent else rng.uniform(-500, 50000)
+    if rng.random() < 0.03:
+        return "-"
+    if is_percent:
+        return f"{value:.2f}%"
+    return f"{value:,.2f}"
+
+
+def render_statement_table(symbol: str, report: str, quarterly: bool = False) -> str:
+    rng = random.Random(zlib.crc32(f"{symbol}/{report}/{quarterly}".encode()))
+    trailing = "Current" if report == "ratios" else "TTM"
+    if quarterly:
+        quarters = [(year, quarter) for year in FISCAL_YEARS for quarter in (4, 3, 2, 1)]
+        periods = [trailing] + [f"Q{quarter} {year}" for year, quarter in quarters] + ["Q4 2019"]
+        endings = [FISCAL_YEARS[0] + 1] + [year for year, _ in quarters] + [2019]
+    else:
+        periods = [trailing] + [f"FY {year}" for year in FISCAL_YEARS] + ["FY 2019"]
+        endings = [FISCAL_YEARS[0] + 1] + FISCAL_YEARS + [2019]
+    head = "".join(f"<th>{p}</th>" for p in periods)
+    ending = "".join(f"<th>Dec {year}</th>" for year in endings)
+    rows = []
+    for member in REPORT_ENUMS[report]:
+        is_percent = member.value.endswith(" (%)")
+        name = member.value[: -len(" (%)")] if is_percent else member.value
+        cells = "".join(f"<td>{_format_cell(rng, is_percent)}</td>" for _ in periods[:-1])
+        rows.append(f"<tr><td>{name}</td>{cells}<td>Upgrade</td></tr>")
+    return (
+        '<table class="financials-table">'
+        f"<thead><tr><th>Fiscal Year</th>{head}</tr><tr><th>Period Ending</th>{ending}</tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>"
+    )
+
+
+def render_statement_nav(symbol: str) -> str:
+    "in-app links between a symbol's statements, handled client side by STATEMENT_NAV_SCRIPT"
+    links = "".join(
+        f'<a href="/stocks/{symbol.lower()}{route}">{report}</a>' for report, route in REPORTS_ROUTES.items()
+    )
+    return f'<nav class="statement-nav">{links}</nav>'
+
+
+PERIOD_SWITCH = '<div class="period-switch"><button data-period="annual">Annual</button><button data-period="quarterly">Quarterly</button></div>'
+
+
+# Client-side routing like the real site: fetch only the data of the next
+# statement (or period view), swap the table and push the new url, no document
+# load. The chosen period sticks across statements. A failed fetch renders an
+# error in place of the table.
+STATEMENT_NAV_SCRIPT = """<script>
+let period = 'annual';
+async function swapTable(href) {
+  const response = await fetch(href + '?__data=1&p=' + period);
+  const table = document.querySelector('table.financials-table');
+  const html = response.ok ? await response.text() : `<p class="error">${response.status}</p>`;
+  if (table) table.outerHTML = html;
+}
+document.addEventListener('click', async (event) => {
+  const link = event.target.closest('nav.statement-nav a');
+  const toggle = event.target.closest('.period-switch button');
+  if (link) {
+    event.preventDefault();
+    history.pushState({}, '', link.getAttribute('href'));
+    await swapTable(link.getAttribute('href'));
+  } else if (toggle && toggle.dataset.period !== period) {
+    period = toggle.dataset.period;
+    await swapTable(location.pathname);
+  }
+});
+</script>"""
+
+
+def _page(title: str, body: str, config: FixtureConfig, rng: random.Random) -> str:
+    popup = ""
+    if rng.random() < config.popup_rate:
+        popup = (
+            '<div aria-modal="true" role="dialog" style="position:fixed;inset:0;background:#0008">'
+            '<button aria-label="Close" onclick="this.parentNode.remove()">x</button></div>'
+        )
+        if config.popup_delay_ms > 0:
+            # a late modal, shows up after close_popup already looked for it
+            popup = (
+                f"<script>setTimeout(() => document.body.insertAdjacentHTML('beforeend', "
+                f"{json.dumps(popup)}), {config.popup_delay_ms:g});</script>"
+            )
+    padding = "x" * (config.page_weight_kb * 1024)
+    return (
+        f"<!DOCTYPE html><html><head><title>{title}</title></head><body>"
+        f'<img src="/asset.png?{rng.random()}" width="1" height="1">'
+        f"{body}{popup}"
+        f'<div hidden class="padding">{padding}</div>'
+        "</body></html>"
+    )
+
+
+def render_screener(config: FixtureConfig, rng: random.Random) -> str:
+    rows = json.dumps(list(fixture_symbols(config.symbols).values()))
+    body = f"""
+<table id="main-table"><tbody></tbody></table>
+<button class="controls-btn">Next</button>
+<script>
+const rows = {rows};
+const pageSize = {config.screener_page_size};
+let current = 0;
+const tbody = document.querySelector('#main-table tbody');
+const next = document.querySelector('button.controls-btn');
+function render() {{
+  tbody.innerHTML = rows.slice(current * pageSize, (current + 1) * pageSize).map(r =>
+    `<tr><td class="sym"><a href="${{r.href}}">${{r.symbol}}</a></td><td class="sl">${{r.symbol}} Inc.</td><td class="sl">${{r.sector}}</td></tr>`
+  ).join('');
+  next.disabled = (current + 1) * pageSize >= rows.length;
+}}
+next.addEventListener('click', () => {{ current += 1; render(); }});
+render();
+</script>"""
+    return _page("Stock Screener", body, config, rng)
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    server: "FixtureHTTPServer"
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _think(self, config: FixtureConfig, rng: random.Random):
+        delay = config.latency_ms + rng.uniform(-config.latency_jitter_ms, config.latency_jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+    def do_GET(self):  # noqa: N802
+        config = self.server.config
+        rng = self.server.next_rng()
+        path, _, query = self.path.partition("?")
+        is_data = "__data=1" in query
+        self.server.count_request(f"{path}?__data" if is_data else path)
+
+        if path == "/asset.png":
+            time.sleep(config.asset_latency_ms / 1000)
+            return self._send(200, b"", "image/png")
+        if path == "/stocks/screener/":
+            self._think(config, rng)
+            return self._send(200, render_screener(config, rng).encode())
+
+        parsed = self.server.match_report(path)
+        if parsed is None:
+            return self._send(404, b"<html><body>Page not found</body></html>")
+        symbol, report = parsed
+        self._think(config, rng)
+        if rng.random() < config.error_rate:
+            return self._send(503, b"<html><body>Service Unavailable</body></html>")
+        if is_data:
+            # client-side navigation only needs the table
+            quarterly = "p=quarterly" in query
+            return self._send(200, render_statement_table(symbol, report, quarterly).encode())
+        body = render_statement_nav(symbol) + PERIOD_SWITCH + render_statement_table(symbol, report) + STATEMENT_NAV_SCRIPT
+        return self._send(200, _page(f"{symbol} {report}", body, config, rng).encode())
+
+
+class FixtureHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FixtureConfig):
+        super().__init__(address, FixtureRequestHandler)
+        self.config = config
+        self.companies = fixture_symbols(config.symbols)
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.request_counts: dict = {}
+        self._routes = sorted(REPORTS_ROUTES.items(), key=lambda item: len(item[1]), reverse=True)
+
+    def next_rng(self) -> random.Random:
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def count_request(self, path: str):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def match_report(self, path: str) -> Optional[tuple]:
+        "(SYMBOL, report) for /stocks/<symbol>/<report route>, None otherwise"
+        if not path.startswith("/stocks/"):
+            return None
+        for report, route in self._routes:
+            if path.endswith(route):
+                symbol = path[len("/stocks/"): -len(route)].upper()
+                if symbol in self.companies:
+                    return symbol, report
+        return None
+
+
+class FixtureServer:
+    """Runs the stand-in site on a background thread.
+
+    Example:
+        >>> with FixtureServer(FixtureConfig(symbols=10)) as server:
+        ...     fetcher = ReportsFetcher(context, "T0001", "/stocks/t0001/", base_url=server.base_url)
+    """
+
+    def __init__(self, config: FixtureConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FixtureConfig()
+        self.httpd = FixtureHTTPServer((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def companies(self) -> dict:
+        return self.httpd.companies
+
+    def start(self) -> "FixtureServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: ANN001
+        self.stop()
+        return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="serve stockanalysis-shaped fixture pages")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-weight-kb", type=int, default=100)
+    args = parser.parse_args()
+
+    config = FixtureConfig(
+        symbols=args.symbols,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        page_weight_kb=args.page_weight_kb,
+    )
+    server = FixtureServer(config, port=args.port)
+    print(f"serving fixtures on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,227 @@
+"""Micro benchmarks for the parsing, cleaning and screening hot paths.
+
+Each workload runs over synthetic inputs for 10, 1k and 10k tickers and
+records wall time, the blocks and bytes still held after the run and peak
+traced memory. benchmarks/micro_baseline.json holds the reference run, later
+runs are compared against it.
+
+    python -m benchmarks.micro_bench --sizes 10,1000 --save-baseline
+    python -m benchmarks.micro_bench --sizes 10,1000 --fail-on-regression
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from benchmarks.common import utc_timestamp, write_results
+from benchmarks.synthetic import (
+    synthetic_clean_df,
+    synthetic_raw_df,
+    synthetic_table_html,
+    write_synthetic_universe,
+)
+from benchmarks.fixture_server import fixture_symbols
+from utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_SIZES = (10, 1000, 10000)
+BASELINE_PATH = "benchmarks/micro_baseline.json"
+REGRESSION_THRESHOLD = 1.2  # slower than baseline by more than 20%
+
+
+@contextmanager
+def working_directory(path: str):
+    "report_maker reads data/ and filtered_companies.json relative to the cwd"
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def measure(run, *args) -> dict:
+    """Time run(*args) untraced, then run it again under tracemalloc for the
+    memory it retains (net growth between snapshots before and after, not what
+    it allocated and freed on the way) and its peak (tracing slows it down, so
+    it is not timed)."""
+    gc.collect()
+    start = time.perf_counter()
+    run(*args)
+    wall = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    retained_blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    retained_bytes = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return {
+        "wall_seconds": wall,
+        "retained_blocks": retained_blocks,
+        "retained_bytes": retained_bytes,
+        "peak_bytes": peak,
+    }
+
+
+def bench_extract_html_table(size: int) -> dict:
+    from pipeline.reports_fetcher import parse_html_table
+
+    tables = [synthetic_table_html(symbol) for symbol in fixture_symbols(size)]
+
+    def run(tables):
+        for table_html in tables:
+            parse_html_table(table_html)
+
+    return measure(run, tables)
+
+
+def bench_full_df_cleaning(size: int) -> dict:
+    from utils.df_cleaner import full_df_cleaning
+
+    rng = random.Random(0)
+    template = [synthetic_raw_df(rng) for _ in range(min(size, 50))]
+
+    # full_df_cleaning mutates its input, every pass gets fresh copies
+    def run(_):
+        for i in range(size):
+            full_df_cleaning(template[i % len(template)].copy())
+
+    return measure(run, None)
+
+
+def bench_generate_report(size: int, universe_root: str) -> dict:
+    from pipeline.report_maker import generate_report
+
+    symbols = list(fixture_symbols(size))
+
+    def run(symbols):
+        with working_directory(universe_root):
+            for symbol in symbols:
+                generate_report(symbol)
+
+    return measure(run, symbols)
+
+
+def bench_get_row_consistency(size: int) -> dict:
+    from utils.linear_regression import get_row_consistency
+
+    rng = random.Random(0)
+    frames = [synthetic_clean_df(rng) for _ in range(min(size, 50))]
+
+    def run(_):
+        for i in range(size):
+            get_row_consistency("Operating Margin (%)", frames[i % len(frames)])
+
+    return measure(run, None)
+
+
+def bench_metric_index_query(size: int, universe_root: str) -> dict:
+    from enums import IncomeIndex, RatiosIndex
+    from pipeline.metric_index import Where, build_metric_index
+
+    with open(os.path.join(universe_root, "filtered_companies.json")) as f:
+        companies = json.load(f)
+    index = build_metric_index(os.path.join(universe_root, "data"), path=None, companies=companies)
+    where = [Where(IncomeIndex.OPERATING_MARGIN_PERCENT, ">", 20, last=5)]
+
+    # the index is built once, the workload is the query the index exists for
+    def run(_):
+        index.select([RatiosIndex.PE_RATIO], where=where, last=5)
+        index.aggregate(IncomeIndex.OPERATING_MARGIN_PERCENT, by="sector", func="median", last=5)
+
+    return measure(run, None)
+
+
+def run_micro_benchmarks(sizes=DEFAULT_SIZES) -> dict:
+    import logging
+    results = {}
+    # screening logs a warning per missing row, keep the output readable
+    previous_level = logger.level
+    logger.setLevel(logging.ERROR)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as universe_root:
+                write_synthetic_universe(size, universe_root)
+                workloads = {
+                    "extract_html_table_to_df": lambda: bench_extract_html_table(size),
+                    "full_df_cleaning": lambda: bench_full_df_cleaning(size),
+                    "generate_report": lambda: bench_generate_report(size, universe_root),
+                    "get_row_consistency": lambda: bench_get_row_consistency(size),
+                    "metric_index_query": lambda: bench_metric_index_query(size, universe_root),
+                }
+                for name, workload in workloads.items():
+                    result = workload()
+                    results.setdefault(name, {})[str(size)] = result
+                    print(f"{name:<26} {size:>6} tickers  {result['wall_seconds']:8.3f}s  "
+                          f"peak {result['peak_bytes'] / 2**20:7.1f} MiB", file=sys.stderr)
+    finally:
+        logger.setLevel(previous_level)
+    return results
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    "list of regressions: workloads whose wall time grew by more than threshold"
+    regressions = []
+    for name, by_size in results.items():
+        for size, result in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base or not base["wall_seconds"]:
+                continue
+            ratio = result["wall_seconds"] / base["wall_seconds"]
+            result["baseline_ratio"] = ratio
+            if ratio > threshold:
+                regressions.append({"workload": name, "size": size, "ratio": ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="micro benchmarks for parsing, cleaning and screening")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated ticker counts")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/micro-<time>.json")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    workloads = run_micro_benchmarks(sizes)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(workloads, json.load(f)["workloads"])
+    results = {
+        "benchmark": "micro",
+        "timestamp": utc_timestamp(),
+        "python": sys.version.split()[0],
+        "workloads": workloads,
+        "regressions": regressions,
+    }
+    path = write_results(results, args.output)
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        logger.info(f"baseline saved to {args.baseline}")
+
+    for regression in regressions:
+        logger.warning(f"regression: {regression['workload']} @ {regression['size']} tickers "
+                       f"is {regression['ratio']:.2f}x the baseline")
+    logger.info(f"micro benchmark results -> {path}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Coordinator / worker crawl on one box.
+
+Starts the fixture server, queues its universe in a temporary sqlite work
+queue and runs several `cli.py worker` processes against it. With
+--kill-after one worker is killed mid lease, so its unit has to expire and be
+re-issued to the others. Records the wall time, queue stats and how many
+symbols ended up with every report.
+
+    python -m benchmarks.queue_bench --symbols 40 --workers 4
+    python -m benchmarks.queue_bench --symbols 40 --workers 4 --kill-after 5 --lease-seconds 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+
+from benchmarks.common import utc_timestamp, write_results
+from benchmarks.fixture_server import FixtureConfig, FixtureServer
+from pipeline.crawl_worker import run_coordinator, watch_queue
+from pipeline.work_queue import WorkQueue
+from utils.get_symbol_csvs_paths import get_missing_reports
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def start_worker(index: int, queue_path: str, base_url: str, data_dir: str, lease_seconds: float) -> subprocess.Popen:
+    return subprocess.Popen([
+        sys.executable, "cli.py", "worker",
+        "--id", f"worker-{index}",
+        "--queue", queue_path,
+        "--lease-seconds", str(lease_seconds),
+        "--base-url", base_url,
+        "--data-dir", data_dir,
+        "--negative-cache", os.path.join(data_dir, "negative_cache.json"),
+    ])
+
+
+def run_queue_benchmark(
+    config: FixtureConfig,
+    workers: int = 4,
+    unit_size: int = 5,
+    lease_seconds: float = 30.0,
+    kill_after: float = None,
+) -> dict:
+    with FixtureServer(config) as server, tempfile.TemporaryDirectory() as work_dir:
+        data_dir = os.path.join(work_dir, "data")
+        queue_path = os.path.join(work_dir, "work_queue.sqlite")
+        with WorkQueue(queue_path, lease_seconds=lease_seconds) as queue:
+            run_coordinator(queue, server.companies, unit_size, watch=False)
+            start = time.perf_counter()
+            processes = [
+                start_worker(index, queue_path, server.base_url, data_dir, lease_seconds) for index in range(workers)
+            ]
+            killed = None
+            if kill_after is not None:
+                time.sleep(kill_after)
+                killed = processes[0]
+                killed.kill()
+                logger.info(f"killed worker-0 (pid {killed.pid}) after {kill_after:g}s")
+            # the coordinator re-issues the killed worker's lease once it expires
+            stats = watch_queue(queue, interval=1.0)
+            for process in processes:
+                process.wait()
+            seconds = time.perf_counter() - start
+        complete = [symbol for symbol in server.companies if not get_missing_reports(symbol, data_dir)]
+
+    return {
+        "benchmark": "queue",
+        "timestamp": utc_timestamp(),
+        "fixture": asdict(config),
+        "workers": workers,
+        "unit_size": unit_size,
+        "lease_seconds": lease_seconds,
+        "killed_worker_after_seconds": kill_after,
+        "seconds": seconds,
+        "symbols": len(server.companies),
+        "symbols_complete": len(complete),
+        "symbols_per_minute": len(complete) / seconds * 60 if seconds else 0.0,
+        "queue": stats,
+        "worker_exit_codes": [process.returncode for process in processes if process is not killed],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="several worker processes crawling the fixture server from one queue")
+    parser.add_argument("--symbols", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--unit-size", type=int, default=5)
+    parser.add_argument("--lease-seconds", type=float, default=30.0)
+    parser.add_argument("--kill-after", type=float, help="kill one worker after this many seconds")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/queue-<time>.json")
+    args = parser.parse_args()
+
+    config = FixtureConfig(symbols=args.symbols, latency_ms=args.latency_ms, error_rate=args.error_rate)
+    results = run_queue_benchmark(config, args.workers, args.unit_size, args.lease_seconds, args.kill_after)
+    path = write_results(results, args.output)
+    logger.info(
+        f"{results['symbols_complete']}/{results['symbols']} symbols complete in {results['seconds']:.1f}s "
+        f"with {args.workers} workers, queue {results['queue']} -> {path}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Start up time of the command line.
+
+Runs each command in a fresh interpreter a few times and records the median
+wall time plus the heavy modules (pandas, scipy, playwright) it imported, so a
+top level import that slows down every command shows up here.
+
+    python -m benchmarks.startup_bench --runs 7
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import utc_timestamp, write_results
+from utils.logger import get_logger
+
+logger = get_logger()
+
+HEAVY_MODULES = ("pandas", "numpy", "scipy", "playwright")
+
+COMMANDS = {
+    "cli --help": [sys.executable, "cli.py", "--help"],
+    "cli status": [sys.executable, "cli.py", "status"],
+    "import main": [sys.executable, "-c", "import main"],
+}
+
+# Prints the heavy modules a command imported, run after the command in the same interpreter
+IMPORT_PROBE = (
+    "import runpy, sys, json\n"
+    "sys.argv = {argv!r}\n"
+    "try:\n"
+    "    runpy.run_path('cli.py', run_name='__main__')\n"
+    "except SystemExit:\n"
+    "    pass\n"
+    "print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)), file=sys.stderr)\n"
+)
+
+
+def time_command(command: list, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def heavy_imports(cli_args: list) -> list:
+    "heavy modules loaded by `cli.py <cli_args>`"
+    probe = IMPORT_PROBE.format(argv=["cli.py"] + cli_args, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=False)
+    try:
+        return json.loads(completed.stderr.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return []
+
+
+def run_startup_benchmark(runs: int = 5) -> dict:
+    commands = {}
+    for name, command in COMMANDS.items():
+        timings = time_command(command, runs)
+        commands[name] = {
+            "median_seconds": statistics.median(timings),
+            "min_seconds": min(timings),
+            "runs": runs,
+        }
+        if command[1] == "cli.py":
+            commands[name]["heavy_imports"] = heavy_imports(command[2:])
+    return {
+        "benchmark": "startup",
+        "timestamp": utc_timestamp(),
+        "python": sys.version.split()[0],
+        "commands": commands,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="command line start up benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/startup-<time>.json")
+    args = parser.parse_args()
+
+    results = run_startup_benchmark(args.runs)
+    path = write_results(results, args.output)
+    for name, result in results["commands"].items():
+        heavy = result.get("heavy_imports")
+        heavy_text = f", heavy imports: {', '.join(heavy) or 'none'}" if heavy is not None else ""
+        logger.info(f"{name}: median {result['median_seconds'] * 1000:.0f} ms{heavy_text}")
+    logger.info(f"startup benchmark results -> {path}")
+
+
+if __name__ == "__main__":
+    main()
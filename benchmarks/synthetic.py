@@ -0,0 +1,65 @@
+"""Synthetic statement generators for the micro benchmarks.
+
+Raw tables look like extract_html_table_to_df output (strings with %, commas
+and "-"), stored universes look like what ReportsFetcher writes to data/.
+"""
+import csv
+import json
+import os
+import random
+
+import pandas as pd
+
+from benchmarks.fixture_server import FISCAL_YEARS, REPORT_ENUMS, fixture_symbols, render_statement_table
+
+PERIODS = ["TTM"] + [f"FY {year}" for year in FISCAL_YEARS]
+
+
+def synthetic_table_html(symbol: str, report: str = "income") -> str:
+    "inner html of a table.financials-table, as read from the page"
+    table = render_statement_table(symbol, report)
+    return table[table.index(">") + 1: table.rindex("</table>")]
+
+
+def synthetic_raw_df(rng: random.Random, report: str = "income") -> pd.DataFrame:
+    "raw statement df with string cells, input of full_df_cleaning"
+    rows = []
+    for member in REPORT_ENUMS[report]:
+        is_percent = member.value.endswith(" (%)")
+        name = member.value[: -len(" (%)")] if is_percent else member.value
+        cells = []
+        for _ in PERIODS:
+            if rng.random() < 0.03:
+                cells.append("-")
+            elif is_percent:
+                cells.append(f"{rng.uniform(-20, 60):.2f}%")
+            else:
+                cells.append(f"{rng.uniform(-500, 50000):,.2f}")
+        rows.append([name] + cells)
+    return pd.DataFrame(rows, columns=["Fiscal Year"] + PERIODS)
+
+
+def synthetic_clean_df(rng: random.Random, report: str = "income") -> pd.DataFrame:
+    "cleaned statement df, as stored in data/<symbol>/<report>.csv"
+    index = pd.Index([member.value for member in REPORT_ENUMS[report]], name="Fiscal Year")
+    values = [[rng.uniform(-20, 60) for _ in PERIODS] for _ in index]
+    return pd.DataFrame(values, index=index, columns=PERIODS)
+
+
+def write_synthetic_universe(count: int, root: str, seed: int = 0) -> dict:
+    """Write count tickers (every report) to root/data plus root/filtered_companies.json.
+    Uses the csv module directly since this runs for up to 10k tickers."""
+    rng = random.Random(seed)
+    companies = fixture_symbols(count)
+    for symbol in companies:
+        symbol_dir = os.path.join(root, "data", symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+        for report, enum in REPORT_ENUMS.items():
+            with open(os.path.join(symbol_dir, f"{report}.csv"), "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Fiscal Year"] + PERIODS)
+                for member in enum:
+                    writer.writerow([member.value] + [round(rng.uniform(-20, 60), 2) for _ in PERIODS])
+    with open(os.path.join(root, "filtered_companies.json"), "w") as f:
+        json.dump(companies, f)
+    return companies
@@ -0,0 +1,66 @@
+"""Per-report latency of the navigation wait strategies.
+
+Crawls the same fixture symbols once per wait_until mode. Every mode still
+waits for the populated financials table, so the difference is what else the
+page load waits for (the fixture's slow image delays "load").
+
+    python -m benchmarks.wait_bench --symbols 10 --asset-latency-ms 500
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import utc_timestamp, write_results
+from benchmarks.fetch_bench import run_fetch_benchmark
+from benchmarks.fixture_server import FixtureConfig
+from utils.logger import get_logger
+
+logger = get_logger()
+
+WAIT_STRATEGIES = ("load", "domcontentloaded", "commit")
+
+
+async def run_wait_benchmark(config: FixtureConfig, strategies=WAIT_STRATEGIES, headless: bool = True) -> dict:
+    runs = {}
+    for wait_until in strategies:
+        # a full load per report, so every report measures the wait strategy
+        result = await run_fetch_benchmark(
+            config, headless=headless, wait_until=wait_until, strategy="page_per_report"
+        )
+        runs[wait_until] = {
+            "report_latency_seconds": result["report_latency_seconds"],
+            "symbols_per_minute": result["crawl"]["symbols_per_minute"],
+            "reports_failed": result["crawl"]["reports_failed"],
+            "table_ready_seconds": result["stage_seconds"].get("table_ready"),
+        }
+    return {"benchmark": "wait", "timestamp": utc_timestamp(), "strategies": runs}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare navigation wait strategies on the fixture server")
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--asset-latency-ms", type=float, default=300.0)
+    parser.add_argument("--page-weight-kb", type=int, default=100)
+    parser.add_argument("--strategies", default=",".join(WAIT_STRATEGIES))
+    parser.add_argument("--output", help="result json path, defaults to benchmarks/results/wait-<time>.json")
+    args = parser.parse_args()
+
+    config = FixtureConfig(
+        symbols=args.symbols,
+        latency_ms=args.latency_ms,
+        asset_latency_ms=args.asset_latency_ms,
+        page_weight_kb=args.page_weight_kb,
+    )
+    results = asyncio.run(run_wait_benchmark(config, args.strategies.split(",")))
+    path = write_results(results, args.output)
+    for wait_until, run in results["strategies"].items():
+        latency = run["report_latency_seconds"]
+        logger.info(
+            f"{wait_until:<17} report p50 {latency['p50']:.3f}s p95 {latency['p95']:.3f}s "
+            f"{run['symbols_per_minute']:.1f} symbols/min, {run['reports_failed']} failed"
+        )
+    logger.info(f"wait benchmark results -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""value scanner command line.
+
+    python cli.py fetch            crawl the universe (main.py)
+    python cli.py screen [SYM...]  run the screening filters and print the verdicts
+    python cli.py report OUT       render reports for many symbols
+    python cli.py status           universe size, missing reports, crawl status
+    python cli.py negative ...     list / clear reports cached as not existing
+    python cli.py coordinate       split the universe into leased work units (sqlite queue)
+    python cli.py worker           lease units from the queue and fetch them, on any node
+    python cli.py index ...        build / query the metric index over every stored statement
+    python cli.py serve            read-only json api over the results and the metric index
+    python cli.py bench ...        api / fetch / micro / queue / startup / wait benchmarks
+
+Only argparse, the stdlib and config are imported at start up. pandas, scipy and
+playwright are imported inside the subcommands that need them, so light
+commands such as status start fast.
+"""
+import argparse
+import json
+import os
+import sys
+
+from config import (
+    ANNUAL,
+    API_HOST,
+    API_PORT,
+    API_RELOAD_SECONDS,
+    DATA_DIR,
+    EXISTING_STOCKS_FILE_PATH,
+    LEASE_SECONDS,
+    METRIC_INDEX_PATH,
+    NEGATIVE_CACHE_PATH,
+    PROGRESS_STATUS_PATH,
+    FREQUENCIES,
+    STOCKANALYSIS_BASE_URL,
+    STREAM_RESULTS_PATH,
+    UNIVERSE_HISTORY_PATH,
+    WORK_QUEUE_PATH,
+    WORK_UNIT_SIZE,
+)
+from utils.get_symbol_csvs_paths import fetch_frequencies, report_file_names
+
+
+def load_universe() -> dict:
+    from utils.file_handler import load_json_file
+    return load_json_file(EXISTING_STOCKS_FILE_PATH) or {}
+
+
+def cmd_fetch(args):
+    import asyncio
+    from main import main
+    asyncio.run(main(
+        trace_outliers=args.trace_outliers, profile_memory=args.profile_memory, refresh_universe=args.refresh_universe,
+        stream=args.stream, frequencies=fetch_frequencies(args.quarterly),
+    ))
+
+
+def cmd_screen(args):
+    from pipeline.report_maker import generate_reports
+    if args.build_sector_stats:
+        from pipeline.sector_stats import build_sector_stats
+        build_sector_stats(frequency=args.frequency)
+    symbols = args.symbols or list(load_universe())
+    for result in generate_reports(symbols, args.frequency):
+        passed = result["passed"]
+        print(f"{result['symbol']:<8} {result['sector'] or '':<24} {sum(passed.values())}/{len(passed)} checks passed")
+
+
+def cmd_report(args):
+    from pipeline.report_maker import generate_reports
+    from pipeline.report_renderer import render_reports
+    symbols = args.symbols or list(load_universe())
+    render_reports(generate_reports(symbols, args.frequency), args.output, args.format, args.per_symbol, args.template)
+
+
+def cmd_status(args):
+    from utils.get_symbol_csvs_paths import get_missing_reports
+    universe = load_universe()
+    if args.universe:
+        for symbol, info in universe.items():
+            print(f"{symbol:<8} {info.get('sector', '')}")
+        return
+    if args.history:
+        import time
+        from pipeline.universe_diff import format_diff, load_history
+        for entry in load_history(args.history_path)[-args.history:]:
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["timestamp"]))
+            print(f"{when}  {entry['size']} symbols  {format_diff(entry)}")
+            for symbol in entry["added"]:
+                print(f"  + {symbol}")
+            for symbol in entry["removed"]:
+                print(f"  - {symbol}")
+            for move in entry["moved"]:
+                print(f"  ~ {move['symbol']}: {move['from']} -> {move['to']}")
+        return
+
+    complete, partial, missing = [], [], []
+    for symbol in universe:
+        missing_reports = get_missing_reports(symbol, args.data_dir)
+        if not missing_reports:
+            complete.append(symbol)
+        elif len(missing_reports) == len(report_file_names()):
+            missing.append(symbol)
+        else:
+            partial.append((symbol, missing_reports))
+
+    print(f"universe: {len(universe)} symbols ({EXISTING_STOCKS_FILE_PATH})")
+    print(f"complete: {len(complete)}  partial: {len(partial)}  not fetched: {len(missing)}")
+    if args.missing:
+        for symbol, reports in partial:
+            print(f"  {symbol:<8} missing {', '.join(reports)}")
+        for symbol in missing:
+            print(f"  {symbol:<8} missing all")
+    if os.path.exists(NEGATIVE_CACHE_PATH):
+        from pipeline.negative_cache import NegativeCache
+        print(f"known missing (negative cache): {len(NegativeCache().list())} reports")
+    if os.path.exists(WORK_QUEUE_PATH):
+        from pipeline.work_queue import WorkQueue
+        with WorkQueue(WORK_QUEUE_PATH) as queue:
+            print(f"work queue: {queue.stats()}")
+    if os.path.exists(PROGRESS_STATUS_PATH):
+        from pipeline.progress import CrawlProgress
+        with open(PROGRESS_STATUS_PATH) as f:
+            print(f"last crawl: {CrawlProgress.format_line(json.load(f))}")
+
+
+def cmd_negative(args):
+    import time
+    from pipeline.negative_cache import NegativeCache
+    cache = NegativeCache(args.path)
+    if args.action == "clear":
+        removed = cache.clear(args.symbol, args.report, expired_only=args.expired)
+        print(f"removed {removed} entries from {args.path}")
+        return
+    rows = cache.list(args.symbol, include_expired=args.expired)
+    for symbol, report, entry in rows:
+        if args.report and report != args.report:
+            continue
+        expires = time.strftime("%Y-%m-%d", time.localtime(entry["expires_at"]))
+        print(f"{symbol:<8} {report:<14} until {expires}  {entry['reason']}")
+
+
+def _open_queue(args):
+    from pipeline.work_queue import WorkQueue
+    return WorkQueue(args.queue, lease_seconds=args.lease_seconds)
+
+
+def cmd_coordinate(args):
+    from pipeline.crawl_worker import run_coordinator
+    with _open_queue(args) as queue:
+        run_coordinator(queue, unit_size=args.unit_size, reset=args.reset, watch=not args.no_watch)
+        if args.failed:
+            for unit in queue.units("failed"):
+                symbols = ", ".join(company["symbol"] for company in json.loads(unit["companies"]))
+                print(f"unit {unit['id']:<5} {unit['last_error']}: {symbols}")
+
+
+def cmd_worker(args):
+    import asyncio
+    from pipeline.crawl_worker import run_worker
+    with _open_queue(args) as queue:
+        asyncio.run(run_worker(
+            queue, args.id, base_url=args.base_url, data_dir=args.data_dir,
+            negative_cache_path=args.negative_cache, wait_for_work=args.wait, frequencies=fetch_frequencies(args.quarterly),
+        ))
+
+
+def cmd_index(args):
+    import time
+    from pipeline.metric_index import MetricIndex, Where, build_metric_index
+    if args.action == "build":
+        build_metric_index(args.data_dir, args.path)
+        return
+    index = MetricIndex.load(args.path)
+    started = time.perf_counter()
+    where = [Where(metric, op, float(value), last=args.last, quarterly=args.quarterly) for metric, op, value in args.where]
+    scope = dict(where=where, last=args.last, quarterly=args.quarterly, symbols=args.symbol, sectors=args.sector)
+    if args.aggregate:
+        df = index.aggregate(args.select[0], by=None if args.by == "all" else args.by, func=args.aggregate, **scope)
+    else:
+        df = index.select(args.select, **scope)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(df.to_string(float_format=lambda value: f"{value:,.2f}"))
+    print(f"{len(df)} rows in {elapsed_ms:.1f} ms")
+
+
+def cmd_serve(args):
+    from pipeline.api_server import ApiServer
+    server = ApiServer(
+        args.host, args.port, results_path=args.results, index_path=args.index, universe_path=args.universe,
+        reload_seconds=args.reload_seconds,
+    )
+    print(f"serving on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+BENCHMARKS = {
+    "api": "benchmarks.api_bench",
+    "fetch": "benchmarks.fetch_bench",
+    "micro": "benchmarks.micro_bench",
+    "queue": "benchmarks.queue_bench",
+    "startup": "benchmarks.startup_bench",
+    "wait": "benchmarks.wait_bench",
+}
+
+
+def cmd_bench(args):
+    import importlib
+    bench_module = importlib.import_module(BENCHMARKS[args.bench])
+    sys.argv = [f"bench {args.bench}"] + args.bench_args
+    bench_module.main()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="value-scanner", description="value scanner command line")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch = subparsers.add_parser("fetch", help="crawl the universe and store the reports")
+    fetch.add_argument("--trace-outliers", action="store_true", help="keep playwright traces of outlier loads")
+    fetch.add_argument("--profile-memory", action="store_true", help="write a memory timeline")
+    fetch.add_argument("--stream", action="store_true", help="clean, store and screen while fetching")
+    fetch.add_argument("--quarterly", action="store_true", help="also capture the quarterly statements")
+    fetch.add_argument(
+        "--refresh-universe", action="store_true",
+        help="re-crawl the screener, record the diff and fetch only the added symbols",
+    )
+    fetch.set_defaults(func=cmd_fetch)
+
+    screen = subparsers.add_parser("screen", help="run the screening filters")
+    screen.add_argument("symbols", nargs="*", help="defaults to the whole universe")
+    screen.add_argument("--frequency", choices=FREQUENCIES, default=ANNUAL, help="screen annual or quarterly statements")
+    screen.add_argument("--build-sector-stats", action="store_true", help="recompute sector stats first")
+    screen.set_defaults(func=cmd_screen)
+
+    report = subparsers.add_parser("report", help="render screening reports")
+    report.add_argument("output", help="output file, or directory with --per-symbol")
+    report.add_argument("symbols", nargs="*", help="defaults to the whole universe")
+    report.add_argument("--format", choices=["md", "html", "jsonl"], default="md")
+    report.add_argument("--per-symbol", action="store_true")
+    report.add_argument("--frequency", choices=FREQUENCIES, default=ANNUAL)
+    report.add_argument("--template", help="template string or path to a template file")
+    report.set_defaults(func=cmd_report)
+
+    status = subparsers.add_parser("status", help="universe and stored reports overview")
+    status.add_argument("--missing", action="store_true", help="list symbols with missing reports")
+    status.add_argument("--universe", action="store_true", help="only list the universe")
+    status.add_argument("--history", type=int, nargs="?", const=10, metavar="N", help="last N universe refreshes")
+    status.add_argument("--history-path", default=UNIVERSE_HISTORY_PATH)
+    status.add_argument("--data-dir", default=DATA_DIR)
+    status.set_defaults(func=cmd_status)
+
+    negative = subparsers.add_parser("negative", help="reports cached as not existing for a symbol")
+    negative.add_argument("action", choices=["list", "clear"])
+    negative.add_argument("--symbol")
+    negative.add_argument("--report", choices=report_file_names(FREQUENCIES), help="report csv name, e.g. income or income-quarterly")
+    negative.add_argument("--expired", action="store_true", help="list: include expired entries, clear: only expired ones")
+    negative.add_argument("--path", default=NEGATIVE_CACHE_PATH)
+    negative.set_defaults(func=cmd_negative)
+
+    coordinate = subparsers.add_parser("coordinate", help="split the universe into work units for workers")
+    coordinate.add_argument("--queue", default=WORK_QUEUE_PATH, help="sqlite queue shared with the workers")
+    coordinate.add_argument("--unit-size", type=int, default=WORK_UNIT_SIZE, help="companies per unit")
+    coordinate.add_argument("--reset", action="store_true", help="drop the existing units first")
+    coordinate.add_argument("--no-watch", action="store_true", help="only queue the units, do not wait for the workers")
+    coordinate.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS, help="expiry used when re-issuing leases")
+    coordinate.add_argument("--failed", action="store_true", help="list the failed units at the end")
+    coordinate.set_defaults(func=cmd_coordinate)
+
+    worker = subparsers.add_parser("worker", help="fetch units leased from the work queue")
+    worker.add_argument("--queue", default=WORK_QUEUE_PATH)
+    worker.add_argument("--id", help="worker id, defaults to <host>:<pid>")
+    worker.add_argument("--lease-seconds", type=float, default=LEASE_SECONDS, help="lease length, renewed every third of it")
+    worker.add_argument("--wait", action="store_true", help="keep polling for work when the queue is drained")
+    worker.add_argument("--quarterly", action="store_true", help="also capture the quarterly statements")
+    worker.add_argument("--base-url", default=STOCKANALYSIS_BASE_URL)
+    worker.add_argument("--data-dir", default=DATA_DIR)
+    worker.add_argument("--negative-cache", default=NEGATIVE_CACHE_PATH)
+    worker.set_defaults(func=cmd_worker)
+
+    index = subparsers.add_parser("index", help="build or query the metric index over every stored statement")
+    index.add_argument("action", choices=["build", "query"])
+    index.add_argument("--select", action="append", default=[], metavar="METRIC", help="metric name or report/metric, repeatable")
+    index.add_argument(
+        "--where", action="append", nargs=3, default=[], metavar=("METRIC", "OP", "VALUE"),
+        help="keep symbols whose METRIC OP VALUE holds in each of their last --last periods, repeatable",
+    )
+    index.add_argument("--last", type=int, default=1, help="fiscal years (quarters with --quarterly) filtered and shown")
+    index.add_argument("--quarterly", action="store_true")
+    index.add_argument("--sector", action="append", help="limit to sectors, repeatable")
+    index.add_argument("--symbol", action="append", help="limit to symbols, repeatable")
+    index.add_argument("--aggregate", choices=["mean", "median", "min", "max", "sum", "std", "count"], help="aggregate the first --select metric")
+    index.add_argument("--by", choices=["sector", "symbol", "all"], default="sector")
+    index.add_argument("--data-dir", default=DATA_DIR)
+    index.add_argument("--path", default=METRIC_INDEX_PATH)
+    index.set_defaults(func=cmd_index)
+
+    serve = subparsers.add_parser("serve", help="read-only json api over the results and the metric index")
+    serve.add_argument("--host", default=API_HOST)
+    serve.add_argument("--port", type=int, default=API_PORT)
+    serve.add_argument("--results", default=STREAM_RESULTS_PATH, help="screening results jsonl (report --format jsonl, fetch --stream)")
+    serve.add_argument("--index", default=METRIC_INDEX_PATH, help="metric index built by cli.py index build")
+    serve.add_argument("--universe", default=EXISTING_STOCKS_FILE_PATH)
+    serve.add_argument("--reload-seconds", type=float, default=API_RELOAD_SECONDS, help="how often the sources are checked for changes")
+    serve.set_defaults(func=cmd_serve)
+
+    bench = subparsers.add_parser("bench", help="run a benchmark, extra arguments go to the benchmark")
+    bench.add_argument("bench", choices=list(BENCHMARKS))
+    bench.add_argument("bench_args", nargs=argparse.REMAINDER)
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
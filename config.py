@@ -1,6 +1,96 @@
 from enum import Enum 
 
 EXISTING_STOCKS_FILE_PATH = "filtered_companies.json"
+# one json line per universe refresh: symbols added, removed and moved sector (pipeline.universe_diff)
+UNIVERSE_HISTORY_PATH = "data/universe_history.jsonl"
+STOCKANALYSIS_BASE_URL = "https://stockanalysis.com"
+REPORTS_ROUTES = {
+    "income": "/financials/",
+    "balance-sheet": "/financials/balance-sheet/",
+    "cash-flow": "/financials/cash-flow-statement/",
+    "ratios": "/financials/ratios/",
+}
+DATA_DIR = "data"
+ANNUAL, QUARTERLY = "annual", "quarterly"
+# period views a report page can show, quarterly is stored as <report>-quarterly.csv
+FREQUENCIES = [ANNUAL, QUARTERLY]
+# views fetched by default; quarterly is opt-in (cli.py fetch --quarterly, QUARTERLY=1 python main.py)
+# so turning it on does not make every complete ticker "missing" at once
+REPORT_FREQUENCIES = [ANNUAL]
+# the report page's period switch, toggled client side after the annual table was read
+PERIOD_TOGGLE_SELECTORS = {
+    ANNUAL: 'button:text-is("Annual"), a:text-is("Annual")',
+    QUARTERLY: 'button:text-is("Quarterly"), a:text-is("Quarterly")',
+}
+REPORT_TABLE_SELECTOR = "table.financials-table"
+# report pages commit at DOMContentLoaded and are ready once the table has rows, not at "load"
+REPORT_WAIT_UNTIL = "domcontentloaded"
+REPORT_READY_TIMEOUT_MS = 10000
+# "single_page" loads one document per ticker and switches statements with the in-app links,
+# "page_per_report" opens a page and does a full load per report
+REPORT_FETCH_STRATEGY = "single_page"
+SECTOR_STATS_FILE_PATH = "data/sector_stats.csv"
+SECTOR_RANKS_FILE_PATH = "data/sector_ranks.csv"
+SECTOR_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+METRIC_INDEX_PATH = "data/metric_index.npz"  # every stored statement as one symbol x metric x period array
+SCREEN_PERIODS = 5  # fiscal years (or quarters) the screening checks average over
+STAGE_TIMINGS_JSONL_PATH = "metrics/stage_timings.jsonl"
+STAGE_TIMINGS_PROM_PATH = "metrics/value_scanner.prom"
+METRICS_EXPORT_EVERY = 25  # symbols between prometheus textfile rewrites
+PROGRESS_STATUS_PATH = "metrics/crawl_status.json"
+MEMORY_TIMELINE_PATH = "metrics/memory_timeline.jsonl"
+MEMORY_PROFILE_EVERY = 50  # symbols between memory samples
+CONTEXT_MAX_PAGES = 200  # recycle the browser context after this many pages
+CONTEXT_MAX_RSS_MB = 1500  # or when the browser processes use more memory than this
+MAX_SYMBOL_REQUEUES = 2  # times a symbol is retried after a browser crash
+TRACES_DIR = "traces"
+TRACE_LATENCY_PERCENTILE = 95  # keep traces of page loads slower than this percentile
+MAX_TRACES_PER_RUN = 20
+# AIMD page fetch concurrency (utils.aimd)
+FETCH_MIN_CONCURRENCY = 1
+FETCH_MAX_CONCURRENCY = 16
+FETCH_INITIAL_CONCURRENCY = 4
+AIMD_WINDOW = 8  # finished fetches per decision
+AIMD_DECREASE_FACTOR = 0.5
+AIMD_ERROR_THRESHOLD = 0.1  # timeout/error rate that halves the limit
+AIMD_LATENCY_TOLERANCE = 2.0  # p90 above this many times the best median halves the limit
+CONCURRENCY_LOG_PATH = "metrics/concurrency.jsonl"
+# retries per error class (pipeline.fetch_errors), on top of the first attempt
+RETRY_BUDGETS = {"transient": 2, "permanent": 0, "site_wide": 3}
+RETRY_BACKOFF_SECONDS = {"transient": 5, "permanent": 0, "site_wide": 30}
+# circuit breaker over page loads of all tickers (utils.circuit_breaker)
+BREAKER_WINDOW = 20
+BREAKER_MIN_SAMPLES = 10
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_COOLDOWN_SECONDS = 60
+BREAKER_MAX_COOLDOWN_SECONDS = 900
+# reports known not to exist for a symbol (pipeline.negative_cache), expiry per error code
+NEGATIVE_CACHE_PATH = "data/negative_cache.json"
+NEGATIVE_CACHE_TTL_DAYS = {
+    "http_404": 30,
+    "http_410": 30,
+    "paywalled": 30,
+    "no_table": 7,  # could also be a layout change, re-check sooner
+    "default": 7,
+}
+# coordinator / worker crawl over a shared sqlite queue (pipeline.work_queue)
+WORK_QUEUE_PATH = "data/work_queue.sqlite"
+WORK_UNIT_SIZE = 10  # companies per leased unit
+LEASE_SECONDS = 300  # a unit is re-issued when its worker has not renewed the lease for this long
+LEASE_MAX_ATTEMPTS = 3  # leases (failed or expired) before a unit is marked failed
+WORKER_POLL_SECONDS = 5  # idle workers wait this long before asking for a unit again
+WORKER_METRICS_EXPORT_EVERY = 5  # units between prometheus textfile rewrites of a crawl worker
+# streaming fetch -> clean -> store -> screen (pipeline.streaming, cli.py fetch --stream)
+STREAM_QUEUE_SIZE = 32  # items waiting per stage before the stage upstream blocks
+STREAM_CLEAN_WORKERS = 2  # processes cleaning fetched tables
+STREAM_STORE_WORKERS = 1  # threads writing csvs
+STREAM_SCREEN_WORKERS = 2  # processes screening completed symbols
+STREAM_RESULTS_PATH = "data/screen_results.jsonl"
+# read-only json api over the screening results and the metric index (pipeline.api_server, cli.py serve)
+API_HOST = "127.0.0.1"
+API_PORT = 8780
+API_RELOAD_SECONDS = 2.0  # how often the sources are checked for changes, requests never touch disk
+API_RESPONSE_CACHE_SIZE = 4096  # rendered responses kept per loaded snapshot
 
 
 class CsvFiles(Enum):
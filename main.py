@@ -1,12 +1,41 @@
 import asyncio
 import json
+import os
+from collections import Counter, deque
 from pathlib import Path
 
 # Now import fresh
-from playwright_utils import BrowserManager, load_cookies_from_file
+from playwright_utils import (
+    BrowserManager,
+    OutlierTracer,
+    PopupGuard,
+    RecyclingContext,
+    is_browser_crash_error,
+    load_cookies_from_file,
+)
 from pipeline.reports_fetcher import ReportsFetcher
-from pipeline.get_filtered_companies import load_filtered_companies
+from pipeline.get_filtered_companies import load_filtered_companies, refresh_filtered_companies
+from pipeline.progress import CrawlProgress
+from pipeline.negative_cache import NegativeCache
+from pipeline.fetch_setup import fetch_worker_count, make_breaker, make_limiter
 from utils.logger import get_logger
+from utils.timing import get_stage_timer
+from utils.memory_profiler import MemoryProfiler
+from utils.get_symbol_csvs_paths import fetch_frequencies
+from config import (
+    CONTEXT_MAX_PAGES,
+    CONTEXT_MAX_RSS_MB,
+    MAX_SYMBOL_REQUEUES,
+    MAX_TRACES_PER_RUN,
+    MEMORY_PROFILE_EVERY,
+    MEMORY_TIMELINE_PATH,
+    METRICS_EXPORT_EVERY,
+    REPORT_FREQUENCIES,
+    STAGE_TIMINGS_JSONL_PATH,
+    STAGE_TIMINGS_PROM_PATH,
+    TRACE_LATENCY_PERCENTILE,
+    TRACES_DIR,
+)
 
 logger = get_logger()
 
@@ -18,40 +47,131 @@ FINANTIAL_ROUTES = {
 }
 
 
-            
 
 
-async def main():
+async def main(
+    trace_outliers: bool = False,
+    profile_memory: bool = False,
+    refresh_universe: bool = False,
+    stream: bool = False,
+    frequencies: list = REPORT_FREQUENCIES,
+):
+    # Opt-in: keep playwright traces of only the slowest / timed out page loads
+    tracer = OutlierTracer(TRACES_DIR, TRACE_LATENCY_PERCENTILE, max_artifacts=MAX_TRACES_PER_RUN) if trace_outliers else None
     # Advanced interactions example
-    async with BrowserManager(headless=True, slow_mo=100) as manager:
-        async with manager.new_context() as context:
-            # Load cookies into the context
-            cookies = load_cookies_from_file("cookies.txt", domain="stockanalysis.com")
-            await context.add_cookies(cookies)
-            page = await context.new_page()
-
-            companies_dict = await load_filtered_companies(page)
-            if not companies_dict:
-                logger.info("No stocks found after filtering. Exiting.")
+    async with BrowserManager(headless=True, slow_mo=100, outlier_tracer=tracer) as manager:
+        # Cookies are re-applied to every recycled / restarted context
+        cookies = load_cookies_from_file("cookies.txt", domain="stockanalysis.com")
+        # hides modal dialogs in every page of every (recycled) context, no per-page close_popup
+        popup_guard = PopupGuard()
+        async with RecyclingContext(
+            manager, cookies=cookies, max_pages=CONTEXT_MAX_PAGES, max_rss_mb=CONTEXT_MAX_RSS_MB,
+            on_new_context=popup_guard.install,
+        ) as contexts:
+            async with contexts.lease() as context:
+                page = await context.new_page()
+                if refresh_universe:
+                    # daily maintenance: diff the screener against the snapshot, fetch only the new symbols
+                    universe, diff = await refresh_filtered_companies(page)
+                    companies_dict = {symbol: universe[symbol] for symbol in diff["added"]}
+                else:
+                    companies_dict = await load_filtered_companies(page)
+                # Clean up the initial page
                 await page.close()
+            if not companies_dict:
+                logger.info("No stocks to fetch. Exiting.")
                 return
 
-            
-            # Pass context to stock2filter instead of page
-            for symbol, company_info in companies_dict.items():
-                logger.info(f"Processing company: {symbol}")
-                try:
-                    fetcher = ReportsFetcher(context, company_info['symbol'], company_info['href'])
-                    await fetcher.fetch_all_reports()
-                except Exception as e:
-                    logger.info(f"Error processing stock {company_info['symbol']}: {e}")
-            # Clean up the initial page
-            await page.close()
+            timer = get_stage_timer()
+            # pages loading at once, adapted to the site's latency and timeouts
+            limiter = make_limiter()
+            # pauses every fetch while the site as a whole is failing
+            breaker = make_breaker()
+            # reports the site does not have for a symbol are not requested again until they expire
+            negative_cache = NegativeCache()
+            progress = CrawlProgress(total=len(companies_dict))
+            progress.open_pages_probe = contexts.open_pages
+            progress.concurrency_probe = lambda: limiter.limit
+            progress.start()
+            # Opt-in: tracemalloc snapshots + browser RSS every MEMORY_PROFILE_EVERY symbols
+            profiler = MemoryProfiler(MEMORY_TIMELINE_PATH, every=MEMORY_PROFILE_EVERY) if profile_memory else None
+            if profiler:
+                profiler.start()
+            pipeline = None
+            if stream:
+                # fetched tables are cleaned, stored and screened while the crawl goes on
+                from pipeline.streaming import StreamingPipeline
+                pipeline = StreamingPipeline(timer=timer)
+                pipeline.start()
+            pending = deque(companies_dict.items())
+            requeues = Counter()
+            processed = 0
+
+            async def worker():
+                nonlocal processed
+                while pending:
+                    symbol, company_info = pending.popleft()
+                    logger.info(f"Processing company: {symbol}")
+                    progress.start_symbol(symbol)
+                    try:
+                        async with contexts.lease() as context:
+                            fetcher = ReportsFetcher(
+                                context, company_info['symbol'], company_info['href'],
+                                timer=timer, tracer=tracer, limiter=limiter, breaker=breaker,
+                                negative_cache=negative_cache, sink=pipeline.submit if pipeline else None,
+                                frequencies=frequencies,
+                            )
+                            fetched = await fetcher.fetch_all_reports()
+                        progress.finish_symbol(symbol, skipped=not fetched)
+                    except Exception as e:
+                        if is_browser_crash_error(e) and requeues[symbol] < MAX_SYMBOL_REQUEUES:
+                            # The browser died under this job, not the job's fault: run it again
+                            requeues[symbol] += 1
+                            logger.warning(f"browser crashed while processing {symbol}, re-queued ({e})")
+                            progress.requeue_symbol(symbol)
+                            pending.append((symbol, company_info))
+                            continue
+                        logger.info(f"Error processing stock {company_info['symbol']}: {e}")
+                        progress.finish_symbol(symbol, ok=False, error=e)
+                    if pipeline:
+                        # screened with whatever was stored, once its tables are through
+                        await pipeline.symbol_fetched(symbol)
+                    processed += 1
+                    if profiler:
+                        profiler.symbol_done(symbol)
+                    timer.export_jsonl(STAGE_TIMINGS_JSONL_PATH)
+                    if processed % METRICS_EXPORT_EVERY == 0:
+                        timer.export_prometheus(STAGE_TIMINGS_PROM_PATH)
+
+            workers = fetch_worker_count()
+            try:
+                await asyncio.gather(*[worker() for _ in range(workers)])
+                if pipeline:
+                    await pipeline.drain()
+            finally:
+                if pipeline:
+                    pipeline.stop()
+                await progress.stop()
+                if profiler:
+                    profiler.stop()
+                timer.export_jsonl(STAGE_TIMINGS_JSONL_PATH)
+                timer.export_prometheus(STAGE_TIMINGS_PROM_PATH)
+            logger.info(f"page concurrency: {limiter.summary()}, circuit breaker tripped {breaker.trips} times")
+            logger.info(f"popup guard: {popup_guard.stats()}")
+            if pipeline:
+                logger.info(f"streaming pipeline: {pipeline.summary()}")
+            logger.info(f"browser contexts recycled {contexts.recycled} times, browser restarted {contexts.restarts} times")
             
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        asyncio.run(main(
+            trace_outliers=os.environ.get("TRACE_OUTLIERS") == "1",
+            profile_memory=os.environ.get("PROFILE_MEMORY") == "1",
+            refresh_universe=os.environ.get("REFRESH_UNIVERSE") == "1",
+            stream=os.environ.get("STREAM") == "1",
+            frequencies=fetch_frequencies(os.environ.get("QUARTERLY") == "1"),
+        ))
     except KeyboardInterrupt:
         logger.info("\n\nProgram interrupted by user. Exiting cleanly.")
         exit(0)
\ No newline at end of file
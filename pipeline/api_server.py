@@ -0,0 +1,370 @@
+"""Read-only json api over the precomputed screening results, the metric index
+and the universe.
+
+Every source is loaded into an ApiSnapshot. Responses are rendered once per
+snapshot and kept with their ETag, so repeated and conditional
+(If-None-Match) requests are answered from memory. A background thread stats
+the sources every API_RELOAD_SECONDS and swaps in a new snapshot only when one
+of them changed.
+
+    GET /health                          sources, load time, counts
+    GET /universe                        filtered_companies.json
+    GET /results[?sector=S]              every screening result
+    GET /results/<SYMBOL>                one screening result
+    GET /metrics/<SYMBOL>[?metric=M&last=N&quarterly=1]
+    GET /screen?where=M>V&select=M[&last=N&sector=S&symbol=X]
+    GET /aggregate?metric=M[&by=sector|symbol|all&func=median&last=N]
+
+Metrics are enums names or report/metric keys, see pipeline.metric_index.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+from config import (
+    API_HOST,
+    API_PORT,
+    API_RELOAD_SECONDS,
+    API_RESPONSE_CACHE_SIZE,
+    EXISTING_STOCKS_FILE_PATH,
+    METRIC_INDEX_PATH,
+    STREAM_RESULTS_PATH,
+)
+from pipeline.metric_index import AGGREGATIONS, OPERATORS, MetricIndex, Where
+from utils.file_handler import load_json_file
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# "Operating Margin (%)>=20", the longest operators first so ">=" is not read as ">"
+WHERE_PATTERN = re.compile(
+    "^(.+?)(" + "|".join(re.escape(op) for op in sorted(OPERATORS, key=len, reverse=True)) + r")\s*(-?[\d.]+(?:e-?\d+)?)$"
+)
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Response(NamedTuple):
+    status: int
+    body: bytes
+    etag: Optional[str] = None
+
+
+def json_response(payload, status: int = 200) -> Response:
+    body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"' if status == 200 else None
+    return Response(status, body, etag)
+
+
+ENTITY_TAG = re.compile(r'\s*(\*|(?:W/)?"[^"]*")\s*(?:,|$)')
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """If-None-Match check: the header is "*" or a comma separated list of entity
+    tags, compared whole and weakly (a W/ prefix is ignored)"""
+    for tag in ENTITY_TAG.findall(if_none_match or ""):
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def source_signature(paths: dict) -> tuple:
+    "(name, mtime_ns, size) of every source, None for missing ones, the snapshot is reloaded when it changes"
+    signature = []
+    for name, path in sorted(paths.items()):
+        try:
+            stat = os.stat(path)
+            signature.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((name, None, None))
+    return tuple(signature)
+
+
+def load_results(path: str) -> dict:
+    """{symbol: result} from a jsonl of screening results (cli.py report --format jsonl,
+    or the streaming pipeline), the last line of a symbol wins. A line still
+    being written is skipped, the next reload picks it up."""
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record["symbol"]] = record
+    return results
+
+
+def _number(value):
+    "index values are float32, 7 significant digits is what they hold (40.64, not 40.63999938964844)"
+    return None if value is None or math.isnan(value) else float(f"{value:.7g}")
+
+
+class ApiSnapshot:
+    "every served source, loaded once, with the responses rendered from it"
+
+    def __init__(self, paths: dict, cache_size: int = API_RESPONSE_CACHE_SIZE):
+        # taken before reading, a source changing while it loads is reloaded on the next check
+        self.signature = source_signature(paths)
+        self.paths = paths
+        self.loaded_at = time.time()
+        self.results = load_results(paths["results"])
+        self.index = MetricIndex.load(paths["index"]) if os.path.exists(paths["index"]) else None
+        self.companies = (load_json_file(paths["universe"]) if os.path.exists(paths["universe"]) else None) or {}
+        self.respond = lru_cache(maxsize=cache_size)(self._respond)
+
+    def summary(self) -> dict:
+        return {
+            "loaded_at": self.loaded_at,
+            "results": len(self.results),
+            "universe": len(self.companies),
+            "index": None if self.index is None else {
+                "symbols": len(self.index.symbols),
+                "metrics": len(self.index.metrics),
+                "periods": self.index.period_labels,
+                "built_at": self.index.built_at,
+            },
+            "sources": {name: {"path": self.paths[name], "mtime_ns": mtime, "size": size} for name, mtime, size in self.signature},
+        }
+
+    def _respond(self, path: str, query: tuple) -> Response:
+        "response to GET path?query, query as sorted (key, value) pairs so equal requests share the cache entry"
+        params = {}
+        for key, value in query:
+            params.setdefault(key, []).append(value)
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        try:
+            return json_response(self._route(parts, params))
+        except ApiError as e:
+            return json_response({"error": str(e)}, e.status)
+        except (KeyError, ValueError) as e:
+            # unknown metric / period or a malformed filter
+            return json_response({"error": e.args[0] if e.args else str(e)}, 400)
+
+    def _route(self, parts: list, params: dict):
+        if parts == ["universe"]:
+            return self.companies
+        if parts and parts[0] == "results":
+            if len(parts) == 2:
+                result = self.results.get(parts[1].upper())
+                if result is None:
+                    raise ApiError(404, f"no screening result for {parts[1].upper()}")
+                return result
+            sectors = params.get("sector")
+            return [result for result in self.results.values() if not sectors or result.get("sector") in sectors]
+        if parts and parts[0] in ("metrics", "screen", "aggregate"):
+            if self.index is None:
+                raise ApiError(503, f"metric index not built: {self.paths['index']}")
+            if parts[0] == "metrics" and len(parts) == 2:
+                return self._metrics(parts[1].upper(), params)
+            if parts[0] == "screen" and len(parts) == 1:
+                return self._screen(params)
+            if parts[0] == "aggregate" and len(parts) == 1:
+                return self._aggregate(params)
+        raise ApiError(404, f"unknown path /{'/'.join(parts)}")
+
+    @staticmethod
+    def _scope(params: dict) -> dict:
+        return {
+            "last": int(params.get("last", ["1"])[0]),
+            "quarterly": params.get("quarterly", ["0"])[0] in ("1", "true"),
+            "symbols": [symbol.upper() for symbol in params["symbol"]] if "symbol" in params else None,
+            "sectors": params.get("sector"),
+        }
+
+    def _records(self, df) -> list:
+        "select() frame as [{symbol, sector, metrics: {metric: {period: value}}}]"
+        records = []
+        for symbol, row in zip(df.index, df.itertuples(index=False, name=None)):
+            metrics = {}
+            for (metric, period), value in zip(df.columns[1:], row[1:]):
+                metrics.setdefault(metric, {})[period] = _number(value)
+            records.append({"symbol": symbol, "sector": row[0], "metrics": metrics})
+        return records
+
+    def _metrics(self, symbol: str, params: dict) -> dict:
+        if symbol not in self.index.symbols:
+            raise ApiError(404, f"{symbol} is not in the metric index")
+        scope = {**self._scope(params), "symbols": [symbol]}
+        scope["last"] = int(params["last"][0]) if "last" in params else None
+        metrics = params.get("metric") or self.index.metrics.tolist()
+        return self._records(self.index.select(metrics, **scope))[0]
+
+    def _screen(self, params: dict) -> list:
+        scope = self._scope(params)
+        where = []
+        for text in params.get("where", []):
+            match = WHERE_PATTERN.match(text)
+            if not match:
+                raise ApiError(400, f"bad filter {text!r}, expected METRIC OP VALUE such as 'Operating Margin (%)>20'")
+            metric, op, value = match.groups()
+            where.append(Where(metric.strip(), op, float(value), last=scope["last"], quarterly=scope["quarterly"]))
+        return self._records(self.index.select(params.get("select", []), where=where, **scope))
+
+    def _aggregate(self, params: dict) -> dict:
+        if "metric" not in params:
+            raise ApiError(400, "metric is required")
+        func = params.get("func", ["median"])[0]
+        if func not in AGGREGATIONS:
+            raise ApiError(400, f"unknown func {func!r}, use one of {list(AGGREGATIONS)}")
+        by = params.get("by", ["sector"])[0]
+        df = self.index.aggregate(params["metric"][0], by=None if by == "all" else by, func=func, **self._scope(params))
+        return {
+            str(name): {str(col): _number(value) for col, value in zip(df.columns, row)}
+            for name, row in zip(df.index, df.itertuples(index=False, name=None))
+        }
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    server: "ApiHTTPServer"
+    # keep-alive, dashboards poll the same few urls; without nagle the body is not held back by a delayed ack
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def _respond(self, head: bool = False):
+        url = urlsplit(self.path)
+        snapshot = self.server.snapshot
+        if url.path.rstrip("/") == "/health":
+            response = json_response({**snapshot.summary(), "requests": self.server.requests})
+        else:
+            response = snapshot.respond(url.path.rstrip("/") or "/", tuple(sorted(parse_qsl(url.query))))
+        self.server.count_request()
+        if response.etag and etag_matches(response.etag, self.headers.get("If-None-Match")):
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.end_headers()
+            return
+        self.send_response(response.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response.body)))
+        if response.etag:
+            # clients may keep the body but must revalidate, the data changes with every crawl
+            self.send_header("ETag", response.etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(response.body)
+
+    def do_GET(self):  # noqa: N802
+        self._respond()
+
+    def do_HEAD(self):  # noqa: N802
+        self._respond(head=True)
+
+
+class ApiHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, snapshot: ApiSnapshot):
+        super().__init__(address, ApiRequestHandler)
+        self.snapshot = snapshot
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+
+class ApiServer:
+    """Serves the api on a background thread and hot-reloads the sources when they change.
+
+    Example:
+        >>> with ApiServer(port=0) as server:
+        ...     urllib.request.urlopen(f"{server.base_url}/results/AAPL")
+    """
+
+    def __init__(
+        self,
+        host: str = API_HOST,
+        port: int = API_PORT,
+        results_path: str = STREAM_RESULTS_PATH,
+        index_path: str = METRIC_INDEX_PATH,
+        universe_path: str = EXISTING_STOCKS_FILE_PATH,
+        reload_seconds: float = API_RELOAD_SECONDS,
+        cache_size: int = API_RESPONSE_CACHE_SIZE,
+    ):
+        self.paths = {"results": results_path, "index": index_path, "universe": universe_path}
+        self.reload_seconds = reload_seconds
+        self.cache_size = cache_size
+        self.reloads = 0
+        self.httpd = ApiHTTPServer((host, port), self._load())
+        self._stopped = threading.Event()
+        self._threads = []
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _load(self) -> ApiSnapshot:
+        snapshot = ApiSnapshot(self.paths, self.cache_size)
+        logger.info(
+            f"api snapshot loaded: {len(snapshot.results)} results, {len(snapshot.companies)} companies, "
+            f"metric index {'missing' if snapshot.index is None else f'{len(snapshot.index.symbols)} symbols'}"
+        )
+        return snapshot
+
+    def reload_if_changed(self) -> bool:
+        "swap in a new snapshot when a source changed, requests in flight finish on the old one"
+        if source_signature(self.paths) == self.httpd.snapshot.signature:
+            return False
+        try:
+            self.httpd.snapshot = self._load()
+        except Exception as e:
+            # e.g. the index being replaced right now, the old snapshot keeps serving
+            logger.warning(f"api reload failed, serving the previous snapshot: {e}")
+            return False
+        self.reloads += 1
+        return True
+
+    def _watch(self):
+        while not self._stopped.wait(self.reload_seconds):
+            self.reload_if_changed()
+
+    def start(self) -> "ApiServer":
+        self._threads = [
+            threading.Thread(target=self.httpd.serve_forever, daemon=True),
+            threading.Thread(target=self._watch, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def serve_forever(self):
+        "serve on the calling thread until interrupted, reloading in the background"
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self._stopped.set()
+            self.httpd.server_close()
+
+    def stop(self):
+        self._stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "ApiServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: ANN001
+        self.stop()
+        return False
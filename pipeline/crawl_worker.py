@@ -0,0 +1,173 @@
+import asyncio
+import os
+import re
+import socket
+import time
+from config import (
+    DATA_DIR,
+    EXISTING_STOCKS_FILE_PATH,
+    NEGATIVE_CACHE_PATH,
+    REPORT_FREQUENCIES,
+    STAGE_TIMINGS_JSONL_PATH,
+    STAGE_TIMINGS_PROM_PATH,
+    STOCKANALYSIS_BASE_URL,
+    WORK_UNIT_SIZE,
+    WORKER_METRICS_EXPORT_EVERY,
+    WORKER_POLL_SECONDS,
+)
+from pipeline.negative_cache import NegativeCache
+from pipeline.work_queue import WorkQueue
+from utils.file_handler import load_json_file
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def worker_prometheus_path(worker_id: str, path: str = STAGE_TIMINGS_PROM_PATH) -> str:
+    "one textfile per worker next to main.py's, the collector reads every .prom file of the directory"
+    root, ext = os.path.splitext(path)
+    return f"{root}-{re.sub(r'[^A-Za-z0-9_.-]', '_', worker_id)}{ext}"
+
+
+def run_coordinator(
+    queue: WorkQueue,
+    companies_dict: dict = None,
+    unit_size: int = WORK_UNIT_SIZE,
+    reset: bool = False,
+    watch: bool = True,
+    interval: float = WORKER_POLL_SECONDS,
+) -> dict:
+    """Partitions the universe (filtered_companies.json by default) into leased
+    work units, then, with watch, waits for the workers. Returns the queue stats."""
+    if companies_dict is None:
+        companies_dict = load_json_file(EXISTING_STOCKS_FILE_PATH) or {}
+    added = queue.populate(companies_dict, unit_size, reset=reset)
+    logger.info(f"queued {added} units of up to {unit_size} companies in {queue.path}: {queue.stats()}")
+    return watch_queue(queue, interval) if watch else queue.stats()
+
+
+def watch_queue(queue: WorkQueue, interval: float = WORKER_POLL_SECONDS) -> dict:
+    "re-issues expired leases and logs progress until no unit is pending or leased"
+    while not queue.is_finished():
+        time.sleep(interval)
+        queue.requeue_expired()
+        logger.info(f"work queue: {queue.stats()}")
+    return queue.stats()
+
+
+async def _keep_lease(queue: WorkQueue, unit_id: int, worker_id: str):
+    """renews the lease well before it expires, for as long as the unit is being fetched.
+    The queue calls block on sqlite's write lock, they run in a thread so page loads go on"""
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        if not await asyncio.to_thread(queue.renew, unit_id, worker_id):
+            logger.warning(f"{worker_id} lost the lease of unit {unit_id}, it will be fetched again elsewhere")
+            return
+
+
+def retry_reasons(companies: list, results: list) -> list:
+    """why a fetched unit has to be leased again: one line per company whose fetch
+    crashed the browser or failed for a reason that may pass (transient, site-wide).
+    Empty when every company was fetched or is permanently not offered"""
+    from pipeline.fetch_errors import ErrorClass, classify_error
+    from playwright_utils import is_browser_crash_error
+
+    reasons = []
+    for company, error in zip(companies, results):
+        if not isinstance(error, Exception):
+            continue
+        logger.info(f"Error processing stock {company['symbol']}: {error}")
+        if is_browser_crash_error(error):
+            # the browser died under the unit, not the unit's fault
+            reasons.append(f"{company['symbol']}: browser crashed: {error}")
+        elif classify_error(error) != ErrorClass.PERMANENT:
+            # timeouts, 5xx, a site that keeps failing: the next lease may succeed
+            reasons.append(f"{company['symbol']}: {error}")
+    return reasons
+
+
+async def run_worker(
+    queue: WorkQueue,
+    worker_id: str = None,
+    base_url: str = STOCKANALYSIS_BASE_URL,
+    data_dir: str = DATA_DIR,
+    negative_cache_path: str = NEGATIVE_CACHE_PATH,
+    headless: bool = True,
+    wait_for_work: bool = False,
+    poll_seconds: float = WORKER_POLL_SECONDS,
+    frequencies: list = REPORT_FREQUENCIES,
+    timings_path: str = STAGE_TIMINGS_JSONL_PATH,
+) -> int:
+    """Leases units until the queue is drained, fetches every company of a unit
+    with ReportsFetcher and acks it once every company was fetched or failed
+    permanently (the report is not offered). A unit with a crash, transient or
+    site-wide failure is given back to the queue, up to LEASE_MAX_ATTEMPTS.
+    Stops when nothing is pending or leased, or keeps polling with
+    wait_for_work. Stage timings are appended to timings_path after every unit
+    and the worker's prometheus file (worker_prometheus_path) is rewritten every
+    WORKER_METRICS_EXPORT_EVERY units. Returns the number of acked units."""
+    # playwright and the fetch stack are only needed by workers, not by the coordinator
+    from pipeline.fetch_setup import make_breaker, make_limiter
+    from pipeline.reports_fetcher import ReportsFetcher
+    from playwright_utils import BrowserManager, PopupGuard, RecyclingContext, load_cookies_from_file
+    from utils.timing import get_stage_timer
+
+    worker_id = worker_id or default_worker_id()
+    prometheus_path = worker_prometheus_path(worker_id)
+    acked = units_done = 0
+    async with BrowserManager(headless=headless) as manager:
+        cookies = load_cookies_from_file("cookies.txt", domain="stockanalysis.com")
+        popup_guard = PopupGuard()
+        async with RecyclingContext(manager, cookies=cookies, on_new_context=popup_guard.install) as contexts:
+            timer = get_stage_timer()
+            limiter, breaker, negative_cache = make_limiter(), make_breaker(), NegativeCache(negative_cache_path)
+
+            async def fetch_company(company_info: dict):
+                async with contexts.lease() as context:
+                    fetcher = ReportsFetcher(
+                        context, company_info["symbol"], company_info["href"], base_url=base_url,
+                        data_dir=data_dir, timer=timer, limiter=limiter, breaker=breaker,
+                        negative_cache=negative_cache, frequencies=frequencies,
+                    )
+                    await fetcher.fetch_all_reports()
+
+            try:
+                while True:
+                    leased = await asyncio.to_thread(queue.lease, worker_id)
+                    if leased is None:
+                        if not wait_for_work and await asyncio.to_thread(queue.is_finished):
+                            break
+                        await asyncio.sleep(poll_seconds)
+                        continue
+                    unit_id, companies = leased
+                    logger.info(f"{worker_id} leased unit {unit_id}: {', '.join(c['symbol'] for c in companies)}")
+                    heartbeat = asyncio.create_task(_keep_lease(queue, unit_id, worker_id))
+                    try:
+                        results = await asyncio.gather(
+                            *[fetch_company(company) for company in companies], return_exceptions=True
+                        )
+                    finally:
+                        heartbeat.cancel()
+                    retry = retry_reasons(companies, results)
+                    if retry:
+                        # the companies that were stored are skipped on the next lease
+                        await asyncio.to_thread(queue.fail, unit_id, worker_id, "; ".join(retry))
+                    elif await asyncio.to_thread(queue.ack, unit_id, worker_id):
+                        acked += 1
+                    units_done += 1
+                    # exporting drops the records, so a long running worker --wait stays flat
+                    timer.export_jsonl(timings_path)
+                    if units_done % WORKER_METRICS_EXPORT_EVERY == 0:
+                        timer.export_prometheus(prometheus_path, labels={"worker": worker_id})
+            finally:
+                timer.export_jsonl(timings_path)
+                timer.export_prometheus(prometheus_path, labels={"worker": worker_id})
+            logger.info(
+                f"{worker_id} done after {acked} units, page concurrency: {limiter.summary()}, "
+                f"circuit breaker tripped {breaker.trips} times"
+            )
+    return acked
@@ -0,0 +1,59 @@
+from enum import Enum
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+
+class ErrorClass(Enum):
+    TRANSIENT = "transient"  # retry the same page: slow load, a single 5xx
+    PERMANENT = "permanent"  # the site says the report is not offered: 404/410, paywall, page without a statement
+    SITE_WIDE = "site_wide"  # the site as a whole is failing: rate limited, blocked, unreachable
+
+
+class ReportFetchError(Exception):
+    "a report could not be fetched, with the class that decides how it is retried"
+
+    def __init__(self, error_class: ErrorClass, reason: str, code: str = None):
+        super().__init__(f"{error_class.value}: {reason}")
+        self.error_class = error_class
+        self.reason = reason
+        # short machine readable cause, e.g. "http_404", "no_table", "paywalled"
+        self.code = code or error_class.value
+
+
+# Network errors that mean the site (or our connection to it) is down, not one page
+SITE_WIDE_NET_ERRORS = (
+    "net::ERR_CONNECTION_REFUSED",
+    "net::ERR_CONNECTION_RESET",
+    "net::ERR_NAME_NOT_RESOLVED",
+    "net::ERR_INTERNET_DISCONNECTED",
+    "net::ERR_NETWORK_CHANGED",
+    "net::ERR_PROXY_CONNECTION_FAILED",
+    "net::ERR_TUNNEL_CONNECTION_FAILED",
+)
+
+
+def classify_status(status: int) -> ErrorClass:
+    "class of a failed (>= 400) http status of the report page"
+    if status in (403, 429) or status in (502, 503, 504) or status >= 520:
+        # blocked, rate limited or the origin is down
+        return ErrorClass.SITE_WIDE
+    if status in (404, 410):
+        return ErrorClass.PERMANENT
+    # any other 4xx / 5xx is not a statement that the report does not exist
+    return ErrorClass.TRANSIENT
+
+
+def classify_error(error: BaseException) -> ErrorClass:
+    "class of an exception raised while loading or reading a report"
+    if isinstance(error, ReportFetchError):
+        return error.error_class
+    if isinstance(error, PlaywrightTimeoutError):
+        return ErrorClass.TRANSIENT
+    if isinstance(error, PlaywrightError):
+        message = str(error)
+        if any(net_error in message for net_error in SITE_WIDE_NET_ERRORS):
+            return ErrorClass.SITE_WIDE
+        return ErrorClass.TRANSIENT
+    # anything else, pd.read_html "No tables found" on a half rendered page or a parsing bug included,
+    # is retried and never negative cached: only a ReportFetchError raised on an explicit
+    # "report not offered" signal is PERMANENT
+    return ErrorClass.TRANSIENT
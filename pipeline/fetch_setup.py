@@ -0,0 +1,54 @@
+import math
+from config import (
+    AIMD_DECREASE_FACTOR,
+    AIMD_ERROR_THRESHOLD,
+    AIMD_LATENCY_TOLERANCE,
+    AIMD_WINDOW,
+    BREAKER_COOLDOWN_SECONDS,
+    BREAKER_FAILURE_RATE,
+    BREAKER_MAX_COOLDOWN_SECONDS,
+    BREAKER_MIN_SAMPLES,
+    BREAKER_WINDOW,
+    CONCURRENCY_LOG_PATH,
+    FETCH_INITIAL_CONCURRENCY,
+    FETCH_MAX_CONCURRENCY,
+    FETCH_MIN_CONCURRENCY,
+    REPORT_FETCH_STRATEGY,
+    REPORTS_ROUTES,
+)
+from utils.aimd import AimdController
+from utils.circuit_breaker import CircuitBreaker
+
+
+def make_limiter(decisions_path: str = CONCURRENCY_LOG_PATH) -> AimdController:
+    "the AIMD page limit shared by every fetcher of a crawl (main.py or a crawl worker)"
+    return AimdController(
+        min_limit=FETCH_MIN_CONCURRENCY,
+        max_limit=FETCH_MAX_CONCURRENCY,
+        initial_limit=FETCH_INITIAL_CONCURRENCY,
+        decrease_factor=AIMD_DECREASE_FACTOR,
+        window=AIMD_WINDOW,
+        error_threshold=AIMD_ERROR_THRESHOLD,
+        latency_tolerance=AIMD_LATENCY_TOLERANCE,
+        decisions_path=decisions_path,
+    )
+
+
+def make_breaker() -> CircuitBreaker:
+    "the circuit breaker shared by every fetcher of a crawl (main.py or a crawl worker)"
+    return CircuitBreaker(
+        window=BREAKER_WINDOW,
+        min_samples=BREAKER_MIN_SAMPLES,
+        failure_rate=BREAKER_FAILURE_RATE,
+        cooldown=BREAKER_COOLDOWN_SECONDS,
+        max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS,
+    )
+
+
+def fetch_worker_count(strategy: str = REPORT_FETCH_STRATEGY, max_concurrency: int = FETCH_MAX_CONCURRENCY) -> int:
+    """Tickers in flight needed to fill the largest page limit, the limiter does the throttling.
+    single_page loads a ticker's reports one after another, so each ticker holds at most one
+    page load; page_per_report loads all of them at once"""
+    if strategy == "single_page":
+        return max_concurrency + 1
+    return math.ceil(max_concurrency / len(REPORTS_ROUTES)) + 1
@@ -2,8 +2,14 @@ import asyncio
 import json
 from playwright.async_api import Page
 from playwright_utils.close_popup import close_popup
+from playwright_utils.popup_guard import is_popup_guarded
 from utils.file_handler import load_json_file
-from config import EXISTING_STOCKS_FILE_PATH
+from utils.logger import get_logger
+from utils.timing import StageTimer, get_stage_timer
+from pipeline.universe_diff import append_history, diff_universe, format_diff, is_unchanged
+from config import EXISTING_STOCKS_FILE_PATH, STOCKANALYSIS_BASE_URL, UNIVERSE_HISTORY_PATH
+
+logger = get_logger()
 
 
 
@@ -14,43 +20,85 @@ async def load_filtered_companies(page: Page, update_list: bool = False) -> dict
         companies_dict = await get_filtered_companies_from_screener(page)
     return companies_dict
 
-async def get_filtered_companies_from_screener(page: Page) -> dict:
-    """Navigate and wait for button, handling popups."""
+
+async def refresh_filtered_companies(
+    page: Page,
+    output_path: str = EXISTING_STOCKS_FILE_PATH,
+    history_path: str = UNIVERSE_HISTORY_PATH,
+) -> tuple:
+    """Re-crawls the screener and diffs the result against the stored snapshot.
+    The diff is appended to the history and the snapshot replaced. Returns
+    (companies_dict, diff), diff["added"] being the symbols that need a fetch."""
+    old_companies = load_json_file(output_path) or {}
+    companies_dict = await get_filtered_companies_from_screener(page, output_path=None)
+    if not companies_dict:
+        # an empty screener is a failed crawl, not a universe without stocks: keep the snapshot
+        logger.warning("screener returned no companies, keeping the stored universe")
+        return old_companies, diff_universe(old_companies, old_companies)
+    diff = diff_universe(old_companies, companies_dict)
+    append_history(diff, len(companies_dict), history_path)
+    with open(output_path, "w") as f:
+        json.dump(companies_dict, f, indent=2)
+    if is_unchanged(diff):
+        logger.info(f"universe unchanged: {len(companies_dict)} symbols")
+    else:
+        logger.info(f"universe refreshed: {len(companies_dict)} symbols, {format_diff(diff)}")
+    return companies_dict, diff
+
+async def get_filtered_companies_from_screener(
+    page: Page,
+    base_url: str = STOCKANALYSIS_BASE_URL,
+    output_path: str = EXISTING_STOCKS_FILE_PATH,
+    timer: StageTimer = None,
+) -> dict:
+    """Navigate and wait for button, handling popups. The result is written to
+    output_path unless it is None."""
+    timer = timer or get_stage_timer()
     # Navigate to URL
-    await page.goto("https://stockanalysis.com/stocks/screener/")
+    with timer.span("screener_navigate"):
+        await page.goto(f"{base_url}/stocks/screener/")
     dict_of_companies = {}
+    page_number = 1
     while True:
-        await close_popup(page)
+        if not is_popup_guarded(page.context):
+            with timer.span("close_popup", report="screener", page=page_number):
+                await close_popup(page)
 
         # Wait for the Next button (specifically with text "Next")
         try:
-            # Target table rows within the main table body
-            rows_locator = page.locator('#main-table tbody tr')
-            rows = await rows_locator.all()
-            # Extract text and href from each row
-            for row in rows:
-                # Symbol and href from first cell (td.sym a)
-                symbol_elem = row.locator('td.sym a')
-                symbol = await symbol_elem.text_content()
-                href = await symbol_elem.get_attribute('href')
-                # Sector from the 6th cell (td with sector class)
-                sector_elem = row.locator('td.sl').last  # Last td.sl should be sector
-                sector = await sector_elem.text_content()
-                dict_of_companies[symbol] = {'symbol': symbol, 'href': href, 'sector': sector}
+            with timer.span("screener_rows", page=page_number):
+                # Target table rows within the main table body
+                rows_locator = page.locator('#main-table tbody tr')
+                rows = await rows_locator.all()
+                # Extract text and href from each row
+                for row in rows:
+                    # Symbol and href from first cell (td.sym a)
+                    symbol_elem = row.locator('td.sym a')
+                    symbol = await symbol_elem.text_content()
+                    href = await symbol_elem.get_attribute('href')
+                    # Sector from the 6th cell (td with sector class)
+                    sector_elem = row.locator('td.sl').last  # Last td.sl should be sector
+                    sector = await sector_elem.text_content()
+                    dict_of_companies[symbol] = {'symbol': symbol, 'href': href, 'sector': sector}
             
-            button = page.locator('button.controls-btn:has-text("Next")')
-            await button.wait_for(state="visible", timeout=5000)
-
-            # Check if button is enabled before clicking
-            if not await button.is_disabled():
-                print("Next button is enabled and ready - clicking...")
-                await button.click()
-                # Wait a bit for page to load
-                await asyncio.sleep(1)
+            with timer.span("screener_next", page=page_number):
+                button = page.locator('button.controls-btn:has-text("Next")')
+                await button.wait_for(state="visible", timeout=5000)
+
+                # Check if button is enabled before clicking
+                next_enabled = not await button.is_disabled()
+                if next_enabled:
+                    print("Next button is enabled and ready - clicking...")
+                    await button.click()
+                    # Wait a bit for page to load
+                    await asyncio.sleep(1)
+            if next_enabled:
+                page_number += 1
             else:
                 print("Button is disabled, breaking...")
-                with open(EXISTING_STOCKS_FILE_PATH, "w") as f:
-                    json.dump(dict_of_companies, f, indent=2)
+                if output_path:
+                    with open(output_path, "w") as f:
+                        json.dump(dict_of_companies, f, indent=2)
                 return dict_of_companies
         except Exception as e:
             print(f"Waiting for button: {e}")
@@ -0,0 +1,282 @@
+import operator
+import os
+import time
+import warnings
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from config import DATA_DIR, EXISTING_STOCKS_FILE_PATH, METRIC_INDEX_PATH, FREQUENCIES, CsvFiles
+from enums import BalanceSheetIndex, CashFlowIndex, IncomeIndex, RatiosIndex
+from utils.file_handler import load_json_file
+from utils.get_symbol_csvs_paths import report_csv_path
+from utils.logger import get_logger
+from utils.period_axis import parse_period, period_from_key
+
+logger = get_logger()
+
+REPORT_ENUMS = {
+    CsvFiles.INCOME.value: IncomeIndex,
+    CsvFiles.BALANCE.value: BalanceSheetIndex,
+    CsvFiles.CASHFLOW.value: CashFlowIndex,
+    CsvFiles.RATIOS.value: RatiosIndex,
+}
+ENUM_REPORTS = {enum: report for report, enum in REPORT_ENUMS.items()}
+
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+AGGREGATIONS = {
+    "mean": np.nanmean,
+    "median": np.nanmedian,
+    "min": np.nanmin,
+    "max": np.nanmax,
+    "sum": np.nansum,
+    "std": np.nanstd,
+    "count": lambda values, axis: np.sum(~np.isnan(values), axis=axis),
+}
+
+
+def metric_key(report: str, metric: str) -> str:
+    return f"{report}/{metric}"
+
+
+def all_metric_keys() -> list:
+    "every enums metric as report/metric, the metric axis of the index"
+    return [metric_key(report, member.value) for report, enum in REPORT_ENUMS.items() for member in enum]
+
+
+def build_metric_index(
+    data_dir: str = DATA_DIR,
+    path: str = METRIC_INDEX_PATH,
+    companies: dict = None,
+    frequencies: list = FREQUENCIES,
+) -> "MetricIndex":
+    """Read every stored statement once into a dense float32 cube
+    values[symbol, metric, period] and save it with its axes as an npz file.
+    The metric axis holds the enums metrics (report/metric), rows the enums
+    do not know are left out; the period axis holds every fiscal year, quarter
+    and TTM seen, newest first."""
+    companies = companies if companies is not None else load_json_file(EXISTING_STOCKS_FILE_PATH) or {}
+    metrics = all_metric_keys()
+    metric_positions = {key: i for i, key in enumerate(metrics)}
+    symbols = sorted(
+        name for name in (os.listdir(data_dir) if os.path.isdir(data_dir) else [])
+        if os.path.isdir(os.path.join(data_dir, name))
+    )
+    # per statement file: symbol, metric positions, row positions, period keys, column positions, values
+    blocks = []
+    for s, symbol in enumerate(symbols):
+        for report in REPORT_ENUMS:
+            for frequency in frequencies:
+                csv_path = report_csv_path(symbol, report, frequency, data_dir)
+                if not os.path.exists(csv_path):
+                    continue
+                df = pd.read_csv(csv_path, index_col=0)
+                rows = [(metric_positions[key], i) for i, key in enumerate(metric_key(report, name) for name in df.index) if key in metric_positions]
+                columns = [(parse_period(column), c) for c, column in enumerate(df.columns)]
+                columns = [(period.key, c) for period, c in columns if period is not None]
+                if not rows or not columns:
+                    continue
+                if any(dtype.kind not in "fiu" for dtype in df.dtypes):
+                    # stray text cells, a csv stored before cleaning coerced them
+                    df = df.apply(pd.to_numeric, errors="coerce")
+                values = df.to_numpy(dtype=np.float32)
+                (m, r), (keys, c) = zip(*rows), zip(*columns)
+                blocks.append((s, list(m), list(r), keys, list(c), values))
+    period_keys = np.array(sorted({key for block in blocks for key in block[3]}, reverse=True), dtype=np.int64)
+    period_positions = {key: i for i, key in enumerate(period_keys.tolist())}
+    cube = np.full((len(symbols), len(metrics), len(period_keys)), np.nan, dtype=np.float32)
+    for s, m, r, keys, c, values in blocks:
+        # the trailing column is in the annual and the quarterly file, the annual one is read first
+        target = np.ix_(m, [period_positions[key] for key in keys])
+        current = cube[s][target]
+        cube[s][target] = np.where(np.isnan(current), values[np.ix_(r, c)], current)
+    index = MetricIndex(
+        symbols=np.array(symbols, dtype=str),
+        sectors=np.array([companies.get(symbol, {}).get("sector") or "" for symbol in symbols], dtype=str),
+        metrics=np.array(metrics, dtype=str),
+        period_keys=period_keys,
+        values=cube,
+        built_at=time.time(),
+    )
+    if path:
+        index.save(path)
+        load_metric_index.cache_clear()
+    logger.info(
+        f"metric index built: {len(symbols)} symbols, {len(metrics)} metrics, {len(period_keys)} periods"
+        + (f" -> {path}" if path else "")
+    )
+    return index
+
+
+@dataclass(frozen=True)
+class Where:
+    """Filter on one metric, evaluated per symbol on its newest `last` fiscal
+    years (or quarters) that have a value, or on explicit period labels.
+    how: "all" periods pass (and all `last` exist), "any" passes, or the "mean" passes."""
+    metric: object  # enums member, "report/metric" or a metric name unique across reports
+    op: str
+    value: float
+    last: int = 1
+    quarterly: bool = False
+    periods: tuple = None
+    how: str = "all"
+
+
+class MetricIndex:
+    """Columnar index over every stored statement, see build_metric_index.
+
+    Example, tickers with an operating margin above 20% in each of their last
+    5 fiscal years, with their latest P/E:
+        >>> index = load_metric_index()
+        >>> index.select(
+        ...     [RatiosIndex.PE_RATIO],
+        ...     where=[Where(IncomeIndex.OPERATING_MARGIN_PERCENT, ">", 20, last=5)],
+        ... )
+        >>> index.aggregate(IncomeIndex.OPERATING_MARGIN_PERCENT, by="sector", func="median", last=5)
+    """
+
+    def __init__(self, symbols, sectors, metrics, period_keys, values, built_at: float = None):
+        self.symbols = symbols
+        self.sectors = sectors
+        self.metrics = metrics
+        self.period_keys = period_keys
+        self.values = values
+        self.built_at = built_at
+        self._metric_positions = {key: i for i, key in enumerate(metrics.tolist())}
+        self._period_positions = {key: i for i, key in enumerate(period_keys.tolist())}
+        self.periods = [period_from_key(key) for key in period_keys.tolist()]
+        self.period_labels = [period.label for period in self.periods]
+        self._symbol_positions = {symbol: i for i, symbol in enumerate(symbols.tolist())}
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path, symbols=self.symbols, sectors=self.sectors, metrics=self.metrics,
+            period_keys=self.period_keys, values=self.values, built_at=np.array(self.built_at or time.time()),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = METRIC_INDEX_PATH) -> "MetricIndex":
+        with np.load(path) as data:
+            return cls(
+                data["symbols"], data["sectors"], data["metrics"], data["period_keys"], data["values"],
+                float(data["built_at"]),
+            )
+
+    def metric_position(self, metric) -> int:
+        "axis position of an enums member, a report/metric key or an unambiguous metric name"
+        if isinstance(metric, Enum):
+            metric = metric_key(ENUM_REPORTS[type(metric)], metric.value)
+        if metric in self._metric_positions:
+            return self._metric_positions[metric]
+        matches = [key for key in self._metric_positions if key.split("/", 1)[1] == metric]
+        if len(matches) == 1:
+            return self._metric_positions[matches[0]]
+        if matches:
+            raise ValueError(f"{metric!r} is in several reports, use one of {matches}")
+        raise KeyError(f"unknown metric {metric!r}")
+
+    def period_positions(self, periods=None, last: int = None, quarterly: bool = False) -> list:
+        "positions of explicit period labels, or of the newest `last` fiscal years (quarters) of the axis"
+        if periods is not None:
+            positions = []
+            for label in periods:
+                period = parse_period(label)
+                if period is None or period.key not in self._period_positions:
+                    raise KeyError(f"unknown period {label!r}")
+                positions.append(self._period_positions[period.key])
+            return positions
+        wanted = [i for i, period in enumerate(self.periods) if (period.is_quarter if quarterly else period.is_fiscal_year)]
+        return wanted[:last]
+
+    def _rows(self, symbols=None, sectors=None) -> np.ndarray:
+        mask = np.ones(len(self.symbols), dtype=bool)
+        if symbols is not None:
+            mask &= np.isin(self.symbols, list(symbols))
+        if sectors is not None:
+            mask &= np.isin(self.sectors, list(sectors))
+        return mask
+
+    def _filter_mask(self, where: Where) -> np.ndarray:
+        m = self.metric_position(where.metric)
+        compare = OPERATORS[where.op]
+        if where.periods is not None:
+            values = self.values[:, m, self.period_positions(where.periods)]
+            in_window = ~np.isnan(values)
+            required = len(where.periods)
+        else:
+            # every symbol's own newest `last` periods with a value, fiscal years do not line up across symbols
+            values = self.values[:, m, self.period_positions(quarterly=where.quarterly)]
+            present = ~np.isnan(values)
+            in_window = present & (np.cumsum(present, axis=1) <= where.last)
+            required = where.last
+        with np.errstate(invalid="ignore"):
+            passed = compare(values, where.value) & in_window
+            if where.how == "all":
+                return passed.sum(axis=1) == required
+            if where.how == "any":
+                return passed.any(axis=1)
+            if where.how == "mean":
+                counts = in_window.sum(axis=1)
+                sums = np.where(in_window, values, 0).sum(axis=1)
+                return (counts > 0) & compare(sums / np.maximum(counts, 1), where.value)
+        raise ValueError(f"unknown how {where.how!r}, use all, any or mean")
+
+    def filter(self, where=(), symbols=None, sectors=None) -> np.ndarray:
+        "boolean row mask of the symbols passing every filter"
+        mask = self._rows(symbols, sectors)
+        for condition in where:
+            mask &= self._filter_mask(condition)
+        return mask
+
+    def select(self, metrics, where=(), periods=None, last: int = 1, quarterly: bool = False, symbols=None, sectors=None) -> pd.DataFrame:
+        """projection of metrics over periods for the symbols passing the filters:
+        one row per symbol (with its sector), columns (metric, period label)"""
+        mask = self.filter(where, symbols, sectors)
+        period_positions = self.period_positions(periods, last, quarterly)
+        metric_positions = [self.metric_position(metric) for metric in metrics]
+        block = self.values[np.ix_(mask, metric_positions, period_positions)]
+        columns = pd.MultiIndex.from_product(
+            [self.metrics[metric_positions].tolist(), [self.period_labels[p] for p in period_positions]],
+            names=["metric", "period"],
+        )
+        df = pd.DataFrame(block.reshape(block.shape[0], len(columns)), index=pd.Index(self.symbols[mask], name="symbol"), columns=columns)
+        df.insert(0, "sector", self.sectors[mask])
+        return df
+
+    def aggregate(
+        self, metric, by: str = "sector", func: str = "median", where=(), periods=None, last: int = 1,
+        quarterly: bool = False, symbols=None, sectors=None,
+    ) -> pd.DataFrame:
+        """aggregate one metric of the symbols passing the filters:
+        by="sector" one row per sector and a column per period, by="symbol" over the periods of each symbol,
+        by=None over all symbols per period"""
+        aggregate = AGGREGATIONS[func]
+        mask = self.filter(where, symbols, sectors)
+        period_positions = self.period_positions(periods, last, quarterly)
+        labels = [self.period_labels[p] for p in period_positions]
+        block = self.values[mask][:, self.metric_position(metric), period_positions].astype(np.float64)
+        with warnings.catch_warnings():
+            # nan aggregations of all-nan slices warn and return nan, nan is the answer here
+            warnings.simplefilter("ignore", RuntimeWarning)
+            if by == "symbol":
+                return pd.DataFrame({func: aggregate(block, axis=1)}, index=pd.Index(self.symbols[mask], name="symbol"))
+            if by is None:
+                return pd.DataFrame([aggregate(block, axis=0)], index=[func], columns=labels)
+            if by != "sector":
+                raise ValueError(f"unknown grouping {by!r}, use sector, symbol or None")
+            groups = self.sectors[mask]
+            names = sorted(set(groups.tolist()))
+            rows = [aggregate(block[groups == name], axis=0) for name in names]
+            return pd.DataFrame(rows, index=pd.Index(names, name="sector"), columns=labels)
+
+
+@lru_cache(maxsize=None)
+def load_metric_index(path: str = METRIC_INDEX_PATH) -> MetricIndex:
+    if not os.path.exists(path):
+        logger.warning(f"metric index not found: {path}, run build_metric_index first")
+        return None
+    return MetricIndex.load(path)
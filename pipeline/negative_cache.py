@@ -0,0 +1,131 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from config import NEGATIVE_CACHE_PATH, NEGATIVE_CACHE_TTL_DAYS
+from utils.logger import get_logger
+
+logger = get_logger()
+
+try:
+    import fcntl
+except ImportError:  # windows, a single crawl process per cache file is assumed there
+    fcntl = None
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class NegativeCache:
+    """Reports known not to exist for a symbol (banks without a cash flow
+    table, recent IPOs, paywalled pages), persisted as
+    {symbol: {report: {reason, code, added_at, expires_at}}} so later runs do
+    not open those pages again until the entry expires. The expiry depends on
+    the cause, see NEGATIVE_CACHE_TTL_DAYS."""
+
+    def __init__(self, path: str = NEGATIVE_CACHE_PATH):
+        self.path = path
+        self.entries: dict = self._read()
+        # changes not saved yet, merged into the file as it is at save time
+        self._added: dict = {}
+        self._removed: set = set()
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(f"Json decode error: {self.path}, starting with an empty negative cache")
+            return {}
+
+    @contextmanager
+    def _locked(self):
+        "exclusive lock shared by every process using the cache file (crawl workers, cli)"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def save(self):
+        """merge this process' changes into the file as other processes left it,
+        under the lock, and replace it atomically"""
+        with self._locked():
+            entries = self._read()
+            for symbol, report in self._removed:
+                reports = entries.get(symbol, {})
+                reports.pop(report, None)
+                if not reports:
+                    entries.pop(symbol, None)
+            for (symbol, report), entry in self._added.items():
+                entries.setdefault(symbol, {})[report] = entry
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        self.entries = entries
+        self._added.clear()
+        self._removed.clear()
+
+    def get(self, symbol: str, report: str) -> dict:
+        "the unexpired entry for (symbol, report), or None"
+        entry = self.entries.get(symbol, {}).get(report)
+        if entry is None or entry["expires_at"] <= time.time():
+            return None
+        return entry
+
+    def add(self, symbol: str, report: str, reason: str, code: str = None, ttl_days: float = None):
+        if ttl_days is None:
+            ttl_days = NEGATIVE_CACHE_TTL_DAYS.get(code, NEGATIVE_CACHE_TTL_DAYS["default"])
+        now = time.time()
+        entry = {
+            "reason": reason,
+            "code": code,
+            "added_at": now,
+            "expires_at": now + ttl_days * DAY_SECONDS,
+        }
+        self.entries.setdefault(symbol, {})[report] = entry
+        self._added[(symbol, report)] = entry
+        self._removed.discard((symbol, report))
+        self.save()
+        logger.info(f"{symbol}/{report} cached as missing for {ttl_days:g} days: {reason}")
+
+    def list(self, symbol: str = None, include_expired: bool = False) -> list:
+        "flat (symbol, report, entry) rows, sorted by symbol and report"
+        now = time.time()
+        rows = []
+        for cached_symbol, reports in sorted(self.entries.items()):
+            if symbol and cached_symbol != symbol:
+                continue
+            for report, entry in sorted(reports.items()):
+                if include_expired or entry["expires_at"] > now:
+                    rows.append((cached_symbol, report, entry))
+        return rows
+
+    def clear(self, symbol: str = None, report: str = None, expired_only: bool = False) -> int:
+        "remove matching entries (all of them without filters), returns how many were removed"
+        now = time.time()
+        removed = 0
+        for cached_symbol in list(self.entries):
+            if symbol and cached_symbol != symbol:
+                continue
+            reports = self.entries[cached_symbol]
+            for cached_report in list(reports):
+                if report and cached_report != report:
+                    continue
+                if expired_only and reports[cached_report]["expires_at"] > now:
+                    continue
+                del reports[cached_report]
+                self._removed.add((cached_symbol, cached_report))
+                self._added.pop((cached_symbol, cached_report), None)
+                removed += 1
+            if not reports:
+                del self.entries[cached_symbol]
+        if removed:
+            self.save()
+        return removed
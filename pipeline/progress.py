@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from typing import Callable, Optional
+from config import PROGRESS_STATUS_PATH
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class CrawlProgress:
+    """Aggregate view of a universe crawl: completed/failed/in-flight counts,
+    rolling throughput, ETA, open pages and concurrency. A background task
+    rewrites a json status file (and optionally a terminal status line)
+    every interval seconds so a run can be tuned while it is in progress."""
+
+    def __init__(
+        self,
+        total: int,
+        status_path: str = PROGRESS_STATUS_PATH,
+        interval: float = 2.0,
+        window: float = 120.0,
+        terminal: bool = None,
+    ):
+        self.total = total
+        self.status_path = status_path
+        self.interval = interval
+        self.window = window
+        self.terminal = sys.stderr.isatty() if terminal is None else terminal
+        self.started_at = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.in_flight: dict = {}
+        self.recent_errors: deque = deque(maxlen=20)
+        self._finished_at: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        # probes set by the caller, e.g. lambda: len(context.pages)
+        self.open_pages_probe: Callable[[], int] = lambda: 0
+        self.concurrency_probe: Callable[[], int] = lambda: len(self.in_flight)
+
+    def start_symbol(self, symbol: str):
+        self.in_flight[symbol] = time.time()
+
+    def requeue_symbol(self, symbol: str):
+        "the symbol went back to the queue (its browser crashed), it is neither in flight nor done"
+        self.in_flight.pop(symbol, None)
+
+    def finish_symbol(self, symbol: str, ok: bool = True, error: Exception = None, skipped: bool = False):
+        self.in_flight.pop(symbol, None)
+        if skipped:
+            self.skipped += 1
+        elif ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+            self.recent_errors.append({"symbol": symbol, "error": repr(error), "ts": time.time()})
+        self._finished_at.append(time.time())
+
+    @property
+    def done(self) -> int:
+        return self.completed + self.failed + self.skipped
+
+    def throughput(self) -> float:
+        "symbols per minute over the rolling window"
+        now = time.time()
+        while self._finished_at and now - self._finished_at[0] > self.window:
+            self._finished_at.popleft()
+        span = min(self.window, now - self.started_at)
+        if not self._finished_at or span <= 0:
+            return 0.0
+        return len(self._finished_at) / span * 60
+
+    def snapshot(self) -> dict:
+        throughput = self.throughput()
+        remaining = max(self.total - self.done, 0)
+        eta_seconds = remaining / throughput * 60 if throughput else None
+        try:
+            open_pages = self.open_pages_probe()
+        except Exception:
+            open_pages = None
+        return {
+            "updated_at": time.time(),
+            "elapsed_seconds": time.time() - self.started_at,
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "in_flight": len(self.in_flight),
+            "in_flight_symbols": sorted(self.in_flight),
+            "remaining": remaining,
+            "throughput_per_minute": round(throughput, 2),
+            "eta_seconds": round(eta_seconds) if eta_seconds is not None else None,
+            "open_pages": open_pages,
+            "concurrency": self.concurrency_probe(),
+            "recent_errors": list(self.recent_errors),
+        }
+
+    def write_status(self, status: dict = None):
+        status = status or self.snapshot()
+        os.makedirs(os.path.dirname(self.status_path) or ".", exist_ok=True)
+        tmp_path = f"{self.status_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(status, f, indent=2)
+        os.replace(tmp_path, self.status_path)
+
+    @staticmethod
+    def format_line(status: dict) -> str:
+        eta = status["eta_seconds"]
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "--:--:--"
+        return (
+            f"{status['completed'] + status['failed'] + status['skipped']}/{status['total']} "
+            f"ok {status['completed']} failed {status['failed']} in-flight {status['in_flight']} | "
+            f"{status['throughput_per_minute']:.1f}/min eta {eta_text} | "
+            f"pages {status['open_pages']} concurrency {status['concurrency']}"
+        )
+
+    def refresh(self):
+        status = self.snapshot()
+        self.write_status(status)
+        if self.terminal:
+            sys.stderr.write("\r\033[K" + self.format_line(status))
+            sys.stderr.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"could not refresh crawl status: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.refresh()
+        if self.terminal:
+            sys.stderr.write("\n")
+        logger.info(self.format_line(self.snapshot()))
+
+
+if __name__ == "__main__":
+    # print the status of a running (or finished) crawl
+    with open(sys.argv[1] if len(sys.argv) > 1 else PROGRESS_STATUS_PATH) as f:
+        print(CrawlProgress.format_line(json.load(f)))
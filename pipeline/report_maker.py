@@ -1,11 +1,13 @@
 from enum import Enum
 import pandas as pd
-import re
 from enums import IncomeIndex, BalanceSheetIndex, RatiosIndex, CashFlowIndex    
 from utils.get_symbol_csvs_paths import get_symbol_csvs_paths
 from utils.logger import get_logger
 from utils.file_handler import load_json_file
-from config import EXISTING_STOCKS_FILE_PATH
+from utils.period_axis import fiscal_year_columns
+from utils.statement_loader import load_rows
+from config import ANNUAL, DATA_DIR, EXISTING_STOCKS_FILE_PATH, QUARTERLY, SCREEN_PERIODS, CsvFiles
+from pipeline.sector_stats import get_sector_percentile, get_sector_median
 
 logger = get_logger()
 
@@ -55,6 +57,7 @@ def has_long_term_debt(balance_df):
     return True  # Row exists
     
 def check_row_data(df: pd.DataFrame, row_index: Enum, years_cols: list, min_avg=0, min_sum=0):
+    "returns (passed, text), a row that can not be read does not pass"
     cols = years_cols if years_cols else df.columns
     try:
         row = df.loc[row_index.value, cols]
@@ -65,33 +68,60 @@ def check_row_data(df: pd.DataFrame, row_index: Enum, years_cols: list, min_avg=
             pass_check = True
         else:
             pass_check =  False
-        return f"**valid?** {pass_check}, avarage: {avg:.2f}, total: {total:.2f}"
+        return pass_check, f"**valid?** {pass_check}, avarage: {avg:.2f}, total: {total:.2f}"
     except Exception as e:
         logger.error(e)
+        return False, None
 
-def generate_report(symbol):
-    csvs_paths = get_symbol_csvs_paths(symbol)
+def check_sector_relative(symbol, sector, report: CsvFiles, row_index: Enum, period: str, frequency: str = ANNUAL):
+    "compare the symbol's value with its sector peers from the precomputed sector stats of the same frequency"
+    percentile = get_sector_percentile(symbol, report.value, row_index.value, period, frequency)
+    median = get_sector_median(sector, report.value, row_index.value, period, frequency)
+    if percentile is None or median is None:
+        return "no sector stats"
+    return f"sector percentile ({period}): {percentile:.0f}, {sector} median: {median:.2f}"
+
+def generate_report(symbol, frequency: str = ANNUAL, data_dir: str = DATA_DIR):
+    "screen one symbol on its annual (default) or quarterly statements stored under data_dir"
+    csvs_paths = get_symbol_csvs_paths(symbol, frequency, data_dir)
     if csvs_paths == None:
         logger.warning(f"not all the csvs exists for {symbol}, skipping")
+        return None
         
     company_secotr = get_symbol_sector(symbol)
-    paths = get_symbol_csvs_paths(symbol)
-    income_df = pd.read_csv(paths["income"], index_col=0)
-    balance_df = pd.read_csv(paths["balance-sheet"], index_col=0)
-    ratios_df = pd.read_csv(paths["ratios"], index_col=0)
+    paths = csvs_paths
+    # parse only the rows the filters need, see utils.statement_loader
+    income_df = load_rows(paths["income"], income_index_rows)
+    balance_df = load_rows(paths["balance-sheet"], balance_index_rows + [BalanceSheetIndex.LONG_TERM_DEBT.value])
+    ratios_df = load_rows(paths["ratios"], ratio_index_rows)
     
     if not validate_all_dfs(income_df, balance_df, ratios_df):
         logger.warning(f"not all df valid for {symbol}, skipping")
-        return
+        return None
     
 
-    # sort years cols to filter only FY 20{/d/d}
-    last_5_years_cols = [col for col in income_df.columns if re.match(r'FY 20\d{2}', col)][:5]
-    last_5_years_cols.sort(reverse=True)
-    first_lesson_filters(symbol, income_df, balance_df, ratios_df, last_5_years_cols)
+    # last 5 fiscal years (or quarters), newest first
+    last_5_years_cols = fiscal_year_columns(income_df.columns, SCREEN_PERIODS, quarterly=frequency == QUARTERLY)
+    result = first_lesson_filters(symbol, income_df, balance_df, ratios_df, last_5_years_cols, company_secotr, frequency)
+    result["frequency"] = frequency
+    return result
+
+
+def generate_reports(symbols, frequency: str = ANNUAL, data_dir: str = DATA_DIR):
+    "lazily screen many symbols, yielding one result at a time for the renderer"
+    for symbol in symbols:
+        try:
+            result = generate_report(symbol, frequency, data_dir)
+        except Exception as e:
+            logger.error(f"failed to screen {symbol}: {e}")
+            continue
+        if result is not None:
+            yield result
 
     
-def first_lesson_filters(sybmol, income_df: pd.DataFrame, balance_df: pd.DataFrame, ratios_df: pd.DataFrame, last_5_years_cols: list):
+def first_lesson_filters(sybmol, income_df: pd.DataFrame, balance_df: pd.DataFrame, ratios_df: pd.DataFrame, last_5_years_cols: list, sector: str = None, frequency: str = ANNUAL) -> dict:
+    """run the first lesson checks, returns the screening result
+    (sub tables, check lines and whether each check passed) for pipeline.report_renderer"""
     # for row in [IncomeIndex.NET_INCOME_GROWTH_PERCENT, IncomeIndex.OPERATING_MARGIN_PERCENT, IncomeIndex.PROFIT_MARGIN_PERCENT]:
     # # meet_up_standard = check_row_data(income_df, row, last_5_years_cols, min_avg=15, min_sum=60)
     # # if not meet_up_standard:
@@ -99,36 +129,57 @@ def first_lesson_filters(sybmol, income_df: pd.DataFrame, balance_df: pd.DataFra
     income_df_sub = income_df.loc[income_index_rows]
     balance_df_sub = balance_df.loc[balance_index_rows]
     ratios_df_sub = ratios_df.loc[ratio_index_rows]
-    net_income_check = check_row_data(income_df, IncomeIndex.NET_INCOME_GROWTH_PERCENT, last_5_years_cols, 10, 35)
-    operating_margin_chceck = check_row_data(income_df, IncomeIndex.OPERATING_MARGIN_PERCENT, last_5_years_cols, 10, 35)
-    profit_margin_check = check_row_data(income_df, IncomeIndex.PROFIT_MARGIN_PERCENT, last_5_years_cols, 10, 35)
-    roe_check = check_row_data(ratios_df, RatiosIndex.RETURN_ON_EQUITY_ROE_PERCENT, last_5_years_cols, 15, 50)
+    net_income_passed, net_income_check = check_row_data(income_df, IncomeIndex.NET_INCOME_GROWTH_PERCENT, last_5_years_cols, 10, 35)
+    operating_margin_passed, operating_margin_chceck = check_row_data(income_df, IncomeIndex.OPERATING_MARGIN_PERCENT, last_5_years_cols, 10, 35)
+    profit_margin_passed, profit_margin_check = check_row_data(income_df, IncomeIndex.PROFIT_MARGIN_PERCENT, last_5_years_cols, 10, 35)
+    roe_passed, roe_check = check_row_data(ratios_df, RatiosIndex.RETURN_ON_EQUITY_ROE_PERCENT, last_5_years_cols, 15, 50)
     
     if has_long_term_debt(balance_df):
         # logger.info("there is a debt")
         working_capital = balance_df.loc[BalanceSheetIndex.WORKING_CAPITAL.value, last_5_years_cols[0]]
         long_term_debt = balance_df.loc[BalanceSheetIndex.LONG_TERM_DEBT.value, last_5_years_cols[0]]
-        working_capital_greater_than_debt = working_capital >= long_term_debt
+        working_capital_greater_than_debt = bool(working_capital >= long_term_debt)
         capital_vs_debt = f"**valid?**: {working_capital_greater_than_debt}, working capital minus debt is ({working_capital} - {long_term_debt}) = {(working_capital - long_term_debt):.2f}"
     else:
+        working_capital_greater_than_debt = True
         capital_vs_debt = f"**valid?**: {True}, There is no long term debt"
 
+    latest_year = last_5_years_cols[0]
+    operating_margin_sector = check_sector_relative(sybmol, sector, CsvFiles.INCOME, IncomeIndex.OPERATING_MARGIN_PERCENT, latest_year, frequency)
+    profit_margin_sector = check_sector_relative(sybmol, sector, CsvFiles.INCOME, IncomeIndex.PROFIT_MARGIN_PERCENT, latest_year, frequency)
+    roe_sector = check_sector_relative(sybmol, sector, CsvFiles.RATIOS, RatiosIndex.RETURN_ON_EQUITY_ROE_PERCENT, latest_year, frequency)
 
-
-    full_md_file = f"""summary for {sybmol}
-\n\n**Income statement**\n{income_df_sub.to_markdown()}
-\n\n**balance statment**\n{balance_df_sub.to_markdown()}
-\n\n**ratios statment**\n{ratios_df_sub.to_markdown()}
-\n\n- net income:  {net_income_check}
-- operting margin:  {operating_margin_chceck}
-- profit margin:  {profit_margin_check}
-- working capital vs long-term debt:  {capital_vs_debt}
-- ROE check:  {roe_check}
-    """
-    
-    with open("short_report.md", "w") as f:
-        f.write(full_md_file)
+    return {
+        "symbol": sybmol,
+        "sector": sector,
+        "periods": list(last_5_years_cols),
+        "tables": {
+            "Income statement": income_df_sub,
+            "balance statment": balance_df_sub,
+            "ratios statment": ratios_df_sub,
+        },
+        "checks": {
+            "net income": net_income_check,
+            "operting margin": operating_margin_chceck,
+            "profit margin": profit_margin_check,
+            "working capital vs long-term debt": capital_vs_debt,
+            "ROE check": roe_check,
+        },
+        "passed": {
+            "net income": net_income_passed,
+            "operting margin": operating_margin_passed,
+            "profit margin": profit_margin_passed,
+            "working capital vs long-term debt": working_capital_greater_than_debt,
+            "ROE check": roe_passed,
+        },
+        "sector_checks": {
+            "operting margin": operating_margin_sector,
+            "profit margin": profit_margin_sector,
+            "ROE": roe_sector,
+        },
+    }
     
     
 if __name__ == "__main__":
-    generate_report("AIT")
\ No newline at end of file
+    from pipeline.report_renderer import render_reports
+    render_reports(generate_reports(["AIT"]), "short_report.md", fmt="md")
@@ -0,0 +1,201 @@
+import html
+import json
+import math
+import os
+from string import Template
+from typing import Iterable
+from utils.logger import get_logger
+
+logger = get_logger()
+
+REPORT_FORMATS = {"md": ".md", "html": ".html", "jsonl": ".jsonl"}
+
+MARKDOWN_TEMPLATE = """summary for $symbol
+
+$tables
+
+$checks
+
+**vs $sector sector**
+$sector_checks
+
+"""
+
+HTML_TEMPLATE = """<section class="report" id="$symbol">
+<h2>summary for $symbol</h2>
+$tables
+<ul class="checks">
+$checks
+</ul>
+<h3>vs $sector sector</h3>
+<ul class="sector-checks">
+$sector_checks
+</ul>
+</section>
+"""
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>value scanner reports</title></head>
+<body>
+"""
+
+HTML_FOOTER = """</body>
+</html>
+"""
+
+
+def format_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def to_json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        return to_json_value(value.item())
+    return value
+
+
+def markdown_table(df) -> str:
+    """pipe table written directly from the frame values, avoids tabulate"""
+    header = [str(df.index.name or "")] + [str(col) for col in df.columns]
+    lines = [
+        "| " + " | ".join(header) + " |",
+        "|:" + "|".join("-" * max(len(h), 3) + ("" if i == 0 else ":") for i, h in enumerate(header)) + "|",
+    ]
+    for index, values in zip(df.index, df.itertuples(index=False, name=None)):
+        lines.append("| " + " | ".join([str(index)] + [format_value(v) for v in values]) + " |")
+    return "\n".join(lines)
+
+
+def html_table(df) -> str:
+    header = "".join(f"<th>{html.escape(str(col))}</th>" for col in df.columns)
+    rows = []
+    for index, values in zip(df.index, df.itertuples(index=False, name=None)):
+        cells = "".join(f"<td>{format_value(v)}</td>" for v in values)
+        rows.append(f"<tr><th>{html.escape(str(index))}</th>{cells}</tr>")
+    return (
+        f"<table><thead><tr><th>{html.escape(str(df.index.name or ''))}</th>{header}</tr></thead>"
+        f"<tbody>{''.join(rows)}</tbody></table>"
+    )
+
+
+class ReportRenderer:
+    """Render screening results (see report_maker.first_lesson_filters) to text.
+
+    Templates are string.Template strings using $symbol, $sector, $tables,
+    $checks and $sector_checks, the jsonl format ignores templates."""
+
+    def __init__(self, fmt: str = "md", template: str = None):
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f"unknown report format {fmt}, expected one of {list(REPORT_FORMATS)}")
+        self.fmt = fmt
+        if template and os.path.exists(template):
+            with open(template) as f:
+                template = f.read()
+        default_template = HTML_TEMPLATE if fmt == "html" else MARKDOWN_TEMPLATE
+        self.template = Template(template or default_template)
+
+    @property
+    def extension(self) -> str:
+        return REPORT_FORMATS[self.fmt]
+
+    def header(self) -> str:
+        return HTML_HEADER if self.fmt == "html" else ""
+
+    def footer(self) -> str:
+        return HTML_FOOTER if self.fmt == "html" else ""
+
+    def render(self, result: dict) -> str:
+        if self.fmt == "jsonl":
+            return self._render_json(result)
+        if self.fmt == "html":
+            tables = "\n".join(
+                f"<h3>{html.escape(name)}</h3>\n{html_table(df)}" for name, df in result["tables"].items()
+            )
+            checks = "\n".join(
+                f"<li>{html.escape(name)}: {html.escape(str(text))}</li>" for name, text in result["checks"].items()
+            )
+            sector_checks = "\n".join(
+                f"<li>{html.escape(name)}: {html.escape(str(text))}</li>" for name, text in result["sector_checks"].items()
+            )
+        else:
+            tables = "\n\n".join(f"**{name}**\n{markdown_table(df)}" for name, df in result["tables"].items())
+            checks = "\n".join(f"- {name}:  {text}" for name, text in result["checks"].items())
+            sector_checks = "\n".join(f"- {name}:  {text}" for name, text in result["sector_checks"].items())
+        return self.template.safe_substitute(
+            symbol=result["symbol"],
+            sector=result.get("sector") or "",
+            tables=tables,
+            checks=checks,
+            sector_checks=sector_checks,
+        )
+
+    def _render_json(self, result: dict) -> str:
+        tables = {
+            name: {
+                str(index): {str(col): to_json_value(v) for col, v in zip(df.columns, values)}
+                for index, values in zip(df.index, df.itertuples(index=False, name=None))
+            }
+            for name, df in result["tables"].items()
+        }
+        record = {**result, "tables": tables}
+        return json.dumps(record, default=str) + "\n"
+
+
+def render_reports(
+    results: Iterable[dict],
+    output_path: str,
+    fmt: str = "md",
+    per_symbol: bool = False,
+    template: str = None,
+) -> int:
+    """Stream rendered results into one file, or one file per symbol inside the
+    output_path directory when per_symbol is set. Results are consumed one at a
+    time so memory stays flat for any number of symbols. Returns the count written."""
+    renderer = ReportRenderer(fmt, template)
+    written = 0
+    if per_symbol:
+        os.makedirs(output_path, exist_ok=True)
+        for result in results:
+            file_path = os.path.join(output_path, f"{result['symbol']}{renderer.extension}")
+            with open(file_path, "w") as f:
+                f.write(renderer.header())
+                f.write(renderer.render(result))
+                f.write(renderer.footer())
+            written += 1
+    else:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write(renderer.header())
+            for result in results:
+                f.write(renderer.render(result))
+                written += 1
+            f.write(renderer.footer())
+    logger.info(f"rendered {written} {fmt} reports to {output_path}")
+    return written
+
+
+if __name__ == "__main__":
+    import argparse
+    from pipeline.report_maker import generate_reports
+    from utils.file_handler import load_json_file
+    from config import EXISTING_STOCKS_FILE_PATH
+
+    parser = argparse.ArgumentParser(description="render screening reports for many symbols")
+    parser.add_argument("output", help="output file, or directory with --per-symbol")
+    parser.add_argument("--format", choices=list(REPORT_FORMATS), default="md")
+    parser.add_argument("--per-symbol", action="store_true")
+    parser.add_argument("--template", help="template string or path to a template file")
+    parser.add_argument("symbols", nargs="*", help="defaults to every symbol in the companies list")
+    args = parser.parse_intermixed_args()
+
+    symbols = args.symbols or list(load_json_file(EXISTING_STOCKS_FILE_PATH) or {})
+    render_reports(generate_reports(symbols), args.output, args.format, args.per_symbol, args.template)
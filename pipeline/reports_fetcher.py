@@ -1,28 +1,50 @@
 import os
+import re
+import time
 import asyncio
+from typing import Awaitable, Callable
 from playwright.async_api import Page, BrowserContext
 from playwright_utils.page_helper import PageHelper
+from playwright_utils.config import WaitUntil
 from playwright.async_api import TimeoutError
 from playwright_utils.close_popup import close_popup
+from playwright_utils.popup_guard import is_popup_guarded
+from playwright_utils.outlier_tracer import OutlierTracer
+from playwright_utils.recycling_context import is_browser_crash_error
 import pandas as pd
 from io import StringIO
 from utils.df_cleaner import full_df_cleaning
+from utils.period_axis import fiscal_year_columns, normalize_period_columns
+from utils.statement_loader import build_row_index
+from utils.get_symbol_csvs_paths import get_missing_reports, report_csv_path, report_file_name
 from utils.logger import get_logger
+from utils.timing import StageTimer, get_stage_timer
+from utils.aimd import AimdController
+from utils.circuit_breaker import CircuitBreaker
+from pipeline.negative_cache import NegativeCache
+from pipeline.fetch_errors import ErrorClass, ReportFetchError, classify_error, classify_status
+from config import (
+    ANNUAL,
+    DATA_DIR,
+    PERIOD_TOGGLE_SELECTORS,
+    QUARTERLY,
+    REPORT_FETCH_STRATEGY,
+    REPORT_FREQUENCIES,
+    REPORT_READY_TIMEOUT_MS,
+    REPORT_TABLE_SELECTOR,
+    REPORT_WAIT_UNTIL,
+    REPORTS_ROUTES,
+    RETRY_BACKOFF_SECONDS,
+    RETRY_BUDGETS,
+    STOCKANALYSIS_BASE_URL,
+)
 
 logger = get_logger()
 
 
-REPORTS_ROUTES = {
-    "income": "/financials/",
-    "balance-sheet": "/financials/balance-sheet/",
-    "cash-flow": "/financials/cash-flow-statement/",
-    "ratios": "/financials/ratios/",
-}
 
-async def extract_html_table_to_df(page: Page, table_selector: str):
-    # Get table HTML
-    table_html = await page.locator(table_selector).inner_html(timeout=3000)
-        
+def parse_html_table(table_html: str) -> pd.DataFrame:
+    "parse the inner html of a financials table into a raw (uncleaned) df"
     # Parse with pandas using StringIO
     df = pd.read_html(StringIO(f"<table>{table_html}</table>"))[0]
     # Flatten multi-level columns if any
@@ -34,70 +56,390 @@ async def extract_html_table_to_df(page: Page, table_selector: str):
     return df
 
 
+def clean_report_df(df: pd.DataFrame) -> pd.DataFrame:
+    "raw html table -> float df with canonical period labels, newest first"
+    # convert all the df to clean floats
+    df = full_df_cleaning(df)
+    # canonical period labels ("Current" -> "TTM"), newest first
+    return normalize_period_columns(df)
+
+
+def store_report_df(df: pd.DataFrame, path: str):
+    "write a cleaned report and the row index the screening reads it through"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path)
+    build_row_index(path)
+
+
+async def extract_html_table_to_df(page: Page, table_selector: str = REPORT_TABLE_SELECTOR):
+    # Get table HTML
+    table_html = await page.locator(table_selector).inner_html(timeout=3000)
+    return parse_html_table(table_html)
+
+
+# The route changed and its table replaced the previous one (or the route rendered without a table)
+IN_PAGE_NAVIGATION_DONE = """([selector, previousTable, path]) => {
+    if (location.pathname.replace(/\\/+/g, "/") !== path) return false;
+    const table = document.querySelector(selector);
+    if (!table) return true;
+    return table.innerHTML !== previousTable && table.querySelectorAll("tbody tr").length > 0;
+}"""
+
+
+QUARTER_HEADER = re.compile(r"^\s*Q[1-4] \d{4}")
+
+# The period switch re-rendered the table with other columns
+TABLE_REPLACED = """([selector, previousTable]) => {
+    const table = document.querySelector(selector);
+    return !!table && table.innerHTML !== previousTable && table.querySelectorAll("tbody tr").length > 0;
+}"""
+
+
 class ReportsFetcher:
-    def __init__(self, context: BrowserContext, ticker: str, href: str):
+    def __init__(
+        self,
+        context: BrowserContext,
+        ticker: str,
+        href: str,
+        base_url: str = STOCKANALYSIS_BASE_URL,
+        data_dir: str = DATA_DIR,
+        timer: StageTimer = None,
+        tracer: OutlierTracer = None,
+        limiter: AimdController = None,
+        breaker: CircuitBreaker = None,
+        negative_cache: NegativeCache = None,
+        wait_until: WaitUntil = REPORT_WAIT_UNTIL,
+        strategy: str = REPORT_FETCH_STRATEGY,
+        frequencies: list = REPORT_FREQUENCIES,
+        sink: Callable[[str, str, str, pd.DataFrame], Awaitable] = None,
+    ):
         self.context = context
         self.ticker = ticker
         self.href = href
+        self.base_url = base_url
+        self.data_dir = data_dir
+        self.timer = timer or get_stage_timer()
+        self.tracer = tracer
+        # shared across fetchers: bounds the pages loading at once over the whole crawl
+        self.limiter = limiter
+        # shared as well: pauses every fetcher while the site is failing
+        self.breaker = breaker
+        self.negative_cache = negative_cache
+        # navigation commits early, the populated table decides when the page is ready
+        self.wait_until = wait_until
+        # "single_page": one document load per ticker, the other reports via in-app links
+        # "page_per_report": a page and a full load for every report, in parallel
+        self.strategy = strategy
+        # period views stored per report, everything but annual comes from the period switch
+        self.frequencies = frequencies
+        # async (symbol, report, frequency, raw df) callable that takes over cleaning and storing,
+        # see pipeline.streaming; without it tables are cleaned and stored inline
+        self.sink = sink
         
+    def get_report_path(self, report_type: str, frequency: str = ANNUAL) -> str:
+        return report_csv_path(self.ticker, report_type, frequency, self.data_dir)
     
-    def is_report_exists(self, report_type: str) -> bool:
-        file_path = f"data/{self.ticker}/{report_type}.csv"
-        return os.path.exists(file_path)
+    def get_report_url_path(self, report_type: str) -> str:
+        "site path of the report, as the in-app links write it (no double slash)"
+        return f"{self.href.rstrip('/')}{REPORTS_ROUTES[report_type]}"
 
-    async def _fetch_report(self, report_type: str):
-        
-        if self.is_report_exists(report_type):
+    def is_report_exists(self, report_type: str, frequency: str = ANNUAL) -> bool:
+        return os.path.exists(self.get_report_path(report_type, frequency))
+
+    def is_known_missing(self, report_type: str, frequency: str = ANNUAL) -> bool:
+        "the negative cache says the site has no such report for the ticker"
+        return self._is_cached_missing(report_file_name(report_type, frequency))
+
+    def _is_cached_missing(self, name: str) -> bool:
+        return self.negative_cache is not None and self.negative_cache.get(self.ticker, name) is not None
+
+    def _cache_missing(self, name: str, error: ReportFetchError):
+        if error.error_class == ErrorClass.PERMANENT and self.negative_cache is not None:
+            self.negative_cache.add(self.ticker, name, error.reason, error.code)
+
+    async def _fetch_report(self, report_type: str, page: Page = None):
+        """fetch one report, in its own page or, when given, in the ticker's shared page.
+        The annual table is read first, then the other REPORT_FREQUENCIES are captured by
+        toggling the period on the same page, without another navigation"""
+        if self.is_known_missing(report_type):
+            return
+        wanted = [
+            frequency for frequency in self.frequencies
+            if not self.is_report_exists(report_type, frequency) and not self.is_known_missing(report_type, frequency)
+        ]
+        if not wanted:
             return
         
-        # Create a new page for this report
-        page = await self.context.new_page()
-        helper = PageHelper(page)
+        labels = {"symbol": self.ticker, "report": report_type}
+        with self.timer.span("report", **labels):
+            shared_page = page is not None
+            if not shared_page:
+                # Create a new page for this report
+                with self.timer.span("new_page", **labels):
+                    page = await self.context.new_page()
+            helper = PageHelper(page)
 
-        try:
-            
-            for _ in range(3):  # Retry up to 3 times
+            try:
                 try:
-                    await helper.navigate(f"https://stockanalysis.com{self.href}{REPORTS_ROUTES[report_type]}")
-                    await close_popup(page)
-                    df = await extract_html_table_to_df(page, "table.financials-table")
-                    break  # Exit retry loop on success
-                except TimeoutError:
-                    logger.warning(f"Timeout while trying to get table HTML, sleeping and retrying...")
-                    await asyncio.sleep(5)
+                    df = await self._load_with_retries(page, helper, report_type, labels, in_page=shared_page)
+                except ReportFetchError as e:
+                    self._cache_missing(report_type, e)
+                    raise
+                if ANNUAL in wanted:
+                    await self._store(df, report_type, ANNUAL, labels)
+                other_frequencies = [frequency for frequency in wanted if frequency != ANNUAL]
+                for frequency in other_frequencies:
+                    await self._capture_period(page, report_type, frequency, labels)
+                if other_frequencies:
+                    await self._restore_annual_view(page, labels)
+                return df
+            finally:
+                # Always close the page after extraction, the shared page is closed by its owner
+                if not shared_page:
+                    await page.close()
+
+    async def _store(self, df: pd.DataFrame, report_type: str, frequency: str, labels: dict):
+        if self.sink is not None:
+            # waits while the cleaning stage is full, which slows the fetchers down
+            with self.timer.span("sink_wait", frequency=frequency, **labels):
+                await self.sink(self.ticker, report_type, frequency, df)
+            return
+        with self.timer.span("clean", frequency=frequency, **labels):
+            df = clean_report_df(df)
+        # Save to data directory
+        with self.timer.span("to_csv", frequency=frequency, **labels):
+            store_report_df(df, self.get_report_path(report_type, frequency))
+
+    async def _capture_period(self, page: Page, report_type: str, frequency: str, labels: dict):
+        "toggle the loaded report to another period view and store its table, failures only skip this view"
+        name = report_file_name(report_type, frequency)
+        try:
+            await self._toggle_period(page, frequency, labels)
+            with self.timer.span("extract_table", frequency=frequency, **labels):
+                df = await extract_html_table_to_df(page)
+            if not fiscal_year_columns(df.columns, quarterly=frequency == QUARTERLY):
+                # locked behind "Upgrade", or the switch did not change the view
+                raise ReportFetchError(ErrorClass.PERMANENT, f"no {frequency} period columns", code="paywalled")
+            await self._store(df, report_type, frequency, labels)
+        except Exception as e:
+            if is_browser_crash_error(e):
+                raise
+            if isinstance(e, ReportFetchError):
+                self._cache_missing(name, e)
+            logger.warning(f"could not capture {self.ticker}/{name}: {e}")
+
+    async def _restore_annual_view(self, page: Page, labels: dict):
+        "leave the page on the annual view for the next in-page navigation"
+        try:
+            quarter_headers = page.locator(f"{REPORT_TABLE_SELECTOR} thead th", has_text=QUARTER_HEADER)
+            if await quarter_headers.count() == 0:
+                return
+            await self._toggle_period(page, ANNUAL, labels)
+        except Exception as e:
+            if is_browser_crash_error(e):
+                raise
+            # the next report notices a quarterly table and does a full load instead
+            logger.warning(f"could not switch {self.ticker} back to annual periods: {e}")
+
+    async def _toggle_period(self, page: Page, frequency: str, labels: dict):
+        "click the period switch and wait for the table to be replaced"
+        toggle = page.locator(PERIOD_TOGGLE_SELECTORS[frequency]).first
+        if await toggle.count() == 0:
+            raise ReportFetchError(ErrorClass.PERMANENT, f"no {frequency} period switch", code="no_period_switch")
+        previous_table = await page.locator(REPORT_TABLE_SELECTOR).first.inner_html()
+        if not is_popup_guarded(self.context):
+            with self.timer.span("close_popup", **labels):
+                await close_popup(page)
+        with self.timer.span("toggle_period", frequency=frequency, **labels):
+            await toggle.click()
+            await page.wait_for_function(
+                TABLE_REPLACED, arg=[REPORT_TABLE_SELECTOR, previous_table], timeout=REPORT_READY_TIMEOUT_MS
+            )
             
-            # convert all the df to clean floats
-            df = full_df_cleaning(df)
-            # Save to data directory
-            os.makedirs("data", exist_ok=True)
-            os.makedirs(f"data/{self.ticker}", exist_ok=True)
-            df.to_csv(f"data/{self.ticker}/{report_type}.csv")
+    async def _load_with_retries(
+        self, page: Page, helper: PageHelper, report_type: str, labels: dict, in_page: bool = False
+    ) -> pd.DataFrame:
+        "load the table, retrying each error class within its own budget (RETRY_BUDGETS)"
+        retries = {error_class: 0 for error_class in ErrorClass}
+        while True:
+            if self.breaker:
+                await self.breaker.wait()
+            try:
+                # retries always do a full navigation, the in-page state is unknown after a failure
+                first_attempt = not any(retries.values())
+                df = await self._load_table(page, helper, report_type, labels, in_page=in_page and first_attempt)
+            except Exception as e:
+                if is_browser_crash_error(e):
+                    # not the site's fault, main re-queues the symbol
+                    self._record_outcome(True)
+                    raise
+                error_class = classify_error(e)
+                self._record_outcome(error_class == ErrorClass.PERMANENT)
+                retries[error_class] += 1
+                if retries[error_class] > RETRY_BUDGETS[error_class.value]:
+                    if isinstance(e, ReportFetchError):
+                        raise
+                    raise ReportFetchError(error_class, f"{type(e).__name__}: {e}", code=type(e).__name__) from e
+                backoff = RETRY_BACKOFF_SECONDS[error_class.value]
+                logger.warning(
+                    f"{error_class.value} error for {self.ticker}/{report_type} ({e}), "
+                    f"retry {retries[error_class]}/{RETRY_BUDGETS[error_class.value]} in {backoff}s"
+                )
+                await asyncio.sleep(backoff)
+                continue
+            self._record_outcome(True)
+            return df
+
+    def _record_outcome(self, ok: bool):
+        if self.breaker:
+            self.breaker.record(ok)
+
+    async def _load_table(
+        self, page: Page, helper: PageHelper, report_type: str, labels: dict, in_page: bool = False
+    ) -> pd.DataFrame:
+        "navigate to the report and read its table, inside a limiter slot when one is set"
+        if self.limiter is None:
+            return await self._navigate_and_extract(page, helper, report_type, labels, in_page)
+        with self.timer.span("slot_wait", **labels):
+            await self.limiter.acquire()
+        try:
+            load_start = time.perf_counter()
+            try:
+                df = await self._navigate_and_extract(page, helper, report_type, labels, in_page)
+            except Exception as e:
+                # a missing page says nothing about how loaded the site is
+                self.limiter.record(time.perf_counter() - load_start, ok=classify_error(e) == ErrorClass.PERMANENT)
+                raise
+            self.limiter.record(time.perf_counter() - load_start)
             return df
         finally:
-            # Always close the page after extraction
-            await page.close()
-            
+            await self.limiter.release()
+
+    async def _navigate_and_extract(
+        self, page: Page, helper: PageHelper, report_type: str, labels: dict, in_page: bool = False
+    ) -> pd.DataFrame:
+        load_start = time.perf_counter()
+        try:
+            if not (in_page and await self._navigate_in_page(page, report_type, labels)):
+                await self._navigate(page, helper, report_type, labels)
+            if not is_popup_guarded(self.context):
+                # no context-level guard installed, fall back to polling for the modal
+                with self.timer.span("close_popup", **labels):
+                    await close_popup(page)
+            with self.timer.span("extract_table", **labels):
+                df = await extract_html_table_to_df(page)
+        except TimeoutError:
+            self._observe_load(report_type, load_start, timed_out=True)
+            raise
+        self._observe_load(report_type, load_start)
+        if len(df.columns) < 2:
+            # every period column held "Upgrade"
+            raise ReportFetchError(ErrorClass.PERMANENT, "no period columns, paywalled", code="paywalled")
+        if not fiscal_year_columns(df.columns) and fiscal_year_columns(df.columns, quarterly=True):
+            # the site kept the quarterly view from an earlier period switch
+            raise ReportFetchError(ErrorClass.TRANSIENT, "table shows quarterly periods", code="wrong_period")
+        return df
+
+    async def _navigate(self, page: Page, helper: PageHelper, report_type: str, labels: dict):
+        "full document load of the report, ready once its table is populated"
+        with self.timer.span("navigate", **labels):
+            response = await helper.goto(
+                f"{self.base_url}{self.href}{REPORTS_ROUTES[report_type]}", wait_until=self.wait_until
+            )
+        if response is not None and response.status >= 400:
+            raise ReportFetchError(
+                classify_status(response.status), f"http {response.status}", code=f"http_{response.status}"
+            )
+        with self.timer.span("table_ready", **labels):
+            try:
+                await helper.wait_for_populated_table(REPORT_TABLE_SELECTOR, timeout=REPORT_READY_TIMEOUT_MS)
+            except TimeoutError:
+                if await page.evaluate("document.readyState") != "loading" and (
+                    await page.locator(REPORT_TABLE_SELECTOR).count() == 0
+                ):
+                    # the page loaded fine but has no financials table: no data or a changed layout
+                    raise ReportFetchError(ErrorClass.PERMANENT, "no financials table on the page", code="no_table")
+                raise
+
+    async def _navigate_in_page(self, page: Page, report_type: str, labels: dict) -> bool:
+        """client-side navigation from the report already shown in the page to report_type,
+        through the site's statement link. False when it is not possible (blank page, no link,
+        or the new route rendered without a table) so the caller falls back to a full load"""
+        table = page.locator(REPORT_TABLE_SELECTOR)
+        if await table.count() == 0:
+            return False
+        path = self.get_report_url_path(report_type)
+        link = page.locator(f'a[href$="{path}"]').first
+        if await link.count() == 0:
+            return False
+        previous_table = await table.first.inner_html()
+        if not is_popup_guarded(self.context):
+            # the modal would swallow the click
+            with self.timer.span("close_popup", **labels):
+                await close_popup(page)
+        with self.timer.span("navigate_in_page", **labels):
+            await link.click()
+            await page.wait_for_function(
+                IN_PAGE_NAVIGATION_DONE,
+                arg=[REPORT_TABLE_SELECTOR, previous_table, path],
+                timeout=REPORT_READY_TIMEOUT_MS,
+            )
+        return await table.count() > 0
+
+    def _observe_load(self, report_type: str, load_start: float, timed_out: bool = False):
+        "feed the page load latency to the outlier tracer, if tracing is enabled"
+        if self.tracer:
+            latency = time.perf_counter() - load_start
+            self.tracer.observe(self.context, latency, timed_out, label=f"{self.ticker}/{report_type}")
+
     def is_report_missing(self) -> bool:
-        if not os.path.exists(f"data/{self.ticker}"):
-            return True
-        wanted_reports = REPORTS_ROUTES.keys()
-        exsisting_reports_in_folder = os.listdir(os.path.join("data", self.ticker)) 
-        
-        missing_reports = []
-        for i, report in enumerate(wanted_reports):
-            if report + ".csv" not in exsisting_reports_in_folder:
-                missing_reports.append(report)
-                
+        missing_reports = [
+            name for name in get_missing_reports(self.ticker, self.data_dir, self.frequencies)
+            if not self._is_cached_missing(name)
+        ]
         if missing_reports:
             logger.info(f"Reports missing for {self.ticker}: {missing_reports}")
             return True
         logger.info(f"All reports exist for {self.ticker}.")
         return False
     
-    async def fetch_all_reports(self):
+    async def _fetch_reports(self) -> list:
+        "fetch every report, returning results and exceptions so the good ones still get stored"
+        if self.strategy != "single_page":
+            tasks = [self._fetch_report(report_type) for report_type in REPORTS_ROUTES.keys()]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        # one page per ticker: the first report is a full load, the rest are in-page navigations
+        with self.timer.span("new_page", symbol=self.ticker):
+            page = await self.context.new_page()
+        results = []
+        try:
+            for report_type in REPORTS_ROUTES.keys():
+                try:
+                    results.append(await self._fetch_report(report_type, page=page))
+                except Exception as e:
+                    results.append(e)
+                    if is_browser_crash_error(e):
+                        # the page is gone, the remaining reports would fail the same way
+                        break
+        finally:
+            await page.close()
+        return results
+
+    async def fetch_all_reports(self) -> bool:
+        "fetch the missing reports, returns False when nothing was missing"
         if not self.is_report_missing():
-            return
+            return False
         
-        tasks = [self._fetch_report(report_type) for report_type in REPORTS_ROUTES.keys()]
-        await asyncio.gather(*tasks)
-        await asyncio.sleep(1)  # brief pause to ensure all file operations complete
\ No newline at end of file
+        if self.tracer:
+            # one trace chunk per ticker, kept only if one of its loads was an outlier
+            async with self.tracer.chunk(self.context, self.ticker):
+                results = await self._fetch_reports()
+        else:
+            results = await self._fetch_reports()
+        await asyncio.sleep(1)  # brief pause to ensure all file operations complete
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # a browser crash wins so main re-queues the symbol
+            raise next((e for e in errors if is_browser_crash_error(e)), errors[0])
+        return True
\ No newline at end of file
@@ -0,0 +1,160 @@
+import os
+from functools import lru_cache
+import pandas as pd
+from config import (
+    ANNUAL,
+    CsvFiles,
+    DATA_DIR,
+    EXISTING_STOCKS_FILE_PATH,
+    FREQUENCIES,
+    SECTOR_QUANTILES,
+    SECTOR_RANKS_FILE_PATH,
+    SECTOR_STATS_FILE_PATH,
+)
+from enums import IncomeIndex, RatiosIndex
+from utils.file_handler import load_json_file
+from utils.get_symbol_csvs_paths import report_csv_path
+from utils.logger import get_logger
+from utils.period_axis import normalize_period_columns
+
+logger = get_logger()
+
+GROUP_KEYS = ["sector", "report", "metric", "period"]
+# the metrics report_maker compares with sector peers, the only ones percentile ranks are kept for
+RANKED_METRICS = {
+    CsvFiles.INCOME.value: [IncomeIndex.OPERATING_MARGIN_PERCENT.value, IncomeIndex.PROFIT_MARGIN_PERCENT.value],
+    CsvFiles.RATIOS.value: [RatiosIndex.RETURN_ON_EQUITY_ROE_PERCENT.value],
+}
+
+
+def sector_stats_path(path: str, frequency: str = ANNUAL) -> str:
+    "stats / ranks file of a frequency, annual keeps the configured name: sector_stats.csv, sector_stats-quarterly.csv"
+    if frequency == ANNUAL:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}-{frequency}{ext}"
+
+
+def load_long_frame(data_dir: str = DATA_DIR, companies: dict = None, frequency: str = ANNUAL) -> pd.DataFrame:
+    """Stack every stored statement of a frequency into one long frame:
+    symbol, sector, report, metric, period, value"""
+    companies = companies if companies is not None else load_json_file(EXISTING_STOCKS_FILE_PATH) or {}
+    frames = []
+    for symbol in sorted(os.listdir(data_dir)) if os.path.isdir(data_dir) else []:
+        symbol_dir = os.path.join(data_dir, symbol)
+        if not os.path.isdir(symbol_dir):
+            continue
+        sector = companies.get(symbol, {}).get("sector")
+        if not sector:
+            logger.info(f"{symbol} has no sector in companies list, skipping")
+            continue
+        for csv_member in CsvFiles:
+            csv_path = report_csv_path(symbol, csv_member.value, frequency, data_dir)
+            if not os.path.exists(csv_path):
+                continue
+            df = normalize_period_columns(pd.read_csv(csv_path, index_col=0))
+            long_df = df.rename_axis("metric").reset_index().melt(
+                id_vars="metric", var_name="period", value_name="value"
+            )
+            long_df["symbol"] = symbol
+            long_df["sector"] = sector
+            long_df["report"] = csv_member.value
+            frames.append(long_df)
+
+    if not frames:
+        return pd.DataFrame(columns=["symbol"] + GROUP_KEYS + ["value"])
+    long_df = pd.concat(frames, ignore_index=True)
+    long_df["value"] = pd.to_numeric(long_df["value"], errors="coerce")
+    return long_df.dropna(subset=["value"])[["symbol"] + GROUP_KEYS + ["value"]]
+
+
+def compute_sector_stats(long_df: pd.DataFrame, quantiles: list = SECTOR_QUANTILES, ranked_metrics: dict = RANKED_METRICS):
+    """One group-by over (sector, report, metric, period) producing the
+    per-group distribution of every metric and, for ranked_metrics
+    ({report: [metric]}), every symbol's percentile rank inside its group.
+
+    Returns (stats_df, ranks_df)."""
+    grouped = long_df.groupby(GROUP_KEYS, sort=True)["value"]
+
+    stats_df = grouped.quantile(quantiles).unstack()
+    stats_df.columns = [f"q{int(q * 100)}" for q in stats_df.columns]
+    stats_df.insert(0, "count", grouped.count())
+    stats_df.insert(1, "mean", grouped.mean())
+    stats_df["median"] = stats_df["q50"] if "q50" in stats_df else grouped.median()
+
+    ranked = pd.Series(False, index=long_df.index)
+    for report, metrics in ranked_metrics.items():
+        ranked |= (long_df["report"] == report) & long_df["metric"].isin(metrics)
+    ranked_df = long_df[ranked]
+    ranks_df = ranked_df.assign(percentile=ranked_df.groupby(GROUP_KEYS)["value"].rank(pct=True) * 100)
+    ranks_df = ranks_df.set_index(["symbol", "report", "metric", "period"]).sort_index()
+    return stats_df, ranks_df
+
+
+def build_sector_stats(
+    data_dir: str = DATA_DIR,
+    stats_path: str = SECTOR_STATS_FILE_PATH,
+    ranks_path: str = SECTOR_RANKS_FILE_PATH,
+    frequency: str = ANNUAL,
+):
+    """Precompute sector statistics of one frequency for every stored ticker and
+    persist them, quarterly ones next to the annual files (see sector_stats_path)"""
+    stats_path, ranks_path = sector_stats_path(stats_path, frequency), sector_stats_path(ranks_path, frequency)
+    long_df = load_long_frame(data_dir, frequency=frequency)
+    if long_df.empty:
+        logger.warning(f"no {frequency} statements found in {data_dir}, sector stats not built")
+        return None, None
+    stats_df, ranks_df = compute_sector_stats(long_df)
+    os.makedirs(os.path.dirname(stats_path) or ".", exist_ok=True)
+    os.makedirs(os.path.dirname(ranks_path) or ".", exist_ok=True)
+    stats_df.to_csv(stats_path)
+    ranks_df.to_csv(ranks_path)
+    load_sector_stats.cache_clear()
+    load_sector_ranks.cache_clear()
+    logger.info(
+        f"{frequency} sector stats built for {long_df['symbol'].nunique()} symbols "
+        f"in {long_df['sector'].nunique()} sectors"
+    )
+    return stats_df, ranks_df
+
+
+@lru_cache(maxsize=None)
+def load_sector_stats(stats_path: str = SECTOR_STATS_FILE_PATH) -> pd.DataFrame:
+    if not os.path.exists(stats_path):
+        logger.warning(f"sector stats not found: {stats_path}, run build_sector_stats first")
+        return None
+    return pd.read_csv(stats_path, index_col=GROUP_KEYS)
+
+
+@lru_cache(maxsize=None)
+def load_sector_ranks(ranks_path: str = SECTOR_RANKS_FILE_PATH) -> pd.DataFrame:
+    if not os.path.exists(ranks_path):
+        logger.warning(f"sector ranks not found: {ranks_path}, run build_sector_stats first")
+        return None
+    return pd.read_csv(ranks_path, index_col=["symbol", "report", "metric", "period"])
+
+
+def get_sector_percentile(symbol: str, report: str, metric: str, period: str, frequency: str = ANNUAL):
+    "percentile (0-100) of the symbol's value among its sector peers, None if unknown or not in RANKED_METRICS"
+    ranks_df = load_sector_ranks(sector_stats_path(SECTOR_RANKS_FILE_PATH, frequency))
+    if ranks_df is None:
+        return None
+    try:
+        return float(ranks_df.loc[(symbol, report, metric, period), "percentile"])
+    except KeyError:
+        return None
+
+
+def get_sector_median(sector: str, report: str, metric: str, period: str, frequency: str = ANNUAL):
+    stats_df = load_sector_stats(sector_stats_path(SECTOR_STATS_FILE_PATH, frequency))
+    if stats_df is None:
+        return None
+    try:
+        return float(stats_df.loc[(sector, report, metric, period), "median"])
+    except KeyError:
+        return None
+
+
+if __name__ == "__main__":
+    for frequency in FREQUENCIES:
+        build_sector_stats(frequency=frequency)
@@ -0,0 +1,26 @@
+import pandas as pd
+
+# Statement data as json, the shape payload_to_df reads:
+# {
+#     "columns": ["TTM", "FY 2024", ...],           # unlocked periods, newest first
+#     "rows": [{"title": "Revenue", "format": "number" | "percent", "values": [391035.0, null, ...]}],
+# }
+# The fetcher does not read payloads: the site's own format is not known until a
+# recorded page (tests/record_pages.py) shows it, tests/test_recorded_pages.py
+# checks the recorded data responses of that shape against their tables.
+
+
+def payload_to_df(payload: dict) -> pd.DataFrame:
+    "raw (uncleaned) statement df from a payload, with the columns and cell strings parse_html_table gives"
+    columns = payload["columns"]
+    records = []
+    for row in payload["rows"]:
+        values = row["values"]
+        if len(values) != len(columns):
+            raise ValueError(f"row {row['title']!r} has {len(values)} values for {len(columns)} periods")
+        percent = row.get("format") == "percent"
+        cells = ["-" if value is None else f"{value}%" if percent else str(value) for value in values]
+        records.append([row["title"], *cells])
+    if not records:
+        raise ValueError("statement payload without rows")
+    return pd.DataFrame(records, columns=["Fiscal Year", *columns])
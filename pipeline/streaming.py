@@ -0,0 +1,213 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple
+import pandas as pd
+from config import (
+    ANNUAL,
+    DATA_DIR,
+    STREAM_CLEAN_WORKERS,
+    STREAM_QUEUE_SIZE,
+    STREAM_RESULTS_PATH,
+    STREAM_SCREEN_WORKERS,
+    STREAM_STORE_WORKERS,
+)
+from pipeline.report_maker import generate_report
+from pipeline.report_renderer import ReportRenderer
+from pipeline.reports_fetcher import clean_report_df, store_report_df
+from utils.get_symbol_csvs_paths import report_csv_path
+from utils.logger import get_logger
+from utils.timing import StageTimer, get_stage_timer
+
+logger = get_logger()
+
+
+class Table(NamedTuple):
+    symbol: str
+    report: str
+    frequency: str
+    df: pd.DataFrame
+
+
+class StreamingPipeline:
+    """fetch -> clean -> store -> screen, each stage fed by a bounded asyncio queue.
+
+    The fetchers hand their raw tables to submit() (ReportsFetcher(sink=...)).
+    Cleaning runs in worker processes, so parsing overlaps the page loads, a
+    writer stores the csvs and, once every table of a symbol is stored and its
+    fetch is over (symbol_fetched), the symbol is screened and its result
+    appended to results_path. Results of earlier runs are kept, stop() leaves
+    the last one of each symbol. Each stage has its own number of workers; a full
+    queue blocks the stage before it, down to the fetchers.
+
+    Example:
+        >>> pipeline = StreamingPipeline()
+        >>> pipeline.start()
+        >>> fetcher = ReportsFetcher(context, symbol, href, sink=pipeline.submit)
+        >>> await fetcher.fetch_all_reports(); await pipeline.symbol_fetched(symbol)
+        >>> await pipeline.drain(); pipeline.stop()
+    """
+
+    def __init__(
+        self,
+        data_dir: str = DATA_DIR,
+        results_path: str = STREAM_RESULTS_PATH,
+        screen_frequency: str = ANNUAL,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        clean_workers: int = STREAM_CLEAN_WORKERS,
+        store_workers: int = STREAM_STORE_WORKERS,
+        screen_workers: int = STREAM_SCREEN_WORKERS,
+        on_result: Callable[[dict], None] = None,
+        timer: StageTimer = None,
+    ):
+        self.data_dir = data_dir
+        self.results_path = results_path
+        self.screen_frequency = screen_frequency
+        self.workers = {"clean": clean_workers, "store": store_workers, "screen": screen_workers}
+        self.on_result = on_result
+        self.timer = timer or get_stage_timer()
+        self.clean_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.store_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.screen_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.counts = Counter()
+        self.first_result_seconds = None
+        # tables of a symbol submitted but not stored yet, and symbols whose fetch is over
+        self._unstored = Counter()
+        self._fetched = set()
+        self._tasks = []
+        self._executor = None
+        self._renderer = ReportRenderer("jsonl")
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        if self.results_path:
+            os.makedirs(os.path.dirname(self.results_path) or ".", exist_ok=True)
+        # spawned, not forked: the workers do not inherit the event loop, the browser pipes or the crawl's memory
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers["clean"] + self.workers["screen"], mp_context=multiprocessing.get_context("spawn")
+        )
+        stages = {"clean": self._clean_worker, "store": self._store_worker, "screen": self._screen_worker}
+        for stage, worker in stages.items():
+            self._tasks += [asyncio.create_task(worker(), name=f"{stage}-{i}") for i in range(self.workers[stage])]
+
+    async def submit(self, symbol: str, report: str, frequency: str, df: pd.DataFrame):
+        "a fetched raw table, waits while the cleaning queue is full"
+        self._unstored[symbol] += 1
+        self.counts["fetched"] += 1
+        await self.clean_queue.put(Table(symbol, report, frequency, df))
+
+    async def symbol_fetched(self, symbol: str):
+        "the fetch of symbol is over (stored, skipped or failed), it is screened once its tables are stored"
+        self._fetched.add(symbol)
+        await self._screen_when_stored(symbol)
+
+    async def _screen_when_stored(self, symbol: str):
+        if symbol in self._fetched and self._unstored[symbol] == 0:
+            self._fetched.discard(symbol)
+            del self._unstored[symbol]
+            await self.screen_queue.put(symbol)
+
+    async def _clean_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            table = await self.clean_queue.get()
+            try:
+                with self.timer.span("stream_clean", symbol=table.symbol, report=table.report):
+                    df = await loop.run_in_executor(self._executor, clean_report_df, table.df)
+                await self.store_queue.put(table._replace(df=df))
+                self.counts["cleaned"] += 1
+            except Exception as e:
+                logger.error(f"could not clean {table.symbol}/{table.report} ({table.frequency}): {e}")
+                self.counts["clean_failed"] += 1
+                await self._table_done(table.symbol)
+            finally:
+                self.clean_queue.task_done()
+
+    async def _store_worker(self):
+        while True:
+            table = await self.store_queue.get()
+            try:
+                path = report_csv_path(table.symbol, table.report, table.frequency, self.data_dir)
+                with self.timer.span("stream_store", symbol=table.symbol, report=table.report):
+                    await asyncio.to_thread(store_report_df, table.df, path)
+                self.counts["stored"] += 1
+            except Exception as e:
+                logger.error(f"could not store {table.symbol}/{table.report} ({table.frequency}): {e}")
+                self.counts["store_failed"] += 1
+            finally:
+                await self._table_done(table.symbol)
+                self.store_queue.task_done()
+
+    async def _table_done(self, symbol: str):
+        self._unstored[symbol] -= 1
+        await self._screen_when_stored(symbol)
+
+    async def _screen_worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            symbol = await self.screen_queue.get()
+            try:
+                with self.timer.span("stream_screen", symbol=symbol):
+                    result = await loop.run_in_executor(
+                        self._executor, generate_report, symbol, self.screen_frequency, self.data_dir
+                    )
+                if result is None:
+                    # incomplete or invalid statements, generate_report logged why
+                    self.counts["screen_skipped"] += 1
+                    continue
+                self._emit(result)
+            except Exception as e:
+                logger.error(f"failed to screen {symbol}: {e}")
+                self.counts["screen_failed"] += 1
+            finally:
+                self.screen_queue.task_done()
+
+    def _emit(self, result: dict):
+        self.counts["screened"] += 1
+        if self.first_result_seconds is None:
+            self.first_result_seconds = time.perf_counter() - self._started_at
+            logger.info(f"first screening result ({result['symbol']}) after {self.first_result_seconds:.1f}s")
+        if self.results_path:
+            with open(self.results_path, "a") as f:
+                f.write(self._renderer.render(result))
+        if self.on_result:
+            self.on_result(result)
+
+    async def drain(self):
+        "waits until every submitted table is stored and every fetched symbol screened"
+        await self.clean_queue.join()
+        await self.store_queue.join()
+        await self.screen_queue.join()
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._executor:
+            self._executor.shutdown(cancel_futures=True)
+        if self.results_path:
+            self._compact_results()
+
+    def _compact_results(self):
+        """rewrite results_path with one line per symbol, the last one appended,
+        so the symbols this run did not screen keep their earlier result"""
+        if not os.path.exists(self.results_path):
+            return
+        lines = {}
+        with open(self.results_path) as f:
+            for line in f:
+                try:
+                    lines[json.loads(line)["symbol"]] = line if line.endswith("\n") else line + "\n"
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        tmp_path = f"{self.results_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.writelines(lines.values())
+        os.replace(tmp_path, self.results_path)
+
+    def summary(self) -> dict:
+        return {**self.counts, "first_result_seconds": self.first_result_seconds}
@@ -0,0 +1,40 @@
+import json
+import os
+import time
+from config import UNIVERSE_HISTORY_PATH
+
+
+def diff_universe(old: dict, new: dict) -> dict:
+    "symbols added to, removed from and moved between sectors of the universe, old and new as {symbol: company_info}"
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "moved": [
+            {"symbol": symbol, "from": old[symbol].get("sector"), "to": new[symbol].get("sector")}
+            for symbol in sorted(set(old) & set(new))
+            if old[symbol].get("sector") != new[symbol].get("sector")
+        ],
+    }
+
+
+def is_unchanged(diff: dict) -> bool:
+    "no symbol added, removed or moved, other company fields may still have changed"
+    return not (diff["added"] or diff["removed"] or diff["moved"])
+
+
+def append_history(diff: dict, size: int, path: str = UNIVERSE_HISTORY_PATH):
+    "one json line per refresh, unchanged refreshes included so the history shows when the universe was checked"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps({"timestamp": time.time(), "size": size, **diff}) + "\n")
+
+
+def load_history(path: str = UNIVERSE_HISTORY_PATH) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def format_diff(diff: dict) -> str:
+    return f"+{len(diff['added'])} added, -{len(diff['removed'])} removed, {len(diff['moved'])} moved sector"
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from config import LEASE_MAX_ATTEMPTS, LEASE_SECONDS, WORK_QUEUE_PATH, WORK_UNIT_SIZE
+from utils.logger import get_logger
+
+logger = get_logger()
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    companies TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    reissued INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_state ON units (state, lease_expires_at);
+"""
+
+
+class WorkQueue:
+    """Work units of the crawl in a SQLite file, shared by any number of worker
+    processes.
+
+    The coordinator splits the universe into units of unit_size companies.
+    A worker leases one unit at a time for lease_seconds and renews the lease
+    while it fetches. When the worker acks, the unit is done. If the worker
+    dies, its lease expires and the next lease() call issues the unit again.
+    A unit that was leased max_attempts times (failed or expired) is marked
+    failed instead of being issued again. Every state change is a single
+    immediate transaction, so concurrent workers never lease the same unit.
+    Within a process the queue may be used from several threads (a worker
+    runs its calls in asyncio.to_thread), they take turns on the connection.
+
+    SQLite locking needs a local disk, or a network filesystem whose locks
+    work; workers on other machines need such a shared path."""
+
+    def __init__(self, path: str = WORK_QUEUE_PATH, lease_seconds: float = LEASE_SECONDS, max_attempts: int = LEASE_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # autocommit, transactions are opened explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        "takes the write lock up front, so the select and the update of a lease cannot interleave"
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def populate(self, companies_dict: dict, unit_size: int = WORK_UNIT_SIZE, reset: bool = False) -> int:
+        """partitions {symbol: company_info} into pending units, returns how many were added.
+        Companies already in a unit are skipped unless reset drops the old units first."""
+        with self._transaction():
+            if reset:
+                self.connection.execute("DELETE FROM units")
+            queued = set()
+            for row in self.connection.execute("SELECT companies FROM units"):
+                queued.update(company["symbol"] for company in json.loads(row["companies"]))
+            companies = [info for symbol, info in companies_dict.items() if symbol not in queued]
+            now = time.time()
+            units = [companies[start:start + unit_size] for start in range(0, len(companies), unit_size)]
+            self.connection.executemany(
+                "INSERT INTO units (companies, updated_at) VALUES (?, ?)",
+                [(json.dumps(unit), now) for unit in units],
+            )
+        return len(units)
+
+    def lease(self, owner: str) -> tuple:
+        "(unit id, [company_info, ...]) leased to owner, or None when nothing is pending"
+        now = time.time()
+        with self._transaction():
+            self._expire(now)
+            row = self.connection.execute(
+                "SELECT id, companies FROM units WHERE state = ? ORDER BY id LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE units SET state = ?, owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ?",
+                (LEASED, owner, now + self.lease_seconds, now, row["id"]),
+            )
+        return row["id"], json.loads(row["companies"])
+
+    def renew(self, unit_id: int, owner: str) -> bool:
+        "extends the lease, False when it expired and the unit went to someone else"
+        now = time.time()
+        with self._transaction():
+            cursor = self.connection.execute(
+                "UPDATE units SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = ?",
+                (now + self.lease_seconds, now, unit_id, owner, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def ack(self, unit_id: int, owner: str) -> bool:
+        "marks the unit done, False when the lease was lost (the unit is then done by its new owner)"
+        with self._transaction():
+            cursor = self.connection.execute(
+                "UPDATE units SET state = ?, lease_expires_at = NULL, last_error = NULL, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (DONE, time.time(), unit_id, owner, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, unit_id: int, owner: str, error: str) -> bool:
+        "gives the unit back for another worker, or marks it failed once its attempts are used up"
+        with self._transaction():
+            cursor = self.connection.execute(
+                "UPDATE units SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "owner = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ? AND owner = ? AND state = ?",
+                (self.max_attempts, FAILED, PENDING, error, time.time(), unit_id, owner, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def requeue_expired(self) -> int:
+        "re-issues the units whose workers stopped renewing, returns how many"
+        with self._transaction():
+            return self._expire(time.time())
+
+    def _expire(self, now: float) -> int:
+        expired = self.connection.execute(
+            "SELECT id, owner, attempts FROM units WHERE state = ? AND lease_expires_at < ?", (LEASED, now)
+        ).fetchall()
+        for row in expired:
+            state = FAILED if row["attempts"] >= self.max_attempts else PENDING
+            logger.warning(f"lease of unit {row['id']} held by {row['owner']} expired, unit is {state}")
+            self.connection.execute(
+                "UPDATE units SET state = ?, owner = NULL, lease_expires_at = NULL, reissued = reissued + 1, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (state, f"lease expired ({row['owner']})", now, row["id"]),
+            )
+        return len(expired)
+
+    def stats(self) -> dict:
+        "units per state, plus the leases that were re-issued after expiring"
+        counts = {state: 0 for state in (PENDING, LEASED, DONE, FAILED)}
+        with self._lock:
+            for row in self.connection.execute("SELECT state, COUNT(*) AS units FROM units GROUP BY state"):
+                counts[row["state"]] = row["units"]
+            counts["reissued"] = self.connection.execute("SELECT COALESCE(SUM(reissued), 0) FROM units").fetchone()[0]
+        return counts
+
+    def units(self, state: str = None) -> list:
+        "unit rows as dicts, optionally of one state"
+        query, params = "SELECT * FROM units", ()
+        if state:
+            query, params = "SELECT * FROM units WHERE state = ?", (state,)
+        with self._lock:
+            return [dict(row) for row in self.connection.execute(f"{query} ORDER BY id", params)]
+
+    def is_finished(self) -> bool:
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM units WHERE state IN (?, ?)", (PENDING, LEASED)
+            ).fetchone()[0] == 0
+
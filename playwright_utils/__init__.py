@@ -3,6 +3,9 @@
 # Core classes
 from .browser_manager import BrowserManager
 from .page_helper import PageHelper
+from .outlier_tracer import OutlierTracer
+from .popup_guard import PopupGuard, is_popup_guarded
+from .recycling_context import RecyclingContext, is_browser_crash_error
 
 # Cookie utilities
 from .cookie_utils import load_cookies_from_file, parse_cookie_string
@@ -25,6 +28,11 @@ __all__ = [
     # Core classes
     "BrowserManager",
     "PageHelper",
+    "OutlierTracer",
+    "PopupGuard",
+    "is_popup_guarded",
+    "RecyclingContext",
+    "is_browser_crash_error",
     # Cookie utilities
     "parse_cookie_string",
     "load_cookies_from_file",
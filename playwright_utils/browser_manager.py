@@ -13,6 +13,7 @@ from playwright.async_api import (
 
 from .config import BrowserType, DEFAULT_VIEWPORT
 from .cookie_utils import load_cookies_from_file
+from .outlier_tracer import OutlierTracer
 
 
 class BrowserManager:
@@ -23,6 +24,7 @@ class BrowserManager:
         browser_type: BrowserType = "chromium",
         headless: bool = True,
         slow_mo: int = 0,
+        outlier_tracer: Optional[OutlierTracer] = None,
     ):
         """
         Initialize browser manager.
@@ -31,10 +33,13 @@ class BrowserManager:
             browser_type: Type of browser to launch
             headless: Whether to run browser in headless mode
             slow_mo: Slow down operations by specified milliseconds
+            outlier_tracer: Opt-in tracer; every new context records trace
+                            chunks and only slow or timed out loads are kept
         """
         self.browser_type = browser_type
         self.headless = headless
         self.slow_mo = slow_mo
+        self.outlier_tracer = outlier_tracer
         self._playwright: Optional[Playwright] = None
         self._browser: Optional[Browser] = None
 
@@ -61,6 +66,10 @@ class BrowserManager:
     async def start(self) -> Browser:
         """Start the browser instance."""
         self._playwright = await async_playwright().start()
+        return await self._launch()
+
+    async def _launch(self) -> Browser:
+        """Launch a browser on the running playwright instance."""
         browser_launcher = getattr(self._playwright, self.browser_type)
 
         # Build launch args for window sizing (only for Chromium in headed mode)
@@ -79,6 +88,29 @@ class BrowserManager:
         )
         return self._browser
 
+    def is_connected(self) -> bool:
+        """Health check: True while the browser process is alive and connected."""
+        return bool(self._browser and self._browser.is_connected())
+
+    async def restart(self) -> Browser:
+        """
+        Relaunch the browser, e.g. after it crashed.
+
+        Contexts and pages of the old browser are gone after a restart.
+
+        Returns:
+            Browser: The new browser instance
+        """
+        try:
+            if self._browser:
+                await self._browser.close()
+        except Exception:
+            # Old browser is usually already dead
+            pass
+        if not self._playwright:
+            return await self.start()
+        return await self._launch()
+
     async def close(self):
         """Close browser and playwright instances."""
         try:
@@ -121,10 +153,14 @@ class BrowserManager:
                 kwargs["viewport"] = DEFAULT_VIEWPORT
 
         context = await self._browser.new_context(**kwargs)
+        if self.outlier_tracer:
+            await self.outlier_tracer.attach(context)
         try:
             yield context
         finally:
             try:
+                if self.outlier_tracer:
+                    await self.outlier_tracer.detach(context)
                 await context.close()
             except Exception:
                 # Suppress cleanup errors
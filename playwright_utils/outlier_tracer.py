@@ -0,0 +1,164 @@
+"""Opt-in Playwright trace capture that only keeps slow or timed out page loads."""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import BrowserContext
+
+from utils.latency_stats import percentile
+from utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_TRACES_DIR = Path("traces")
+
+
+class TraceChunk:
+    """Latencies observed while one trace chunk was recording."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: list[float] = []
+        self.timed_out = False
+        self.reasons: list[str] = []
+
+
+class OutlierTracer:
+    """
+    Records Playwright traces in chunks and persists a chunk only when one of
+    its page loads was an outlier.
+
+    A page load is an outlier when it timed out, or when its latency is above
+    the configured percentile of the latencies seen so far in this run (once
+    at least min_samples loads were observed). Everything else is discarded
+    when the chunk stops, so only the slow tail is written to disk.
+
+    Chunks are context wide in Playwright, so chunks of one context are
+    serialized: with tracing enabled, concurrent tickers sharing a context
+    run one chunk at a time.
+    """
+
+    def __init__(
+        self,
+        output_dir: str | Path = DEFAULT_TRACES_DIR,
+        latency_percentile: float = 95.0,
+        min_samples: int = 20,
+        max_artifacts: int = 20,
+        history_size: int = 1000,
+        screenshots: bool = False,
+        snapshots: bool = True,
+    ):
+        """
+        Initialize outlier tracer.
+
+        Args:
+            output_dir: Directory for persisted trace zips
+            latency_percentile: Loads slower than this percentile are kept
+            min_samples: Loads to observe before the percentile applies
+            max_artifacts: Maximum traces written per run
+            history_size: Number of recent latencies the percentile uses
+            screenshots: Record screenshots in traces (larger and slower)
+            snapshots: Record DOM snapshots in traces
+        """
+        self.output_dir = Path(output_dir)
+        self.latency_percentile = latency_percentile
+        self.min_samples = min_samples
+        self.max_artifacts = max_artifacts
+        self.screenshots = screenshots
+        self.snapshots = snapshots
+        self.history: deque[float] = deque(maxlen=history_size)
+        self.saved: list[Path] = []
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._current: dict[int, TraceChunk] = {}
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.saved) >= self.max_artifacts
+
+    def threshold(self) -> Optional[float]:
+        """Current latency threshold in seconds, None until enough samples."""
+        if len(self.history) < self.min_samples:
+            return None
+        return percentile(list(self.history), self.latency_percentile)
+
+    async def attach(self, context: BrowserContext) -> None:
+        """Start tracing on a context, call once right after creating it."""
+        await context.tracing.start(screenshots=self.screenshots, snapshots=self.snapshots)
+        self._locks[id(context)] = asyncio.Lock()
+
+    async def detach(self, context: BrowserContext) -> None:
+        """Stop tracing on a context without writing anything."""
+        self._locks.pop(id(context), None)
+        try:
+            await context.tracing.stop()
+        except Exception:
+            # Context may already be closed
+            pass
+
+    def observe(self, context: BrowserContext, latency: float, timed_out: bool = False, label: str = "") -> None:
+        """
+        Record one page load.
+
+        Args:
+            context: Context the page belongs to
+            latency: Load latency in seconds
+            timed_out: Whether the load ended in a timeout
+            label: Description used in the kept chunk's reasons
+        """
+        threshold = self.threshold()
+        chunk = self._current.get(id(context))
+        if chunk is not None:
+            chunk.latencies.append(latency)
+            if timed_out:
+                chunk.timed_out = True
+                chunk.reasons.append(f"{label} timed out after {latency:.2f}s")
+            elif threshold is not None and latency > threshold:
+                chunk.reasons.append(
+                    f"{label} took {latency:.2f}s > p{self.latency_percentile:g} {threshold:.2f}s"
+                )
+        if not timed_out:
+            self.history.append(latency)
+
+    @asynccontextmanager
+    async def chunk(self, context: BrowserContext, name: str) -> AsyncIterator[Optional[TraceChunk]]:
+        """
+        Record a trace chunk around a block of page loads.
+
+        Yields None (no tracing) when the context is not attached or the
+        artifact cap was reached.
+
+        Example:
+            >>> async with tracer.chunk(context, "NVDA"):
+            ...     await fetcher.fetch_all_reports()
+        """
+        lock = self._locks.get(id(context))
+        if lock is None or self.is_full:
+            yield None
+            return
+
+        async with lock:
+            chunk = TraceChunk(name)
+            await context.tracing.start_chunk(title=name)
+            self._current[id(context)] = chunk
+            try:
+                yield chunk
+            finally:
+                self._current.pop(id(context), None)
+                await self._finish_chunk(context, chunk)
+
+    async def _finish_chunk(self, context: BrowserContext, chunk: TraceChunk) -> None:
+        try:
+            if chunk.reasons and not self.is_full:
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+                path = self.output_dir / f"{chunk.name}-{int(time.time() * 1000)}.zip"
+                await context.tracing.stop_chunk(path=str(path))
+                self.saved.append(path)
+                logger.info(f"trace kept for {chunk.name} ({'; '.join(chunk.reasons)}) -> {path}")
+            else:
+                # Discard the recording
+                await context.tracing.stop_chunk()
+        except Exception as e:
+            logger.warning(f"could not stop trace chunk for {chunk.name}: {e}")
@@ -6,6 +6,7 @@ from playwright.async_api import (
     ElementHandle,
     Locator,
     Page,
+    Response,
     TimeoutError as PlaywrightTimeoutError,
 )
 
@@ -56,6 +57,55 @@ class PageHelper:
             print(f"Error navigating to {url}: {e}")
             return False
 
+    async def goto(
+        self,
+        url: str,
+        wait_until: WaitUntil = "load",
+        timeout: int = DEFAULT_TIMEOUT,
+    ) -> Optional[Response]:
+        """
+        Navigate to URL and let errors propagate, for callers that classify them.
+
+        Args:
+            url: URL to navigate to
+            wait_until: When to consider navigation succeeded
+            timeout: Maximum navigation time in milliseconds
+
+        Returns:
+            Optional[Response]: Main resource response (None for same-document navigations)
+        """
+        return await self.page.goto(url, wait_until=wait_until, timeout=timeout)
+
+    async def wait_for_populated_table(
+        self,
+        selector: str,
+        row_selector: str = "tbody tr",
+        timeout: int = DEFAULT_TIMEOUT,
+    ) -> None:
+        """
+        Wait until a table has rows and the document is fully parsed.
+
+        Lets navigation commit early (wait_until="commit" or "domcontentloaded")
+        and resolve on the content that matters instead of every subresource.
+
+        Args:
+            selector: CSS selector for the table
+            row_selector: Rows that must exist inside the table
+            timeout: Maximum wait time in milliseconds
+
+        Raises:
+            PlaywrightTimeoutError: If the table is not populated in time
+        """
+        await self.page.wait_for_function(
+            """([selector, rowSelector]) => {
+                const table = document.querySelector(selector);
+                return !!table && table.querySelectorAll(rowSelector).length > 0
+                    && document.readyState !== "loading";
+            }""",
+            arg=[selector, row_selector],
+            timeout=timeout,
+        )
+
     async def screenshot(
         self,
         path: str | Path,
@@ -0,0 +1,92 @@
+"""Context-level popup suppression, installed once instead of polled per navigation."""
+import weakref
+
+from playwright.async_api import BrowserContext
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+MODAL_SELECTOR = '[aria-modal="true"]'
+
+# Runs before any page script. The stylesheet hides modal dialogs (and gives
+# the page its scrolling and clicks back) as soon as they are attached, however
+# late; the observer only reports them so the guard can count what it hid.
+SUPPRESS_SCRIPT = """
+(() => {
+    const selector = %(selector)r;
+    const css = `${selector} { display: none !important; }
+        html, body { overflow: auto !important; pointer-events: auto !important; }`;
+    const seen = new WeakSet();
+    const report = (root) => {
+        const found = root.matches && root.matches(selector) ? [root] : [];
+        if (root.querySelectorAll) found.push(...root.querySelectorAll(selector));
+        for (const node of found) {
+            if (seen.has(node)) continue;
+            seen.add(node);
+            if (window.%(binding)s) window.%(binding)s();
+        }
+    };
+    const install = () => {
+        const style = document.createElement("style");
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+        report(document.documentElement);
+        new MutationObserver((mutations) => {
+            for (const mutation of mutations) mutation.addedNodes.forEach(report);
+        }).observe(document.documentElement, { childList: true, subtree: true });
+    };
+    if (document.documentElement) install();
+    else document.addEventListener("readystatechange", install, { once: true });
+})();
+"""
+
+_guarded_contexts: "weakref.WeakSet[BrowserContext]" = weakref.WeakSet()
+
+
+def is_popup_guarded(context: BrowserContext) -> bool:
+    """True when a PopupGuard was installed on the context, so per-page close_popup calls can be skipped."""
+    return context in _guarded_contexts
+
+
+class PopupGuard:
+    """
+    Hides aria-modal dialogs in every page of a context.
+
+    A stylesheet injected by an init script neutralises the dialogs whenever
+    they appear, including ones that show up after the table was awaited, so
+    pages need no per-navigation close_popup round trip. An exposed binding
+    counts the dialogs that were hidden.
+
+    Example:
+        >>> guard = PopupGuard()
+        >>> RecyclingContext(manager, on_new_context=guard.install)
+    """
+
+    binding_name = "__valueScannerPopupSuppressed"
+
+    def __init__(self):
+        """Initialize popup guard with zeroed counters."""
+        self.suppressed = 0
+        self.contexts_installed = 0
+
+    def _on_suppressed(self, _source) -> None:
+        self.suppressed += 1
+
+    async def install(self, context: BrowserContext) -> None:
+        """
+        Install the guard on a context, before its pages are opened.
+
+        Args:
+            context: Context whose current and future pages get the guard
+        """
+        await context.expose_binding(self.binding_name, self._on_suppressed)
+        await context.add_init_script(
+            SUPPRESS_SCRIPT % {"selector": MODAL_SELECTOR, "binding": self.binding_name}
+        )
+        _guarded_contexts.add(context)
+        self.contexts_installed += 1
+
+    def stats(self) -> dict:
+        """Counters for logs and metrics."""
+        return {"suppressed": self.suppressed, "contexts": self.contexts_installed}
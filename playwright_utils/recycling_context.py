@@ -0,0 +1,205 @@
+"""Browser context recycling with health checks and crash recovery."""
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from playwright.async_api import BrowserContext, Error as PlaywrightError
+
+from utils.logger import get_logger
+from utils.process_memory import get_browser_rss
+
+from .browser_manager import BrowserManager
+
+logger = get_logger()
+
+# Messages playwright raises when the page/context/browser under a job died
+CRASH_MESSAGES = (
+    "Target page, context or browser has been closed",
+    "Target closed",
+    "Browser has been closed",
+    "browser has disconnected",
+    "Browser closed",
+    "Page crashed",
+)
+
+
+def is_browser_crash_error(error: BaseException) -> bool:
+    """True when an error means the browser or context died under the job,
+    i.e. the job itself did nothing wrong and can be re-queued."""
+    return isinstance(error, PlaywrightError) and any(msg in str(error) for msg in CRASH_MESSAGES)
+
+
+class _ContextSlot:
+    """One generation of the recycled context."""
+
+    def __init__(self, generation: int, context: BrowserContext, stack: AsyncExitStack):
+        self.generation = generation
+        self.context = context
+        self.stack = stack
+        self.pages_opened = 0
+        self.leases = 0
+        self.retired = False
+
+
+class RecyclingContext:
+    """
+    Hands out a browser context that is transparently replaced over a long run.
+
+    The current context is retired after max_pages pages were opened in it or
+    when the browser processes' RSS crosses max_rss_mb; new leases then get a
+    fresh context (with cookies and setup re-applied) and the retired one is
+    closed once its last lease ends. If the browser disconnects (crash, OOM
+    kill) it is restarted on the next lease.
+
+    Example:
+        >>> async with RecyclingContext(manager, cookies=cookies, max_pages=200) as contexts:
+        ...     async with contexts.lease() as context:
+        ...         await ReportsFetcher(context, "NVDA", "/stocks/nvda/").fetch_all_reports()
+    """
+
+    def __init__(
+        self,
+        manager: BrowserManager,
+        cookies: Optional[list[dict]] = None,
+        max_pages: Optional[int] = 200,
+        max_rss_mb: Optional[float] = None,
+        on_new_context: Optional[Callable[[BrowserContext], Awaitable[None]]] = None,
+        rss_probe: Callable[[], int] = get_browser_rss,
+        **context_kwargs,
+    ):
+        """
+        Initialize recycling context.
+
+        Args:
+            manager: Started browser manager
+            cookies: Cookies applied to every new context
+            max_pages: Recycle after this many pages were opened (None disables)
+            max_rss_mb: Recycle when browser RSS exceeds this many MiB (None disables)
+            on_new_context: Optional async setup run on every new context
+            rss_probe: Returns the browser RSS in bytes
+            **context_kwargs: Options passed to manager.new_context
+        """
+        self.manager = manager
+        self.cookies = cookies or []
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.on_new_context = on_new_context
+        self.rss_probe = rss_probe
+        self.context_kwargs = context_kwargs
+        self.recycled = 0
+        self.restarts = 0
+        self._slot: Optional[_ContextSlot] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._retired: list[_ContextSlot] = []
+
+    async def __aenter__(self) -> "RecyclingContext":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):  # noqa: ANN001
+        await self.close()
+        return False
+
+    def open_pages(self) -> int:
+        """Pages currently open across the live and retired contexts."""
+        slots = self._retired + ([self._slot] if self._slot else [])
+        total = 0
+        for slot in slots:
+            try:
+                total += len(slot.context.pages)
+            except Exception:
+                pass
+        return total
+
+    async def _new_slot(self) -> _ContextSlot:
+        stack = AsyncExitStack()
+        context = await stack.enter_async_context(self.manager.new_context(**self.context_kwargs))
+        if self.cookies:
+            await context.add_cookies(self.cookies)
+        if self.on_new_context:
+            await self.on_new_context(context)
+        self._generation += 1
+        slot = _ContextSlot(self._generation, context, stack)
+
+        def count_page(_page):
+            slot.pages_opened += 1
+
+        context.on("page", count_page)
+        logger.info(f"browser context #{slot.generation} ready")
+        return slot
+
+    async def _ensure_healthy(self) -> None:
+        if self.manager.is_connected():
+            return
+        logger.warning("browser disconnected, restarting it")
+        # Every context died with the browser, drop them without closing
+        self._slot = None
+        self._retired.clear()
+        await self.manager.restart()
+        self.restarts += 1
+
+    def _needs_recycle(self, slot: _ContextSlot) -> Optional[str]:
+        if self.max_pages and slot.pages_opened >= self.max_pages:
+            return f"{slot.pages_opened} pages opened"
+        if self.max_rss_mb:
+            rss_mb = self.rss_probe() / 2**20
+            if rss_mb >= self.max_rss_mb:
+                return f"browser rss {rss_mb:.0f} MiB"
+        return None
+
+    async def _acquire(self) -> _ContextSlot:
+        async with self._lock:
+            await self._ensure_healthy()
+            if self._slot is not None:
+                reason = self._needs_recycle(self._slot)
+                if reason:
+                    logger.info(f"recycling browser context #{self._slot.generation}: {reason}")
+                    await self._retire(self._slot)
+                    self._slot = None
+                    self.recycled += 1
+            if self._slot is None:
+                self._slot = await self._new_slot()
+            self._slot.leases += 1
+            return self._slot
+
+    async def _retire(self, slot: _ContextSlot) -> None:
+        slot.retired = True
+        if slot.leases == 0:
+            await self._close_slot(slot)
+        else:
+            self._retired.append(slot)
+
+    async def _close_slot(self, slot: _ContextSlot) -> None:
+        try:
+            await slot.stack.aclose()
+        except Exception:
+            # Suppress cleanup errors
+            pass
+
+    async def _release(self, slot: _ContextSlot) -> None:
+        slot.leases -= 1
+        if slot.retired and slot.leases == 0:
+            if slot in self._retired:
+                self._retired.remove(slot)
+            await self._close_slot(slot)
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserContext]:
+        """
+        Borrow the current context for one job.
+
+        Yields:
+            BrowserContext: A healthy context; do not keep it past the block
+        """
+        slot = await self._acquire()
+        try:
+            yield slot.context
+        finally:
+            await self._release(slot)
+
+    async def close(self) -> None:
+        """Close the live and retired contexts."""
+        slots = self._retired + ([self._slot] if self._slot else [])
+        self._retired, self._slot = [], None
+        for slot in slots:
+            await self._close_slot(slot)
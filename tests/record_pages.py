@@ -0,0 +1,70 @@
+"""Record live report pages for tests/test_recorded_pages.py.
+
+    python -m tests.record_pages AAPL JPM
+
+Every REPORTS_ROUTES page of a symbol is loaded from the live site and, once
+its table is populated, saved under tests/recorded/ at the path it has on the
+site (stocks/aapl/financials/ratios/index.html), so a plain static server
+replays it. External scripts are dropped so the replay does not hydrate;
+inline ones, embedded statement data among them, are kept. Every json
+response the page received is saved next to it as data.json, whatever its
+shape, to find out how the site ships its statement data.
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from config import REPORT_READY_TIMEOUT_MS, REPORT_TABLE_SELECTOR, REPORTS_ROUTES, STOCKANALYSIS_BASE_URL
+from playwright_utils import BrowserManager, PageHelper
+from utils.logger import get_logger
+
+logger = get_logger()
+
+RECORDED_DIR = os.path.join(os.path.dirname(__file__), "recorded")
+STRIP_EXTERNAL = """() => document.querySelectorAll('script[src], link[rel="modulepreload"]').forEach((node) => node.remove())"""
+
+
+async def record_symbol(context, symbol: str, base_url: str = STOCKANALYSIS_BASE_URL, output_dir: str = RECORDED_DIR):
+    for report, route in REPORTS_ROUTES.items():
+        path = f"/stocks/{symbol.lower()}{route}"
+        page_dir = os.path.join(output_dir, path.strip("/"))
+        os.makedirs(page_dir, exist_ok=True)
+        data_responses = []
+        page = await context.new_page()
+
+        async def keep_data(response):
+            if "json" in response.headers.get("content-type", ""):
+                try:
+                    data_responses.append({"url": response.url, "status": response.status, "body": await response.json()})
+                except Exception as e:
+                    logger.info(f"{response.url} is not json ({e}), not recorded")
+
+        page.on("response", keep_data)
+        try:
+            await page.goto(f"{base_url}{path}", wait_until="domcontentloaded")
+            await PageHelper(page).wait_for_populated_table(REPORT_TABLE_SELECTOR, timeout=REPORT_READY_TIMEOUT_MS)
+            await page.evaluate(STRIP_EXTERNAL)
+            with open(os.path.join(page_dir, "index.html"), "w") as f:
+                f.write(await page.content())
+            if data_responses:
+                with open(os.path.join(page_dir, "data.json"), "w") as f:
+                    json.dump(data_responses, f, indent=2)
+            logger.info(f"recorded {symbol}/{report} ({len(data_responses)} data responses)")
+        finally:
+            await page.close()
+
+
+async def main(symbols: list, base_url: str):
+    async with BrowserManager(headless=True) as manager:
+        async with manager.new_context() as context:
+            for symbol in symbols:
+                await record_symbol(context, symbol, base_url)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="record live report pages for the replay tests")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--base-url", default=STOCKANALYSIS_BASE_URL)
+    args = parser.parse_args()
+    asyncio.run(main(args.symbols, args.base_url))
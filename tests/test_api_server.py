@@ -0,0 +1,47 @@
+"""Conditional requests against the api: If-None-Match holds whole entity tags."""
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from pipeline.api_server import ApiServer, etag_matches
+
+ETAG = '"0123abcd"'
+
+
+@pytest.mark.parametrize("header,matches", [
+    ('"0123abcd"', True),
+    ('W/"0123abcd"', True),
+    ('"ffff", "0123abcd"', True),
+    ('"ffff",W/"0123abcd"', True),
+    ("*", True),
+    ('"0123abcd0"', False),  # a tag the current one is a substring of
+    ('"0123"', False),
+    ("0123abcd", False),  # unquoted, not an entity tag
+    ("", False),
+    (None, False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(ETAG, header) is matches
+
+
+def test_not_modified(tmp_path):
+    results = tmp_path / "results.jsonl"
+    results.write_text(json.dumps({"symbol": "AAPL", "sector": "Technology"}) + "\n")
+    with ApiServer(port=0, results_path=str(results), index_path=str(tmp_path / "index.npz"),
+                   universe_path=str(tmp_path / "companies.json")) as server:
+        url = f"{server.base_url}/results/AAPL"
+        with urllib.request.urlopen(url) as response:
+            etag = response.headers["ETag"]
+
+        def status(if_none_match: str) -> int:
+            request = urllib.request.Request(url, headers={"If-None-Match": if_none_match})
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status
+            except urllib.error.HTTPError as e:
+                return e.code
+
+        assert status(f'"other", {etag}') == 304
+        assert status(etag[:-1] + '0"') == 200
@@ -0,0 +1,52 @@
+"""The ticker workers main.py starts must be able to fill the page limit of the AIMD limiter."""
+import asyncio
+from collections import deque
+
+import pytest
+
+from config import FETCH_MAX_CONCURRENCY, REPORTS_ROUTES
+from pipeline.fetch_setup import fetch_worker_count
+from utils.aimd import AimdController
+
+
+async def crawl(strategy: str, workers: int, symbols: int = 60) -> int:
+    """main.py's worker pool over fake page loads, each held in a limiter slot like
+    ReportsFetcher._load_table. Returns the peak number of page loads in flight."""
+    limiter = AimdController(max_limit=FETCH_MAX_CONCURRENCY, initial_limit=FETCH_MAX_CONCURRENCY)
+    pending = deque(range(symbols))
+    peak = 0
+
+    async def load_page():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def fetch_all_reports():
+        if strategy == "single_page":
+            # one page per ticker, the reports one after another
+            for _ in REPORTS_ROUTES:
+                await load_page()
+        else:
+            await asyncio.gather(*[load_page() for _ in REPORTS_ROUTES])
+
+    async def worker():
+        while pending:
+            pending.popleft()
+            await fetch_all_reports()
+
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    assert limiter.limit == FETCH_MAX_CONCURRENCY
+    return peak
+
+
+@pytest.mark.parametrize("strategy", ["single_page", "page_per_report"])
+def test_in_flight_pages_reach_the_limit(strategy):
+    peak = asyncio.run(crawl(strategy, fetch_worker_count(strategy)))
+    assert peak == FETCH_MAX_CONCURRENCY
+
+
+def test_page_per_report_sizing_caps_single_page():
+    # the old worker count, sized for the page-per-report fan-out, starves the single page strategy
+    peak = asyncio.run(crawl("single_page", fetch_worker_count("page_per_report")))
+    assert peak < FETCH_MAX_CONCURRENCY
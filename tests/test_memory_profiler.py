@@ -0,0 +1,29 @@
+"""The memory summary compares samples of one run, not the first and last lines of the file."""
+import json
+
+from utils.memory_profiler import MemoryProfiler, summarize_timeline
+
+
+def test_summary_covers_the_latest_run(tmp_path):
+    path = tmp_path / "memory_timeline.jsonl"
+    # an earlier run with a much smaller python process
+    earlier = {
+        "run_id": "earlier", "symbols": 0, "python_rss_bytes": 0, "python_traced_bytes": 0,
+        "browser_rss_bytes": 0, "top_growth_since_start": [],
+    }
+    path.write_text(json.dumps(earlier) + "\n")
+
+    profiler = MemoryProfiler(str(path), every=1)
+    profiler.start()
+    profiler.symbol_done("T0000")
+    profiler.stop()
+
+    with open(path) as f:
+        runs = [json.loads(line)["run_id"] for line in f]
+    assert runs == ["earlier"] + [profiler.run_id] * 3
+
+    summary = summarize_timeline(str(path))
+    assert summary.startswith(f"run {profiler.run_id} (2 runs")
+    python_growth = float(summary.split("python grew ")[1].split(" MiB")[0])
+    assert abs(python_growth) < 50  # not the whole process size, as against the earlier run
+    assert summarize_timeline(str(path), "earlier").startswith("run earlier")
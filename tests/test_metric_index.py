@@ -0,0 +1,31 @@
+"""MetricIndex queries over a synthetic universe."""
+import json
+import os
+
+import pytest
+
+from benchmarks.synthetic import write_synthetic_universe
+from enums import IncomeIndex, RatiosIndex
+from pipeline.metric_index import Where, build_metric_index
+
+
+@pytest.fixture(scope="module")
+def index(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp("universe"))
+    write_synthetic_universe(5, root)
+    with open(os.path.join(root, "filtered_companies.json")) as f:
+        companies = json.load(f)
+    return build_metric_index(os.path.join(root, "data"), path=None, companies=companies)
+
+
+def test_select(index):
+    df = index.select([RatiosIndex.PE_RATIO, IncomeIndex.OPERATING_MARGIN_PERCENT], last=2)
+    assert len(df) == 5
+    assert len(df.columns) == 1 + 2 * 2  # sector, then two periods per metric
+
+
+def test_select_without_matching_symbols(index):
+    where = [Where(IncomeIndex.OPERATING_MARGIN_PERCENT, ">", 10**9)]
+    df = index.select([RatiosIndex.PE_RATIO], where=where, last=2)
+    assert df.empty
+    assert len(df.columns) == 3  # sector and the two periods
@@ -0,0 +1,131 @@
+"""Statement extraction against report pages recorded from the live site
+(tests/record_pages.py), replayed from a local static server.
+
+Every recorded table must parse, and the fetcher must store it as read. Data
+responses the pages fetched that have the payload_to_df shape must give the same
+statement as the table, which is what would allow reading statements from them.
+Skipped when nothing is recorded yet or (for the fetcher test) when no
+Playwright browser is installed.
+"""
+import asyncio
+import glob
+import json
+import os
+import threading
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+from lxml import html as lxml_html
+
+from config import REPORT_TABLE_SELECTOR, REPORTS_ROUTES
+from enums import BalanceSheetIndex, CashFlowIndex, IncomeIndex, RatiosIndex
+from pipeline.reports_fetcher import ReportsFetcher, clean_report_df, parse_html_table
+from pipeline.statement_payload import payload_to_df
+from utils.period_axis import fiscal_year_columns
+
+RECORDED_DIR = os.path.join(os.path.dirname(__file__), "recorded")
+REPORT_ENUMS = {"income": IncomeIndex, "balance-sheet": BalanceSheetIndex, "cash-flow": CashFlowIndex, "ratios": RatiosIndex}
+
+
+def recorded_pages() -> list:
+    "(symbol, report, site path) of every recorded page"
+    pages = []
+    for symbol_dir in sorted(glob.glob(os.path.join(RECORDED_DIR, "stocks", "*"))):
+        symbol = os.path.basename(symbol_dir).upper()
+        for report, route in REPORTS_ROUTES.items():
+            path = f"/stocks/{symbol.lower()}{route}"
+            if os.path.exists(os.path.join(RECORDED_DIR, path.strip("/"), "index.html")):
+                pages.append((symbol, report, path))
+    return pages
+
+
+PAGES = recorded_pages()
+pytestmark = pytest.mark.skipif(not PAGES, reason="no recorded pages, run python -m tests.record_pages SYMBOL")
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=RECORDED_DIR))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def table_inner_html(document: str) -> str:
+    tag, css_class = REPORT_TABLE_SELECTOR.split(".", 1)
+    tables = lxml_html.fromstring(document).xpath(
+        f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    )
+    assert tables, f"no {REPORT_TABLE_SELECTOR} in the recorded page"
+    table = tables[0]
+    return (table.text or "") + "".join(lxml_html.tostring(child, encoding="unicode") for child in table)
+
+
+@pytest.mark.parametrize("symbol,report,path", PAGES)
+def test_dom_table_parses(server_url, symbol, report, path):
+    df = read_recorded_table(server_url, path)
+    assert fiscal_year_columns(df.columns) or fiscal_year_columns(df.columns, quarterly=True)
+    known = {member.value for member in REPORT_ENUMS[report]}
+    assert known & set(df.index), f"none of the {report} metrics in {symbol}'s table"
+    assert df.notna().to_numpy().any()
+
+
+def read_recorded_table(base_url: str, path: str) -> pd.DataFrame:
+    with urllib.request.urlopen(f"{base_url}{path}") as response:
+        return clean_report_df(parse_html_table(table_inner_html(response.read().decode())))
+
+
+@pytest.mark.parametrize("symbol,report,path", PAGES)
+def test_recorded_data_responses_match_the_table(server_url, symbol, report, path):
+    data_path = os.path.join(RECORDED_DIR, path.strip("/"), "data.json")
+    if not os.path.exists(data_path):
+        pytest.skip("the page fetched no data responses")
+    with open(data_path) as f:
+        statements = [
+            response["body"] for response in json.load(f)
+            if isinstance(response["body"], dict) and "rows" in response["body"]
+        ]
+    if not statements:
+        pytest.skip("no data response has the payload_to_df shape")
+    table = read_recorded_table(server_url, path)
+    for statement in statements:
+        pd.testing.assert_frame_equal(clean_report_df(payload_to_df(statement)), table)
+
+
+def test_fetcher_stores_recorded_tables(server_url, tmp_path):
+    from playwright_utils import BrowserManager
+
+    async def run():
+        async with BrowserManager(headless=True) as manager:
+            async with manager.new_context() as context:
+                for symbol in sorted({symbol for symbol, _, _ in PAGES}):
+                    fetcher = ReportsFetcher(
+                        context, symbol, f"/stocks/{symbol.lower()}", base_url=server_url, data_dir=str(tmp_path),
+                        strategy="page_per_report",
+                    )
+                    try:
+                        await fetcher.fetch_all_reports()
+                    except Exception:
+                        pass  # reports not recorded fail, the recorded ones are compared below
+
+    try:
+        asyncio.run(run())
+    except Exception as e:
+        if "Executable doesn't exist" in str(e):
+            pytest.skip("no playwright browser installed")
+        raise
+    for symbol, report, path in PAGES:
+        stored = pd.read_csv(os.path.join(tmp_path, symbol, f"{report}.csv"), index_col=0)
+        expected = read_recorded_table(server_url, path)
+        assert list(stored.index) == list(expected.index)
+        assert list(stored.columns) == [str(column) for column in expected.columns]
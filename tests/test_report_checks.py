@@ -0,0 +1,17 @@
+"""Screening results carry whether each check passed next to its text, cmd_screen
+counts those values instead of reading the text."""
+import os
+
+from benchmarks.synthetic import write_synthetic_universe
+from pipeline.report_maker import generate_reports
+
+
+def test_passed_values_match_check_text(tmp_path):
+    symbols = sorted(write_synthetic_universe(3, str(tmp_path)))
+    results = list(generate_reports(symbols, data_dir=os.path.join(tmp_path, "data")))
+    assert len(results) == 3
+    for result in results:
+        assert result["passed"].keys() == result["checks"].keys()
+        for name, passed in result["passed"].items():
+            assert type(passed) is bool
+            assert f"{passed}," in result["checks"][name]
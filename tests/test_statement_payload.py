@@ -0,0 +1,41 @@
+"""payload_to_df gives the raw frame parse_html_table gives for the same statement."""
+import pandas as pd
+import pytest
+
+from pipeline.reports_fetcher import clean_report_df, parse_html_table
+from pipeline.statement_payload import payload_to_df
+
+PAYLOAD = {
+    "columns": ["TTM", "FY 2024", "FY 2023"],
+    "rows": [
+        {"title": "Revenue", "format": "number", "values": [391035.0, 383285.0, None]},
+        {"title": "Operating Margin", "format": "percent", "values": [31.51, 29.82, 30.13]},
+    ],
+}
+TABLE_HTML = (
+    "<thead><tr><th>Fiscal Year</th><th>TTM</th><th>FY 2024</th><th>FY 2023</th><th>FY 2022</th></tr></thead>"
+    "<tbody>"
+    "<tr><td>Revenue</td><td>391,035</td><td>383,285</td><td>-</td><td>Upgrade</td></tr>"
+    "<tr><td>Operating Margin</td><td>31.51%</td><td>29.82%</td><td>30.13%</td><td>Upgrade</td></tr>"
+    "</tbody>"
+)
+
+
+def test_raw_frame():
+    df = payload_to_df(PAYLOAD)
+    assert list(df.columns) == ["Fiscal Year", "TTM", "FY 2024", "FY 2023"]
+    assert df.iloc[0].tolist() == ["Revenue", "391035.0", "383285.0", "-"]
+    assert df.iloc[1].tolist() == ["Operating Margin", "31.51%", "29.82%", "30.13%"]
+
+
+def test_cleans_like_the_html_table():
+    pd.testing.assert_frame_equal(clean_report_df(payload_to_df(PAYLOAD)), clean_report_df(parse_html_table(TABLE_HTML)))
+
+
+@pytest.mark.parametrize("payload", [
+    {"columns": ["TTM", "FY 2024"], "rows": [{"title": "Revenue", "values": [1.0]}]},
+    {"columns": ["TTM"], "rows": []},
+])
+def test_rejects_malformed_payloads(payload):
+    with pytest.raises(ValueError):
+        payload_to_df(payload)
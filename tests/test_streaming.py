@@ -0,0 +1,67 @@
+"""StreamingPipeline screens from its own data_dir, keeps the results of earlier runs
+and its worker processes are not taken for the browser."""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.synthetic import write_synthetic_universe
+from pipeline.streaming import StreamingPipeline
+from utils.process_memory import PLAYWRIGHT_DRIVER_ARG, get_browser_pids
+
+
+async def screen(symbols: list, data_dir: str, results_path: str):
+    pipeline = StreamingPipeline(data_dir=data_dir, results_path=results_path, clean_workers=1, screen_workers=1)
+    pipeline.start()
+    try:
+        for symbol in symbols:
+            await pipeline.symbol_fetched(symbol)
+        await pipeline.drain()
+    finally:
+        pipeline.stop()
+    return pipeline.summary()
+
+
+def read_results(path: str) -> dict:
+    with open(path) as f:
+        return {record["symbol"]: record for record in map(json.loads, f)}
+
+
+def test_screens_data_dir_and_keeps_earlier_results(tmp_path):
+    symbols = sorted(write_synthetic_universe(3, str(tmp_path)))
+    data_dir = os.path.join(tmp_path, "data")
+    results_path = os.path.join(tmp_path, "results.jsonl")
+
+    summary = asyncio.run(screen(symbols, data_dir, results_path))
+    assert summary["screened"] == 3
+    assert set(read_results(results_path)) == set(symbols)
+
+    # a later run over one symbol replaces its line and leaves the others
+    asyncio.run(screen(symbols[:1], data_dir, results_path))
+    with open(results_path) as f:
+        assert len(f.readlines()) == 3
+    assert set(read_results(results_path)) == set(symbols)
+
+
+def test_browser_pids_leave_out_pipeline_workers(tmp_path):
+    "the screening pool is not counted as browser memory (CONTEXT_MAX_RSS_MB, MemoryProfiler)"
+    # stands in for the playwright driver, which is started with a run-driver argument
+    driver = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)", PLAYWRIGHT_DRIVER_ARG])
+
+    async def run():
+        pipeline = StreamingPipeline(data_dir=str(tmp_path), results_path=None)
+        pipeline.start()
+        try:
+            worker_pid = await asyncio.get_running_loop().run_in_executor(pipeline._executor, os.getpid)
+            return worker_pid, get_browser_pids()
+        finally:
+            pipeline.stop()
+
+    try:
+        worker_pid, browser_pids = asyncio.run(run())
+    finally:
+        driver.kill()
+        driver.wait()
+    assert browser_pids == [driver.pid]
+    assert worker_pid not in browser_pids
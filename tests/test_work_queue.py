@@ -0,0 +1,61 @@
+"""Crawl workers: queue calls run off the event loop while another process holds the
+sqlite write lock, and a unit is acked only when none of its failures may pass."""
+import asyncio
+import sqlite3
+import threading
+import time
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from pipeline.crawl_worker import _keep_lease, retry_reasons
+from pipeline.fetch_errors import ErrorClass, ReportFetchError
+from pipeline.work_queue import WorkQueue
+
+
+def hold_write_lock(path: str, seconds: float, locked: threading.Event):
+    "another worker's transaction"
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("BEGIN IMMEDIATE")
+    locked.set()
+    time.sleep(seconds)
+    connection.execute("COMMIT")
+    connection.close()
+
+
+def test_lease_renewal_does_not_block_the_loop(tmp_path):
+    path = str(tmp_path / "queue.sqlite")
+    queue = WorkQueue(path, lease_seconds=0.3)
+    queue.populate({"AAPL": {"symbol": "AAPL", "href": "/stocks/aapl/"}}, unit_size=1)
+    unit_id, _ = queue.lease("worker")
+
+    async def run() -> int:
+        locked = threading.Event()
+        holder = threading.Thread(target=hold_write_lock, args=(path, 0.5, locked))
+        holder.start()
+        locked.wait()
+        heartbeat = asyncio.create_task(_keep_lease(queue, unit_id, "worker"))
+        ticks = 0
+        # stands in for the page loads of the unit
+        while holder.is_alive():
+            await asyncio.sleep(0.01)
+            ticks += 1
+        holder.join()
+        await asyncio.sleep(0.15)
+        heartbeat.cancel()
+        return ticks
+
+    ticks = asyncio.run(run())
+    assert ticks > 20
+    assert queue.ack(unit_id, "worker")
+    queue.close()
+
+
+def test_units_with_retryable_failures_are_leased_again():
+    companies = [{"symbol": "AAPL"}, {"symbol": "JPM"}, {"symbol": "MSFT"}]
+    permanent = ReportFetchError(ErrorClass.PERMANENT, "http 404", code="http_404")
+    assert retry_reasons(companies, [True, permanent, False]) == []
+
+    timeout = PlaywrightTimeoutError("Timeout 10000ms exceeded")
+    site_wide = ReportFetchError(ErrorClass.SITE_WIDE, "http 429", code="http_429")
+    reasons = retry_reasons(companies, [timeout, permanent, site_wide])
+    assert [reason.split(":")[0] for reason in reasons] == ["AAPL", "MSFT"]
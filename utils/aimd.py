@@ -0,0 +1,169 @@
+import asyncio
+import json
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from .latency_stats import percentile
+from .logger import get_logger
+
+logger = get_logger()
+
+
+class AimdController:
+    """Concurrency limit for page fetches, adjusted with additive-increase /
+    multiplicative-decrease.
+
+    Every `window` finished fetches the controller looks at that window: if
+    the error/timeout rate is above error_threshold, or the p90 latency is
+    above the latency target, the limit is multiplied by decrease_factor;
+    otherwise, if the limit was actually used, it grows by `increase`. The
+    latency target is latency_target seconds, or when None, latency_tolerance
+    times the best (lowest) window median seen in the run. Decisions are logged
+    and, with decisions_path, appended as json lines."""
+
+    def __init__(
+        self,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        initial_limit: int = 4,
+        increase: int = 1,
+        decrease_factor: float = 0.5,
+        window: int = 8,
+        error_threshold: float = 0.1,
+        latency_target: float = None,
+        latency_tolerance: float = 2.0,
+        decisions_path: str = None,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial_limit, max_limit))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.window = window
+        self.error_threshold = error_threshold
+        self.latency_target = latency_target
+        self.latency_tolerance = latency_tolerance
+        self.decisions_path = decisions_path
+        self.in_flight = 0
+        self.decisions: list = []
+        self._baseline_latency: Optional[float] = None
+        self._latencies: list = []
+        self._errors = 0
+        self._peak_in_flight = 0
+        self._stale = 0
+        self._condition = asyncio.Condition()
+
+    def target_latency(self) -> Optional[float]:
+        if self.latency_target is not None:
+            return self.latency_target
+        if self._baseline_latency is None:
+            return None
+        return self._baseline_latency * self.latency_tolerance
+
+    async def acquire(self):
+        "wait for one of the `limit` fetch slots"
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self.in_flight)
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        "hold a fetch slot for the duration of the block"
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def record(self, latency: float, ok: bool = True):
+        """feed one finished fetch; ok=False for timeouts and errors. Call it
+        while holding the slot so a raised limit wakes the waiting fetches on release"""
+        if self._stale:
+            # started under the limit before the last decrease, says nothing about the new one
+            self._stale -= 1
+            return
+        if ok:
+            self._latencies.append(latency)
+        else:
+            self._errors += 1
+        if len(self._latencies) + self._errors >= self.window:
+            self._decide()
+
+    def _decide(self):
+        samples = len(self._latencies) + self._errors
+        error_rate = self._errors / samples
+        p50 = percentile(self._latencies, 50) if self._latencies else None
+        p90 = percentile(self._latencies, 90) if self._latencies else None
+        if p50 is not None and error_rate <= self.error_threshold:
+            self._baseline_latency = p50 if self._baseline_latency is None else min(self._baseline_latency, p50)
+        target = self.target_latency()
+
+        previous = self.limit
+        if error_rate > self.error_threshold:
+            action, reason = "decrease", f"error rate {error_rate:.0%} > {self.error_threshold:.0%}"
+        elif target is not None and p90 is not None and p90 > target:
+            action, reason = "decrease", f"p90 {p90:.2f}s > target {target:.2f}s"
+        elif self._peak_in_flight >= self.limit:
+            action, reason = "increase", "healthy and saturated"
+        else:
+            action, reason = "hold", f"healthy, peak in flight {self._peak_in_flight} < limit"
+
+        if action == "decrease":
+            self.limit = max(self.min_limit, math.floor(self.limit * self.decrease_factor))
+            self._stale = max(self.in_flight - 1, 0)
+        elif action == "increase":
+            self.limit = min(self.max_limit, self.limit + self.increase)
+
+        decision = {
+            "ts": time.time(),
+            "action": action,
+            "reason": reason,
+            "previous_limit": previous,
+            "limit": self.limit,
+            "samples": samples,
+            "error_rate": round(error_rate, 4),
+            "p50_seconds": p50,
+            "p90_seconds": p90,
+            "target_seconds": target,
+        }
+        self.decisions.append(decision)
+        if action != "hold":
+            logger.info(f"concurrency {action} {previous} -> {self.limit}: {reason}")
+        if self.decisions_path:
+            self._write_decision(decision)
+
+        self._latencies, self._errors = [], 0
+        self._peak_in_flight = self.in_flight
+
+    def _write_decision(self, decision: dict):
+        os.makedirs(os.path.dirname(self.decisions_path) or ".", exist_ok=True)
+        with open(self.decisions_path, "a") as f:
+            f.write(json.dumps(decision) + "\n")
+
+    def summary(self) -> dict:
+        actions = [decision["action"] for decision in self.decisions]
+        return {
+            "limit": self.limit,
+            "min_seen": min((d["limit"] for d in self.decisions), default=self.limit),
+            "max_seen": max((d["limit"] for d in self.decisions), default=self.limit),
+            "increases": actions.count("increase"),
+            "decreases": actions.count("decrease"),
+        }
+
+
+if __name__ == "__main__":
+    # replay the decisions of a run: python -m utils.aimd metrics/concurrency.jsonl
+    import sys
+    with open(sys.argv[1]) as f:
+        for line in f:
+            d = json.loads(line)
+            print(f"{time.strftime('%H:%M:%S', time.localtime(d['ts']))} {d['action']:>8} "
+                  f"{d['previous_limit']:>3} -> {d['limit']:<3} {d['reason']}")
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import deque
+from .logger import get_logger
+
+logger = get_logger()
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Pauses the crawl when the site as a whole is failing.
+
+    Outcomes of page loads across all tickers are kept in a rolling window.
+    When at least min_samples are in it and the share of failures reaches
+    failure_rate, the breaker opens and every wait() sleeps for the cooldown.
+    After the cooldown one probe load goes through (half open): success closes
+    the breaker, another failure re-opens it with the cooldown doubled (up to
+    max_cooldown)."""
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_samples: int = 10,
+        failure_rate: float = 0.5,
+        cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.failure_rate = failure_rate
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes: deque = deque(maxlen=window)
+        self._probing = False
+        self._probe_started = 0.0
+
+    def current_failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def record(self, ok: bool):
+        "one load outcome, ok=False for failures that point at the site rather than one page"
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok:
+                logger.info("circuit closed: probe load succeeded, resuming crawl")
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self._outcomes.clear()
+            else:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open("probe load failed")
+            return
+        self._outcomes.append(ok)
+        if (
+            self.state == CLOSED
+            and len(self._outcomes) >= self.min_samples
+            and self.current_failure_rate() >= self.failure_rate
+        ):
+            self._open(f"failure rate {self.current_failure_rate():.0%} over the last {len(self._outcomes)} loads")
+
+    def _open(self, reason: str):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(f"circuit open ({reason}): pausing the crawl for {self.cooldown:.0f}s")
+
+    async def wait(self):
+        "returns once loads may proceed, sleeps while the breaker is open"
+        while True:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                remaining = self.opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                self.state = HALF_OPEN
+                self._probing = False
+            if not self._probing or time.monotonic() - self._probe_started > self.cooldown:
+                # this caller is the probe, the rest wait for its outcome (or a new probe if it never reports)
+                self._probing = True
+                self._probe_started = time.monotonic()
+                return
+            await asyncio.sleep(1)
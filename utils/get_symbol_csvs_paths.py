@@ -1,23 +1,54 @@
 import os
 from .logger import get_logger
 from enum import Enum
-from config import CsvFiles
+from config import ANNUAL, QUARTERLY, CsvFiles, DATA_DIR, REPORT_FREQUENCIES, REPORTS_ROUTES
 
 logger = get_logger()
 
 
 
 
-def get_symbol_csvs_paths(ticker) -> dict:
-    folder_path = os.path.join('data', ticker)
+def fetch_frequencies(quarterly: bool = False) -> list:
+    "REPORT_FREQUENCIES, plus the quarterly view when it is asked for (fetch --quarterly, QUARTERLY=1)"
+    if quarterly and QUARTERLY not in REPORT_FREQUENCIES:
+        return REPORT_FREQUENCIES + [QUARTERLY]
+    return REPORT_FREQUENCIES
+
+
+def report_file_name(report: str, frequency: str = ANNUAL) -> str:
+    "csv name (without .csv) of a report, annual data keeps the plain name: income, income-quarterly"
+    return report if frequency == ANNUAL else f"{report}-{frequency}"
+
+
+def report_csv_path(ticker: str, report: str, frequency: str = ANNUAL, data_dir: str = DATA_DIR) -> str:
+    return os.path.join(data_dir, ticker, f"{report_file_name(report, frequency)}.csv")
+
+
+def report_file_names(frequencies=REPORT_FREQUENCIES) -> list:
+    return [report_file_name(report, frequency) for report in REPORTS_ROUTES for frequency in frequencies]
+
+
+def get_symbol_csvs_paths(ticker, frequency: str = ANNUAL, data_dir: str = DATA_DIR) -> dict:
+    folder_path = os.path.join(data_dir, ticker)
     if not os.path.exists(folder_path):
         logger.error(f"Folder path does not exist: {folder_path}")
         return None
     paths = {}
     for csv_member in CsvFiles:
-        paths[csv_member.value] = os.path.join(folder_path, f"{csv_member.value}.csv")
+        paths[csv_member.value] = report_csv_path(ticker, csv_member.value, frequency, data_dir)
     return paths
 
 
+def get_missing_reports(ticker, data_dir: str = DATA_DIR, frequencies=REPORT_FREQUENCIES) -> list:
+    """report csv names (see report_file_name) the ticker has no file for yet,
+    only lists the folder, no parsing"""
+    folder_path = os.path.join(data_dir, ticker)
+    names = report_file_names(frequencies)
+    if not os.path.exists(folder_path):
+        return names
+    existing = set(os.listdir(folder_path))
+    return [name for name in names if name + ".csv" not in existing]
+
+
 if __name__ == "__main__":
     logger.info(get_symbol_csvs_paths("YETI"))
\ No newline at end of file
@@ -0,0 +1,29 @@
+import math
+from typing import Sequence
+
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    "linear-interpolated percentile (0-100) of values, nan when empty"
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(values: Sequence[float], percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> dict:
+    "count, mean, max and the requested percentiles as p50/p95/... keys"
+    summary = {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else float("nan"),
+        "max": max(values) if values else float("nan"),
+    }
+    for q in percentiles:
+        summary[f"p{q:g}"] = percentile(values, q)
+    return summary
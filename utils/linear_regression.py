@@ -1,10 +1,30 @@
 import numpy as np
 import pandas as pd
 from scipy.stats import linregress
+from utils.period_axis import fiscal_year_columns
+from config import ANNUAL, QUARTERLY
+
+
+def parse_row_percentages(row_name, df: pd.DataFrame, frequency: str = ANNUAL) -> list:
+    """Row values as floats ordered oldest -> newest fiscal year (or quarter, for quarterly statements).
+    Accepts the row name with or without the " (%)" suffix the cleaner adds,
+    and raw csv reads where the metric names are still in the first column."""
+    quarterly = frequency == QUARTERLY
+    if df.index.name is None and len(df.columns) and not fiscal_year_columns(df.columns[:1], quarterly=quarterly):
+        df = df.set_index(df.columns[0])
+    for name in (row_name, f"{row_name} (%)"):
+        if name in df.index:
+            row = df.loc[name]
+            break
+    else:
+        return []
+    years_cols = fiscal_year_columns(df.columns, quarterly=quarterly)[::-1]
+    return [float(str(v).replace('%', '').replace(',', '')) if str(v).strip() not in ['-', '', 'nan'] else np.nan
+            for v in row[years_cols]]
 
-def get_row_consistency(row_name, df: pd.DataFrame):
+def get_row_consistency(row_name, df: pd.DataFrame, frequency: str = ANNUAL):
     """Main function: return consistency analysis for a row"""
-    values = parse_row_percentages(row_name, df)
+    values = parse_row_percentages(row_name, df, frequency)
     y_data = np.array(values)
     valid_mask = ~np.isnan(y_data)
 
@@ -24,10 +44,10 @@ def get_row_consistency(row_name, df: pd.DataFrame):
 
 
 
-def detailed_analysis(row_name, csv_path='data/ANET/income.csv'):
+def detailed_analysis(row_name, csv_path='data/ANET/income.csv', frequency: str = ANNUAL):
     """Detailed analysis with all statistics"""
     df = pd.read_csv(csv_path)
-    values = parse_row_percentages(row_name, df)
+    values = parse_row_percentages(row_name, df, frequency)
     y_data = np.array(values)
     valid_mask = ~np.isnan(y_data)
 
@@ -43,7 +63,7 @@ def detailed_analysis(row_name, csv_path='data/ANET/income.csv'):
 
     print(f"\n📊 {row_name}")
     print(f"   Data: {', '.join([f'{v:.1f}%' for v in y_data if not np.isnan(v)])}")
-    print(f"   Trend: {slope:+.2f}% per year")
+    print(f"   Trend: {slope:+.2f}% per {'quarter' if frequency == QUARTERLY else 'year'}")
     print(f"   Consistency: {r_squared:.3f}")
 
     if r_squared > 0.8:
@@ -0,0 +1,138 @@
+import json
+import os
+import time
+import tracemalloc
+from .logger import get_logger
+from .process_memory import get_browser_pids, get_process_rss, get_self_rss
+
+logger = get_logger()
+
+
+class MemoryProfiler:
+    """Memory timeline for long crawls.
+
+    Every `every` symbols it takes a tracemalloc snapshot, compares it with the
+    previous one to find the allocation sites that grew the most, and samples
+    the RSS of the python process and of the browser processes (the playwright
+    driver and its descendants, see get_browser_pids). One json line per sample
+    is appended to output_path, tagged with the run_id of the profiled run."""
+
+    def __init__(self, output_path: str, every: int = 50, top: int = 10, frames: int = 1):
+        self.output_path = output_path
+        self.every = every
+        self.top = top
+        self.frames = frames
+        self.symbols_seen = 0
+        self._first_snapshot = None
+        self._previous_snapshot = None
+        self._started_at = None
+        self.run_id = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        self._started_at = time.time()
+        # the timeline file keeps every run, the summary tells them apart by this
+        self.run_id = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(self._started_at))}-{os.getpid()}"
+        self._first_snapshot = self._previous_snapshot = self._take_snapshot()
+        self.sample("start")
+
+    def stop(self):
+        self.sample("stop")
+        tracemalloc.stop()
+        self._first_snapshot = self._previous_snapshot = None
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    @staticmethod
+    def _top_growth(snapshot, since, limit: int) -> list:
+        stats = snapshot.compare_to(since, "lineno")
+        growing = [stat for stat in stats if stat.size_diff > 0][:limit]
+        return [
+            {
+                "site": str(stat.traceback),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            for stat in growing
+        ]
+
+    def symbol_done(self, symbol: str = None):
+        "count a finished symbol, samples every `every` symbols"
+        self.symbols_seen += 1
+        if self.symbols_seen % self.every == 0:
+            self.sample(symbol)
+
+    def sample(self, label: str = None) -> dict:
+        snapshot = self._take_snapshot()
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        browser_pids = get_browser_pids()
+        record = {
+            "run_id": self.run_id,
+            "ts": time.time(),
+            "elapsed_seconds": time.time() - self._started_at if self._started_at else 0.0,
+            "symbols": self.symbols_seen,
+            "label": label,
+            "python_rss_bytes": get_self_rss(),
+            "python_traced_bytes": traced,
+            "python_traced_peak_bytes": traced_peak,
+            "browser_rss_bytes": sum(get_process_rss(pid) for pid in browser_pids),
+            "browser_processes": len(browser_pids),
+            "largest_browser_process_bytes": max((get_process_rss(pid) for pid in browser_pids), default=0),
+            "top_growth_since_last": self._top_growth(snapshot, self._previous_snapshot, self.top),
+            "top_growth_since_start": self._top_growth(snapshot, self._first_snapshot, self.top),
+        }
+        self._previous_snapshot = snapshot
+        with open(self.output_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        logger.info(
+            f"memory @ {self.symbols_seen} symbols: python rss {record['python_rss_bytes'] / 2**20:.0f} MiB "
+            f"(traced {traced / 2**20:.0f} MiB), browser rss {record['browser_rss_bytes'] / 2**20:.0f} MiB "
+            f"in {len(browser_pids)} processes"
+        )
+        return record
+
+
+def summarize_timeline(path: str, run_id: str = None) -> str:
+    """growth of python and browser memory over one run (the latest one in the file
+    by default), plus the sites that grew the most"""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        return "empty timeline"
+    run_ids = list(dict.fromkeys(record.get("run_id") for record in records))
+    run_id = run_id or run_ids[-1]
+    records = [record for record in records if record.get("run_id") == run_id]
+    if not records:
+        return f"no samples of run {run_id} (runs: {', '.join(map(str, run_ids))})"
+    first, last = records[0], records[-1]
+    lines = [
+        f"run {run_id} ({len(run_ids)} runs in {path})",
+        f"{'symbols':>8}{'python MiB':>12}{'traced MiB':>12}{'browser MiB':>13}",
+    ]
+    for record in records:
+        lines.append(
+            f"{record['symbols']:>8}{record['python_rss_bytes'] / 2**20:>12.1f}"
+            f"{record['python_traced_bytes'] / 2**20:>12.1f}{record['browser_rss_bytes'] / 2**20:>13.1f}"
+        )
+    lines.append("")
+    lines.append(
+        f"python grew {(last['python_rss_bytes'] - first['python_rss_bytes']) / 2**20:+.1f} MiB, "
+        f"browser grew {(last['browser_rss_bytes'] - first['browser_rss_bytes']) / 2**20:+.1f} MiB"
+    )
+    lines.append("top growing allocation sites since start:")
+    for site in last["top_growth_since_start"]:
+        lines.append(f"  {site['size_diff_bytes'] / 1024:>10.1f} KiB  {site['site']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import sys
+    print(summarize_timeline(*sys.argv[1:3]))
@@ -0,0 +1,138 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from .logger import get_logger
+
+logger = get_logger()
+
+TRAILING_YEAR = 9999
+TRAILING_LABELS = {"TTM", "Current"}
+FISCAL_YEAR_PATTERN = re.compile(r"^FY\s*(\d{4})$")
+QUARTER_PATTERN = re.compile(r"^Q([1-4])\s*(\d{4})$")
+
+
+class Period(NamedTuple):
+    """Typed statement period. Tuples sort oldest -> newest, the trailing
+    column ("TTM" in income/balance, "Current" in ratios) is always newest.
+    quarter is 0 for a full fiscal year."""
+    year: int
+    quarter: int = 0
+
+    @property
+    def is_trailing(self) -> bool:
+        return self.year == TRAILING_YEAR
+
+    @property
+    def is_fiscal_year(self) -> bool:
+        return not self.is_trailing and self.quarter == 0
+
+    @property
+    def is_quarter(self) -> bool:
+        return not self.is_trailing and self.quarter > 0
+
+    @property
+    def key(self) -> int:
+        "integer sort key, usable as a numpy axis"
+        return self.year * 10 + self.quarter
+
+    @property
+    def label(self) -> str:
+        if self.is_trailing:
+            return "TTM"
+        if self.quarter:
+            return f"Q{self.quarter} {self.year}"
+        return f"FY {self.year}"
+
+
+TRAILING = Period(TRAILING_YEAR)
+
+
+@lru_cache(maxsize=None)
+def parse_period(label) -> Optional[Period]:
+    "map a column label such as 'FY 2024', 'Q3 2024', 'TTM' or 'Current' to a Period"
+    text = str(label).strip()
+    if text in TRAILING_LABELS:
+        return TRAILING
+    match = FISCAL_YEAR_PATTERN.match(text)
+    if match:
+        return Period(int(match.group(1)))
+    match = QUARTER_PATTERN.match(text)
+    if match:
+        return Period(int(match.group(2)), int(match.group(1)))
+    return None
+
+
+def period_from_key(key: int) -> Period:
+    return Period(key // 10, key % 10)
+
+
+def normalize_period_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """rename period columns to their canonical labels and order them newest first,
+    columns that are not periods are kept at the end"""
+    periods = {col: parse_period(col) for col in df.columns}
+    unknown = [col for col, period in periods.items() if period is None]
+    if unknown:
+        logger.warning(f"columns without a period: {unknown}")
+    known = sorted((col for col, period in periods.items() if period is not None), key=periods.get, reverse=True)
+    df = df[known + unknown]
+    return df.rename(columns={col: periods[col].label for col in known})
+
+
+def fiscal_year_columns(columns, n: int = None, quarterly: bool = False) -> list:
+    "fiscal year (or quarter) column labels, newest first, limited to the last n"
+    periods = [parse_period(col) for col in columns]
+    if quarterly:
+        wanted = [(p, col) for p, col in zip(periods, columns) if p is not None and p.is_quarter]
+    else:
+        wanted = [(p, col) for p, col in zip(periods, columns) if p is not None and p.is_fiscal_year]
+    wanted.sort(reverse=True)
+    return [col for _, col in wanted[:n]]
+
+
+def align_statements(dfs: dict, periods: list = None):
+    """Align several statements on one period axis.
+
+    Returns (period_keys, {name: 2d float array}) with one column per period,
+    newest first. Missing periods are NaN."""
+    if periods is None:
+        all_periods = set()
+        for df in dfs.values():
+            all_periods.update(p for p in map(parse_period, df.columns) if p is not None)
+        periods = sorted(all_periods, reverse=True)
+    keys = np.array([p.key for p in periods], dtype=np.int64)
+    arrays = {}
+    for name, df in dfs.items():
+        by_period = {parse_period(col): col for col in df.columns}
+        out = np.full((len(df.index), len(periods)), np.nan)
+        for i, period in enumerate(periods):
+            col = by_period.get(period)
+            if col is not None:
+                out[:, i] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        arrays[name] = out
+    return keys, arrays
+
+
+def normalize_stored_statements(data_dir: str = "data") -> int:
+    "rewrite csvs written before the period axis existed, returns the number of files changed"
+    changed = 0
+    for root, _, files in os.walk(data_dir):
+        for file in files:
+            if not file.endswith(".csv"):
+                continue
+            path = os.path.join(root, file)
+            df = pd.read_csv(path, index_col=0)
+            if not any(parse_period(col) for col in df.columns):
+                continue  # not a statement (e.g. sector stats)
+            normalized = normalize_period_columns(df)
+            if list(normalized.columns) != list(df.columns):
+                normalized.to_csv(path)
+                changed += 1
+    logger.info(f"normalized period columns in {changed} files")
+    return changed
+
+
+if __name__ == "__main__":
+    normalize_stored_statements()
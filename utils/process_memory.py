@@ -0,0 +1,88 @@
+import os
+import resource
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+# argument of the node process playwright starts, the browser processes are its descendants
+PLAYWRIGHT_DRIVER_ARG = "run-driver"
+
+
+def _read_ppid_map() -> dict:
+    "pid -> parent pid for every process visible in /proc (Linux only)"
+    ppids = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the command name may contain spaces, fields start after the last ')'
+        fields = stat[stat.rfind(")") + 2:].split()
+        ppids[int(entry)] = int(fields[1])
+    return ppids
+
+
+def get_process_rss(pid: int) -> int:
+    "resident set size of one process in bytes, 0 if it is gone"
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _read_children_map() -> dict:
+    "parent pid -> child pids"
+    children = {}
+    for child, parent in _read_ppid_map().items():
+        children.setdefault(parent, []).append(child)
+    return children
+
+
+def _subtree(pid: int, children: dict) -> list:
+    "descendants of pid in the children map"
+    descendants, stack = [], list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        descendants.append(child)
+        stack.extend(children.get(child, []))
+    return descendants
+
+
+def get_process_args(pid: int) -> list:
+    "command line of a process, [] if it is gone"
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return [arg.decode(errors="replace") for arg in f.read().split(b"\0") if arg]
+    except OSError:
+        return []
+
+
+def get_browser_pids(pid: int = None) -> list:
+    """the playwright driver processes started by pid and their descendants (the
+    browser and its renderers), not other children such as process pool workers"""
+    pid = pid or os.getpid()
+    if not os.path.isdir("/proc"):
+        return []
+    children = _read_children_map()
+    return [
+        browser_pid
+        for driver in _subtree(pid, children)
+        if PLAYWRIGHT_DRIVER_ARG in get_process_args(driver)
+        for browser_pid in [driver] + _subtree(driver, children)
+    ]
+
+
+def get_browser_rss(pid: int = None) -> int:
+    "summed RSS in bytes of the playwright driver and browser processes (see get_browser_pids)"
+    return sum(get_process_rss(browser_pid) for browser_pid in get_browser_pids(pid))
+
+
+def get_self_rss() -> int:
+    return get_process_rss(os.getpid())
+
+
+def get_self_peak_rss() -> int:
+    "peak RSS of this python process in bytes"
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,98 @@
+import csv
+import json
+import os
+from typing import Iterable
+import pandas as pd
+from .logger import get_logger
+
+logger = get_logger()
+
+ROW_INDEX_SUFFIX = ".idx.json"
+
+
+def get_row_index_path(csv_path: str) -> str:
+    return csv_path + ROW_INDEX_SUFFIX
+
+
+def _first_field(line: bytes) -> str:
+    "first csv field of a raw line, handles quoted metric names like \"Selling, General & Admin\""
+    text = line.decode("utf-8").rstrip("\r\n")
+    if not text.startswith('"'):
+        return text.split(",", 1)[0]
+    return next(csv.reader([text]))[0]
+
+
+def build_row_index(csv_path: str) -> dict:
+    """Scan a statement csv once and persist the byte offset and length of every
+    metric row next to it, so later reads can seek straight to the rows they need"""
+    rows = {}
+    with open(csv_path, "rb") as f:
+        header = f.readline()
+        offset = len(header)
+        for line in iter(f.readline, b""):
+            if line.strip():
+                rows[_first_field(line)] = [offset, len(line)]
+            offset += len(line)
+    stat = os.stat(csv_path)
+    row_index = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "header_length": len(header),
+        "rows": rows,
+    }
+    with open(get_row_index_path(csv_path), "w") as f:
+        json.dump(row_index, f)
+    return row_index
+
+
+def load_row_index(csv_path: str) -> dict:
+    "load the row index, rebuilding it when missing or older than the csv"
+    stat = os.stat(csv_path)
+    try:
+        with open(get_row_index_path(csv_path)) as f:
+            row_index = json.load(f)
+        if row_index["mtime_ns"] == stat.st_mtime_ns and row_index["size"] == stat.st_size:
+            return row_index
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    return build_row_index(csv_path)
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def load_rows(csv_path: str, metrics: Iterable[str]) -> pd.DataFrame:
+    """Read only the requested metric rows of a statement csv.
+
+    Rows are located with the offset index and parsed individually, the rest of
+    the file is never read. Metrics that do not exist are left out of the result,
+    same as a full read followed by .loc on the existing rows."""
+    row_index = load_row_index(csv_path)
+    lines = []
+    with open(csv_path, "rb") as f:
+        header = f.read(row_index["header_length"])
+        for metric in metrics:
+            position = row_index["rows"].get(metric)
+            if position is None:
+                continue
+            f.seek(position[0])
+            lines.append(f.read(position[1]).decode("utf-8"))
+
+    header_fields = next(csv.reader([header.decode("utf-8")]))
+    parsed = list(csv.reader(lines))
+    df = pd.DataFrame(
+        [[_to_float(v) for v in row[1:]] for row in parsed],
+        index=pd.Index([row[0] for row in parsed], name=header_fields[0] or None),
+        columns=header_fields[1:],
+        dtype=float,
+    )
+    return df
+
+
+def load_symbol_rows(symbol: str, report: str, metrics: Iterable[str], data_dir: str = "data") -> pd.DataFrame:
+    csv_path = os.path.join(data_dir, symbol, f"{report}.csv")
+    return load_rows(csv_path, metrics)
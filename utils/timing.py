@@ -0,0 +1,168 @@
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from .latency_stats import latency_summary, percentile
+from .logger import get_logger
+
+logger = get_logger()
+
+PROMETHEUS_METRIC = "value_scanner_stage_seconds"
+PROMETHEUS_QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR_SIZE = 2048  # durations kept per stage for the percentiles, whatever the crawl length
+
+_stage_timer = None
+
+
+class StageStats:
+    """count, total and errors of one stage plus a uniform reservoir sample of
+    its durations, memory stays bounded however many spans are recorded"""
+
+    def __init__(self, size: int = RESERVOIR_SIZE, rng: random.Random = None):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.samples = []
+        self._rng = rng or random.Random(0)
+
+    def add(self, seconds: float, ok: bool = True):
+        self.count += 1
+        self.total += seconds
+        self.errors += not ok
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            # algorithm R: every span so far has the same chance to be in the sample
+            slot = self._rng.randrange(self.count)
+            if slot < self.size:
+                self.samples[slot] = seconds
+
+
+class StageTimer:
+    """Collects timing spans of crawl stages (navigate, close_popup, extract_table, ...)
+    labelled by symbol and report, for export as json lines or a prometheus textfile.
+
+    records holds the spans not exported to json lines yet, export_jsonl drops
+    them; the percentiles come from a bounded sample per stage (StageStats)."""
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.records = []
+        self.stats = defaultdict(lambda: StageStats(reservoir_size))
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time the block. Works around awaits too:
+
+            with timer.span("navigate", symbol="NVDA", report="income"):
+                await helper.navigate(url)
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.records.append({
+                "ts": time.time(),
+                "stage": stage,
+                "seconds": seconds,
+                "status": status,
+                **labels,
+            })
+            self.stats[stage].add(seconds, ok=status == "ok")
+
+    def by_stage(self) -> dict:
+        "sampled durations per stage, every span until a stage has RESERVOIR_SIZE of them"
+        return {stage: list(stats.samples) for stage, stats in self.stats.items()}
+
+    def counts(self) -> dict:
+        return {stage: stats.count for stage, stats in self.stats.items()}
+
+    def export_jsonl(self, path: str, append: bool = True) -> int:
+        "write the records not exported yet and drop them, returns how many were written"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        new_records, self.records = self.records, []
+        with open(path, "a" if append else "w") as f:
+            for record in new_records:
+                f.write(json.dumps(record) + "\n")
+        return len(new_records)
+
+    def export_prometheus(self, path: str, labels: dict = None):
+        """Write a node_exporter textfile-collector file, replaced atomically
+        so the collector never reads a half written file. labels are added to
+        every sample, e.g. the worker id when several processes export."""
+        extra = "".join(f',{name}="{value}"' for name, value in (labels or {}).items())
+        lines = [
+            f"# HELP {PROMETHEUS_METRIC} Duration of crawl stages in seconds.",
+            f"# TYPE {PROMETHEUS_METRIC} summary",
+        ]
+        for stage, stats in sorted(self.stats.items()):
+            for q in PROMETHEUS_QUANTILES:
+                lines.append(f'{PROMETHEUS_METRIC}{{stage="{stage}"{extra},quantile="{q}"}} {percentile(stats.samples, q * 100):.6f}')
+            lines.append(f'{PROMETHEUS_METRIC}_sum{{stage="{stage}"{extra}}} {stats.total:.6f}')
+            lines.append(f'{PROMETHEUS_METRIC}_count{{stage="{stage}"{extra}}} {stats.count}')
+        lines.append("# HELP value_scanner_stage_errors_total Stage spans that ended with an exception.")
+        lines.append("# TYPE value_scanner_stage_errors_total counter")
+        for stage, stats in sorted(self.stats.items()):
+            if stats.errors:
+                lines.append(f'value_scanner_stage_errors_total{{stage="{stage}"{extra}}} {stats.errors}')
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+def get_stage_timer() -> StageTimer:
+    "process wide timer, same pattern as get_logger"
+    global _stage_timer
+    if _stage_timer is None:
+        _stage_timer = StageTimer()
+    return _stage_timer
+
+
+def load_jsonl_records(path: str) -> list:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize_records(records: list) -> str:
+    "percentile breakdown per stage as a text table, slowest total first"
+    stages = defaultdict(list)
+    errors = defaultdict(int)
+    for record in records:
+        stages[record["stage"]].append(record["seconds"])
+        if record.get("status", "ok") != "ok":
+            errors[record["stage"]] += 1
+    header = f"{'stage':<16}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'total':>10}"
+    lines = [header, "-" * len(header)]
+    for stage, values in sorted(stages.items(), key=lambda item: sum(item[1]), reverse=True):
+        s = latency_summary(values)
+        lines.append(
+            f"{stage:<16}{s['count']:>7}{errors[stage]:>8}{s['p50']:>9.3f}{s['p95']:>9.3f}"
+            f"{s['p99']:>9.3f}{s['max']:>9.3f}{sum(values):>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="stage timing tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    summary_parser = subparsers.add_parser("summary", help="print percentiles per stage from a jsonl export")
+    summary_parser.add_argument("path")
+    summary_parser.add_argument("--report", help="only spans of this report type")
+    args = parser.parse_args()
+
+    records = load_jsonl_records(args.path)
+    if args.report:
+        records = [r for r in records if r.get("report") == args.report]
+    print(summarize_records(records))